@@ -0,0 +1,225 @@
+"""Offline-first read-through cache for ACS tables.
+
+Each table (e.g. bg_age_2023) lives in the cache directory as <name>.csv next
+to <name>.meta.json, which records when it was fetched and last checked, the
+HTTP validators (ETag / Last-Modified) of the request it came from and the
+columns it holds. ACSTableCache.get():
+
+- serves the disk copy when it passes the schema and is younger than max_age;
+- serves a stale copy immediately and refreshes it on a background thread
+  (one per table), passing the stored validators to the fetch so it can send
+  If-None-Match / If-Modified-Since and an unchanged release costs a 304;
+- fetches synchronously only when there is no valid copy on disk.
+
+A failed background refresh keeps the stale copy and records the error in the
+metadata; the next stale read tries again. Copies that fail validation (missing
+columns, duplicate or malformed ids, non-numeric values) are never served.
+"""
+from __future__ import annotations
+
+import json
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+
+from atomic_write import write_atomic
+
+META_SUFFIX = ".meta.json"
+
+
+class NotModified(Exception):
+    """Raised by a fetch when the server answered 304 for its conditional request"""
+
+
+@dataclass(frozen=True)
+class TableSchema:
+    """
+    Expected layout of a cached table.
+    - columns: column -> "str" or "float" (numeric columns may hold NaN)
+    - key: id column that must be unique and non-empty
+    - key_length: expected length of every key (e.g. 12 for block-group GEOIDs)
+    - min_rows: smallest acceptable table
+    """
+    columns: dict
+    key: str | None = None
+    key_length: int | None = None
+    min_rows: int = 1
+
+    def problems(self, df: pd.DataFrame) -> list:
+        """Schema violations of df (empty when valid)"""
+        missing = [col for col in self.columns if col not in df.columns]
+        if missing:
+            return [f"missing columns: {', '.join(missing)}"]
+        issues = []
+        if len(df) < self.min_rows:
+            issues.append(f"{len(df)} rows (expected at least {self.min_rows})")
+        if self.key is not None:
+            keys = df[self.key]
+            if keys.isna().any() or (keys.astype(str).str.len() == 0).any():
+                issues.append(f"empty {self.key} values")
+            elif keys.duplicated().any():
+                issues.append(f"duplicate {self.key} values")
+            elif self.key_length is not None and (keys.astype(str).str.len() != self.key_length).any():
+                issues.append(f"{self.key} values not {self.key_length} characters long")
+        for col, kind in self.columns.items():
+            if kind == "float":
+                values = pd.to_numeric(df[col], errors="coerce")
+                if (values.isna() & df[col].notna()).any():
+                    issues.append(f"non-numeric values in {col}")
+        return issues
+
+    def conform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Schema columns only, with their declared dtypes"""
+        out = df[list(self.columns)].copy()
+        for col, kind in self.columns.items():
+            out[col] = out[col].astype(str) if kind == "str" else pd.to_numeric(out[col], errors="coerce").astype(float)
+        return out
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass
+class ACSTableCache:
+    """
+    Read-through cache of fetched tables under cache_dir.
+
+    fetch callables take the stored validators (None when fetching from
+    scratch) and return (frame, validators); they raise NotModified when a
+    conditional request found the release unchanged.
+    """
+    cache_dir: Path
+    max_age: timedelta = timedelta(days=30)
+    background: bool = True
+    _refreshing: set = field(default_factory=set, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self):
+        self.cache_dir = Path(self.cache_dir)
+
+    def table_path(self, name: str) -> Path:
+        return self.cache_dir / f"{name}.csv"
+
+    def meta_path(self, name: str) -> Path:
+        return self.cache_dir / f"{name}{META_SUFFIX}"
+
+    def read_meta(self, name: str) -> dict:
+        try:
+            return json.loads(self.meta_path(name).read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def read(self, name: str, schema: TableSchema):
+        """(frame, meta) from disk, or None when absent or invalid"""
+        path = self.table_path(name)
+        if not path.exists():
+            return None
+        try:
+            dtypes = {col: str for col, kind in schema.columns.items() if kind == "str"}
+            df = pd.read_csv(path, dtype=dtypes)
+        except Exception as exc:
+            print(f"[acs_cache] Unreadable {path.name} ({exc}); refetching.")
+            return None
+        problems = schema.problems(df)
+        if problems:
+            print(f"[acs_cache] {path.name} failed validation ({'; '.join(problems)}); refetching.")
+            return None
+        meta = self.read_meta(name)
+        # Copies written before metadata existed are dated by their mtime
+        meta.setdefault("fetched_at", datetime.fromtimestamp(path.stat().st_mtime, timezone.utc).isoformat())
+        return schema.conform(df), meta
+
+    def is_fresh(self, meta: dict) -> bool:
+        checked = meta.get("checked_at") or meta.get("fetched_at")
+        try:
+            return _now() - datetime.fromisoformat(checked) < self.max_age
+        except (TypeError, ValueError):
+            return False
+
+    def write(self, name: str, df: pd.DataFrame, meta: dict):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        write_atomic(self.table_path(name), lambda tmp: df.to_csv(tmp, index=False))
+        self._write_meta(name, meta)
+
+    def _write_meta(self, name: str, meta: dict):
+        write_atomic(self.meta_path(name), lambda tmp: Path(tmp).write_text(json.dumps(meta, indent=2)))
+
+    def refresh(self, name: str, fetch: Callable, schema: TableSchema, meta: dict | None = None):
+        """
+        Fetch the table now (conditionally when meta carries validators) and
+        store it. Returns (frame or None when unchanged, meta).
+        """
+        meta = dict(meta or {})
+        now = _now().isoformat()
+        try:
+            df, validators = fetch(meta.get("validators"))
+        except NotModified:
+            meta.update(checked_at=now, last_error=None)
+            self._write_meta(name, meta)
+            return None, meta
+        problems = schema.problems(df)
+        if problems:
+            raise ValueError(f"Fetched {name} failed validation: {'; '.join(problems)}")
+        df = schema.conform(df)
+        meta = {
+            "fetched_at": now,
+            "checked_at": now,
+            "validators": validators or {},
+            "rows": len(df),
+            "columns": list(df.columns),
+            "last_error": None,
+        }
+        try:
+            self.write(name, df, meta)
+        except OSError as exc:
+            # Read-only deployments still get the fetched table for this process
+            print(f"[acs_cache] Could not write {name} to {self.cache_dir} ({exc}).")
+        return df, meta
+
+    def _refresh_in_background(self, name: str, fetch: Callable, schema: TableSchema, meta: dict):
+        with self._lock:
+            if name in self._refreshing:
+                return
+            self._refreshing.add(name)
+
+        def run():
+            try:
+                self.refresh(name, fetch, schema, meta)
+            except Exception as exc:
+                print(f"[acs_cache] Background refresh of {name} failed ({exc}); serving the cached copy.")
+                try:
+                    self._write_meta(name, {**meta, "last_error": str(exc)})
+                except OSError:
+                    pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(name)
+
+        threading.Thread(target=run, name=f"acs-refresh-{name}", daemon=True).start()
+
+    def get(self, name: str, fetch: Callable, schema: TableSchema):
+        """
+        (frame, meta) for the table; meta["source"] is "cache", "stale-cache"
+        (refresh scheduled) or "api".
+        """
+        cached = self.read(name, schema)
+        if cached is not None:
+            df, meta = cached
+            if self.is_fresh(meta):
+                return df, {**meta, "source": "cache"}
+            if self.background:
+                self._refresh_in_background(name, fetch, schema, meta)
+                return df, {**meta, "source": "stale-cache"}
+            try:
+                fresh, meta = self.refresh(name, fetch, schema, meta)
+            except Exception as exc:
+                print(f"[acs_cache] Refresh of {name} failed ({exc}); serving the cached copy.")
+                return df, {**meta, "source": "stale-cache"}
+            return (df if fresh is None else fresh), {**meta, "source": "cache" if fresh is None else "api"}
+        df, meta = self.refresh(name, fetch, schema)
+        return df, {**meta, "source": "api"}
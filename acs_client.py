@@ -0,0 +1,184 @@
+"""Pooled, retrying and concurrent Census ACS API client.
+
+- One requests.Session with a connection pool sized to the thread pool, so
+  repeated calls reuse keep-alive connections instead of new TLS handshakes.
+- Exponential backoff (urllib3 Retry) on connection errors, 429 and 5xx,
+  honouring Retry-After.
+- gather() runs independent requests (tables, variable chunks) on a bounded
+  thread pool. A gather() issued from inside a pool task runs inline, so
+  nested fan-out (a chunked table fetched as one of several tables) can never
+  exhaust the pool and deadlock.
+- as_completed() runs the same way but yields each result as it finishes, so
+  bulk jobs can write results while the rest are still in flight.
+- get_json() splits a "get" list longer than the API's 50-variable limit into
+  chunks, fetches them concurrently and joins the rows back on the geography
+  columns, so callers always see one header + rows payload.
+
+Conditional requests (ETag / Last-Modified validators) follow acs_cache: a 304
+raises acs_cache.NotModified. Benchmark against a local stand-in server:
+python scripts/bench/acs_client_benchmark.py
+"""
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from acs_cache import NotModified
+
+# Census API: at most 50 variables per request (geography columns not counted)
+MAX_VARIABLES_PER_REQUEST = 50
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class ACSClient:
+    """
+    - max_workers: size of the thread pool (and of the connection pool)
+    - retries / backoff: attempts after the first and the backoff factor
+      (sleeps backoff, 2 x backoff, 4 x backoff, ... between attempts)
+    - timeout: per-request timeout in seconds
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        retries: int = 4,
+        backoff: float = 0.5,
+        timeout: float = 60,
+        max_variables: int = MAX_VARIABLES_PER_REQUEST,
+        session: requests.Session | None = None,
+    ):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_variables = max_variables
+        self.session = session or requests.Session()
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._thread_prefix = f"acs-client-{id(self):x}"
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=self._thread_prefix)
+
+    def gather(self, tasks: dict, wrap: Callable | None = None) -> dict:
+        """
+        Run {name: callable} concurrently on the pool; returns {name: result}.
+        The first failure is re-raised once every task has finished.
+        wrap: optional decorator applied to each callable before submission
+        (e.g. to attach the Streamlit script context to worker threads).
+        """
+        results, error = {}, None
+        if threading.current_thread().name.startswith(self._thread_prefix):
+            for name, task in tasks.items():
+                try:
+                    results[name] = task()
+                except Exception as exc:
+                    error = error or exc
+        else:
+            futures = {name: self._executor.submit(wrap(task) if wrap else task) for name, task in tasks.items()}
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result()
+                except Exception as exc:
+                    error = error or exc
+        if error is not None:
+            raise error
+        return results
+
+    def as_completed(self, tasks: dict, wrap: Callable | None = None):
+        """
+        Run {name: callable} concurrently on the pool, yielding (name, result,
+        error) in completion order; error is the task's exception (result None)
+        when it failed, so one failure does not stop the others.
+        """
+        if threading.current_thread().name.startswith(self._thread_prefix):
+            for name, task in tasks.items():
+                try:
+                    outcome = (name, task(), None)
+                except Exception as exc:
+                    outcome = (name, None, exc)
+                yield outcome
+            return
+        futures = {self._executor.submit(wrap(task) if wrap else task): name for name, task in tasks.items()}
+        for future in as_completed(futures):
+            error = future.exception()
+            yield futures[future], (None if error else future.result()), error
+
+    def _get(self, url: str, params: dict, validators: dict | None = None):
+        headers = {}
+        if validators:
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+        response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            raise NotModified(url)
+        response.raise_for_status()
+        return response.json(), {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+
+    def get_json(self, url: str, params: dict, validators: dict | None = None):
+        """
+        ACS payload (header row + data rows) and the response validators. A
+        "get" list over max_variables is fetched in concurrent chunks and
+        joined on the geography columns; validators then describe (and make
+        conditional) the first chunk.
+        """
+        variables = [name for name in params.get("get", "").split(",") if name]
+        if len(variables) <= self.max_variables:
+            return self._get(url, params, validators)
+        chunks = [variables[start:start + self.max_variables] for start in range(0, len(variables), self.max_variables)]
+        results = self.gather({
+            index: (lambda chunk=chunk, index=index: self._get(
+                url, {**params, "get": ",".join(chunk)}, validators if index == 0 else None,
+            ))
+            for index, chunk in enumerate(chunks)
+        })
+        payloads = [results[index][0] for index in range(len(chunks))]
+        return merge_chunked_payloads(payloads, chunks), results[0][1]
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+
+def merge_chunked_payloads(payloads: list, chunks: list) -> list:
+    """
+    Join per-chunk ACS payloads row by row on their geography columns (the
+    returned columns that were not requested). Rows missing from a chunk get
+    None for that chunk's variables.
+    """
+    header = payloads[0][0]
+    geo_columns = [col for col in header if col not in chunks[0]]
+    merged = {}
+    for row in payloads[0][1:]:
+        record = dict(zip(header, row))
+        merged[tuple(record[col] for col in geo_columns)] = record
+    out_header = list(header)
+    for payload, chunk in zip(payloads[1:], chunks[1:]):
+        chunk_header = payload[0]
+        new_columns = [col for col in chunk_header if col in chunk and col not in out_header]
+        out_header.extend(new_columns)
+        for row in payload[1:]:
+            record = dict(zip(chunk_header, row))
+            key = tuple(record.get(col) for col in geo_columns)
+            if key in merged:
+                merged[key].update({col: record[col] for col in new_columns})
+    rows = [[record.get(col) for col in out_header] for record in merged.values()]
+    return [out_header] + rows
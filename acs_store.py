@@ -0,0 +1,472 @@
+"""ACS block-group / tract tables for any county and a partitioned columnar store of them.
+
+The table requests the app makes for Philadelphia are defined here for any
+state + county pair:
+
+- bg_age: B01001 block-group population age 5-17 with its MOE
+- bg_moe: B19013 / C17002 block-group income and poverty rate with MOEs
+- bg_core: core block-group demographics (population, income, poverty rate,
+  race shares, households with children)
+- tract_enrollment: S1401 K-12 enrollment over B01001 tract population age 5-17
+
+ingest_counties() requests every (table, county) pair concurrently through an
+ACSClient and writes each result as soon as it arrives into a Hive-partitioned
+Parquet dataset with one partition per county:
+
+    <store>/<table>/year=2023/state=42/county=101/part-0.parquet
+
+Re-ingesting a county replaces its partition; failures are reported per
+partition and leave the others in place. read_region() scans a table for a list
+of counties with partition pruning, so a 10-county region reads those 10 files
+and nothing else. The store requires pyarrow.
+
+Ingest: python acs_store.py --counties 42101 42045 42091 [--year 2023]
+        python acs_store.py --state 42   (every county in the state)
+"""
+from __future__ import annotations
+
+import os
+from functools import partial
+from pathlib import Path
+from typing import Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+
+from acs_cache import TableSchema
+from acs_client import ACSClient
+from atomic_write import write_atomic
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency (ships with streamlit)
+    pa = ds = pq = None
+
+ACS_YEAR = "2023"
+DEFAULT_STORE_DIR = Path("data/acs_store")
+PARTITION_KEYS = ("year", "state", "county")
+PART_FILE = "part-0.parquet"
+
+
+def acs5_endpoint(year: str = ACS_YEAR) -> str:
+    return f"https://api.census.gov/data/{year}/acs/acs5"
+
+
+def acs5_subject_endpoint(year: str = ACS_YEAR) -> str:
+    return f"https://api.census.gov/data/{year}/acs/acs5/subject"
+
+
+BG_AGE_FIELDS = {
+    "B01001_004E": "male_5_9",
+    "B01001_005E": "male_10_14",
+    "B01001_006E": "male_15_17",
+    "B01001_028E": "female_5_9",
+    "B01001_029E": "female_10_14",
+    "B01001_030E": "female_15_17",
+}
+# Matching 90% margins of error (…M variables) for the age counts
+BG_AGE_MOE_FIELDS = {code[:-1] + "M": f"{alias}_moe" for code, alias in BG_AGE_FIELDS.items()}
+
+# Block-group income / poverty estimates with MOEs (C17002: ratio of income to poverty level)
+BG_MOE_FIELDS = {
+    "B19013_001E": "median_income_est",
+    "B19013_001M": "income_moe",
+    "C17002_001E": "poverty_universe",
+    "C17002_001M": "poverty_universe_moe",
+    "C17002_002E": "poverty_under_50",
+    "C17002_002M": "poverty_under_50_moe",
+    "C17002_003E": "poverty_50_to_99",
+    "C17002_003M": "poverty_50_to_99_moe",
+}
+
+# Core block-group demographics, named like demographics_block_groups.csv
+BG_CORE_FIELDS = {
+    "B01003_001E": "total_pop",
+    "B19013_001E": "income",
+    "C17002_001E": "poverty_universe",
+    "C17002_002E": "poverty_under_50",
+    "C17002_003E": "poverty_50_to_99",
+    "B02001_001E": "race_total",
+    "B02001_002E": "white_alone",
+    "B02001_003E": "black_alone",
+    "B11005_002E": "hh_with_u18",
+}
+
+TRACT_ENROLLMENT_FIELDS = {
+    # per ACS S1401 documentation: kindergarten, grades 1-8, grades 9-12 enrollment counts
+    "S1401_C01_004E": "kindergarten_total",
+    "S1401_C01_005E": "grades_1_to_8_total",
+    "S1401_C01_006E": "grades_9_to_12_total",
+}
+
+BG_AGE_SCHEMA = TableSchema(
+    {"block_group_id": "str", "tract_id": "str", "bg_age_5_17": "float", "bg_age_5_17_moe": "float"},
+    key="block_group_id", key_length=12,
+)
+BG_MOE_SCHEMA = TableSchema(
+    {
+        "block_group_id": "str", "median_income_est": "float", "income_moe": "float",
+        "poverty_universe": "float", "poverty_rate_est": "float", "poverty_rate_moe": "float",
+    },
+    key="block_group_id", key_length=12,
+)
+BG_CORE_SCHEMA = TableSchema(
+    {
+        "block_group_id": "str", "tract_id": "str", "total_pop": "float", "income": "float",
+        "poverty_rate": "float", "pct_black": "float", "pct_white": "float", "hh_with_u18": "float",
+    },
+    key="block_group_id", key_length=12,
+)
+TRACT_ENROLLMENT_SCHEMA = TableSchema(
+    {"tract_id": "str", "tract_enrolled_k12": "float", "tract_pop_5_17": "float", "tract_rate_k12": "float"},
+    key="tract_id", key_length=11,
+)
+
+
+def _get_json(client: ACSClient, url: str, params: dict, validators: dict | None = None, api_key: str | None = None):
+    if api_key:
+        params = {**params, "key": api_key}
+    return client.get_json(url, params, validators)
+
+
+def _payload_frame(payload: list, expected: list, label: str) -> pd.DataFrame:
+    headers = payload[0]
+    missing = [col for col in expected if col not in headers]
+    if missing:
+        raise ValueError(f"Missing required ACS variables for {label}: {', '.join(missing)}")
+    return pd.DataFrame(payload[1:], columns=headers)
+
+
+def _block_group_params(fields: Iterable[str], state: str, county: str) -> dict:
+    return {
+        "get": ",".join(list(fields) + ["NAME"]),
+        "for": "block group:*",
+        "in": f"state:{state}+county:{county}+tract:*",
+    }
+
+
+def _tract_params(fields: Iterable[str], state: str, county: str) -> dict:
+    return {
+        "get": ",".join(list(fields) + ["NAME"]),
+        "for": "tract:*",
+        "in": f"state:{state}+county:{county}",
+    }
+
+
+def request_block_group_ages(
+    client: ACSClient, year: str, state: str, county: str, validators: dict | None = None, api_key: str | None = None,
+):
+    """ACS block-group counts for population age 5-17 (with MOE) for one county and vintage; returns (frame, validators)."""
+    fields = list(BG_AGE_FIELDS) + list(BG_AGE_MOE_FIELDS)
+    payload, response_validators = _get_json(
+        client, acs5_endpoint(year), _block_group_params(fields, state, county), validators, api_key,
+    )
+    df = _payload_frame(payload, fields + ["NAME", "state", "county", "tract", "block group"], "block group ages")
+    df["block_group_id"] = df["state"] + df["county"] + df["tract"] + df["block group"]
+    df["tract_id"] = df["state"] + df["county"] + df["tract"]
+
+    for code, alias in BG_AGE_FIELDS.items():
+        df[alias] = pd.to_numeric(df[code], errors="coerce")
+
+    df["bg_age_5_17"] = df[list(BG_AGE_FIELDS.values())].fillna(0).sum(axis=1)
+    # MOE of a sum: root-sum-of-squares of the component MOEs (negative ACS codes -> 0)
+    for code, alias in BG_AGE_MOE_FIELDS.items():
+        df[alias] = pd.to_numeric(df[code], errors="coerce").clip(lower=0)
+    df["bg_age_5_17_moe"] = np.sqrt((df[list(BG_AGE_MOE_FIELDS.values())].fillna(0) ** 2).sum(axis=1))
+
+    return df[list(BG_AGE_SCHEMA.columns)], response_validators
+
+
+def request_block_group_moes(
+    client: ACSClient, year: str, state: str, county: str, validators: dict | None = None, api_key: str | None = None,
+):
+    """ACS block-group income and poverty-rate estimates with margins of error for one county and vintage."""
+    payload, response_validators = _get_json(
+        client, acs5_endpoint(year), _block_group_params(BG_MOE_FIELDS, state, county), validators, api_key,
+    )
+    df = _payload_frame(payload, list(BG_MOE_FIELDS) + ["state", "county", "tract", "block group"], "block group MOEs")
+    df["block_group_id"] = df["state"] + df["county"] + df["tract"] + df["block group"]
+    for code, alias in BG_MOE_FIELDS.items():
+        # Negative values are ACS annotation codes (e.g. -555555555 = no sampling error)
+        df[alias] = pd.to_numeric(df[code], errors="coerce").where(lambda s: s >= 0)
+
+    # Poverty rate MOE (percentage points) via the ACS proportion formula:
+    # MOE_p = sqrt(MOE_num^2 - p^2 * MOE_den^2) / den, falling back to the ratio formula
+    numerator = df["poverty_under_50"].fillna(0) + df["poverty_50_to_99"].fillna(0)
+    numerator_moe = np.sqrt(df["poverty_under_50_moe"].fillna(0) ** 2 + df["poverty_50_to_99_moe"].fillna(0) ** 2)
+    universe = df["poverty_universe"]
+    universe_moe = df["poverty_universe_moe"].fillna(0)
+    share = numerator / universe.where(universe > 0)
+    radicand = numerator_moe ** 2 - share ** 2 * universe_moe ** 2
+    radicand = radicand.where(radicand >= 0, numerator_moe ** 2 + share ** 2 * universe_moe ** 2)
+    df["poverty_rate_moe"] = 100.0 * np.sqrt(radicand) / universe.where(universe > 0)
+    df["poverty_rate_est"] = 100.0 * share
+
+    return df[list(BG_MOE_SCHEMA.columns)], response_validators
+
+
+def request_block_group_core(
+    client: ACSClient, year: str, state: str, county: str, validators: dict | None = None, api_key: str | None = None,
+):
+    """Core ACS block-group demographics (as in demographics_block_groups.csv) for one county and vintage."""
+    payload, response_validators = _get_json(
+        client, acs5_endpoint(year), _block_group_params(BG_CORE_FIELDS, state, county), validators, api_key,
+    )
+    df = _payload_frame(payload, list(BG_CORE_FIELDS) + ["state", "county", "tract", "block group"], "core demographics")
+    df["block_group_id"] = df["state"] + df["county"] + df["tract"] + df["block group"]
+    df["tract_id"] = df["state"] + df["county"] + df["tract"]
+    for code, alias in BG_CORE_FIELDS.items():
+        df[alias] = pd.to_numeric(df[code], errors="coerce").where(lambda s: s >= 0)
+
+    # Rates in percent; undefined (NaN) where the universe is empty
+    universe = df["poverty_universe"].where(df["poverty_universe"] > 0)
+    df["poverty_rate"] = 100.0 * (df["poverty_under_50"].fillna(0) + df["poverty_50_to_99"].fillna(0)) / universe
+    race_total = df["race_total"].where(df["race_total"] > 0)
+    df["pct_black"] = 100.0 * df["black_alone"] / race_total
+    df["pct_white"] = 100.0 * df["white_alone"] / race_total
+
+    return df[list(BG_CORE_SCHEMA.columns)], response_validators
+
+
+def request_tract_enrollment(
+    client: ACSClient, year: str, state: str, county: str, validators: dict | None = None, api_key: str | None = None,
+):
+    """
+    ACS tract-level K-12 enrollment totals and rates for one county and vintage.
+    The S1401 and B01001 requests run concurrently; both come from the same
+    release, so the S1401 validators stand for both.
+    """
+    payloads = client.gather({
+        "enrollment": partial(
+            _get_json, client, acs5_subject_endpoint(year),
+            _tract_params(TRACT_ENROLLMENT_FIELDS, state, county), validators, api_key,
+        ),
+        "tract_ages": partial(_get_json, client, acs5_endpoint(year), _tract_params(BG_AGE_FIELDS, state, county), None, api_key),
+    })
+    enrollment_payload, response_validators = payloads["enrollment"]
+    tract_payload, _ = payloads["tract_ages"]
+
+    enrollment_df = _payload_frame(
+        enrollment_payload, list(TRACT_ENROLLMENT_FIELDS) + ["NAME", "state", "county", "tract"], "S1401 enrollment",
+    )
+    enrollment_df["tract_id"] = enrollment_df["state"] + enrollment_df["county"] + enrollment_df["tract"]
+    for code, alias in TRACT_ENROLLMENT_FIELDS.items():
+        enrollment_df[alias] = pd.to_numeric(enrollment_df[code], errors="coerce")
+    enrollment_df["tract_enrolled_k12"] = (
+        enrollment_df["kindergarten_total"].fillna(0)
+        + enrollment_df["grades_1_to_8_total"].fillna(0)
+        + enrollment_df["grades_9_to_12_total"].fillna(0)
+    )
+
+    tract_df = _payload_frame(tract_payload, list(BG_AGE_FIELDS) + ["NAME", "state", "county", "tract"], "tract B01001")
+    tract_df["tract_id"] = tract_df["state"] + tract_df["county"] + tract_df["tract"]
+    for code, alias in BG_AGE_FIELDS.items():
+        tract_df[alias] = pd.to_numeric(tract_df[code], errors="coerce")
+    tract_df["tract_pop_5_17"] = tract_df[list(BG_AGE_FIELDS.values())].fillna(0).sum(axis=1)
+
+    combined = enrollment_df.merge(tract_df[["tract_id", "tract_pop_5_17"]], on="tract_id", how="left")
+    combined["tract_pop_5_17"] = combined["tract_pop_5_17"].fillna(0)
+    pop = combined["tract_pop_5_17"]
+    combined["tract_rate_k12"] = np.where(pop > 0, combined["tract_enrolled_k12"] / pop.where(pop > 0), 0.0)
+
+    return combined[list(TRACT_ENROLLMENT_SCHEMA.columns)], response_validators
+
+
+# table name -> (request function, schema)
+TABLES = {
+    "bg_age": (request_block_group_ages, BG_AGE_SCHEMA),
+    "bg_moe": (request_block_group_moes, BG_MOE_SCHEMA),
+    "bg_core": (request_block_group_core, BG_CORE_SCHEMA),
+    "tract_enrollment": (request_tract_enrollment, TRACT_ENROLLMENT_SCHEMA),
+}
+
+
+def parse_county_fips(county) -> tuple:
+    """("42", "101") from "42101", "42-101" or ("42", "101")"""
+    if isinstance(county, (tuple, list)):
+        state, code = county
+    else:
+        digits = "".join(ch for ch in str(county) if ch.isdigit())
+        if len(digits) != 5:
+            raise ValueError(f"County FIPS must be 5 digits (state + county), got {county!r}")
+        state, code = digits[:2], digits[2:]
+    return str(state).zfill(2), str(code).zfill(3)
+
+
+def list_state_counties(client: ACSClient, state: str, year: str = ACS_YEAR, api_key: str | None = None) -> list:
+    """(state, county) FIPS pairs of every county in the state for the vintage"""
+    payload, _ = _get_json(client, acs5_endpoint(year), {"get": "NAME", "for": "county:*", "in": f"state:{state}"}, None, api_key)
+    frame = _payload_frame(payload, ["state", "county"], "county list")
+    return sorted(zip(frame["state"], frame["county"]))
+
+
+def partition_path(store_dir, table: str, year: str, state: str, county: str) -> Path:
+    return Path(store_dir) / table / f"year={year}" / f"state={state}" / f"county={county}" / PART_FILE
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("pyarrow is required for the partitioned ACS store")
+
+
+def write_partition(df: pd.DataFrame, store_dir, table: str, year: str, state: str, county: str) -> Path:
+    """Write (replace) one county's partition atomically"""
+    _require_pyarrow()
+    path = partition_path(store_dir, table, year, state, county)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # write_atomic's dot-prefixed temp files are ignored by dataset scans
+    table = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+    return write_atomic(path, lambda tmp: pq.write_table(table, tmp))
+
+
+def ingest_counties(
+    counties: Iterable,
+    year: str = ACS_YEAR,
+    store_dir=DEFAULT_STORE_DIR,
+    tables: Sequence[str] | None = None,
+    client: ACSClient | None = None,
+    api_key: str | None = None,
+    skip_existing: bool = False,
+) -> pd.DataFrame:
+    """
+    Fetch tables (default: all of TABLES) for every county concurrently and
+    write each (table, county) partition as it arrives. Returns one report row
+    per partition: table, state, county, rows, status ("written", "skipped",
+    "failed") and error.
+    """
+    _require_pyarrow()
+    year = str(year)
+    counties = sorted({parse_county_fips(county) for county in counties})
+    tables = list(tables or TABLES)
+    unknown = [name for name in tables if name not in TABLES]
+    if unknown:
+        raise ValueError(f"Unknown ACS tables: {', '.join(unknown)} (choose from {', '.join(TABLES)})")
+    owns_client = client is None
+    client = client or ACSClient()
+
+    report, tasks = [], {}
+    for table in tables:
+        request, _ = TABLES[table]
+        for state, county in counties:
+            if skip_existing and partition_path(store_dir, table, year, state, county).exists():
+                report.append({"table": table, "state": state, "county": county, "rows": None, "status": "skipped", "error": None})
+                continue
+            tasks[(table, state, county)] = partial(request, client, year, state, county, api_key=api_key)
+
+    try:
+        for (table, state, county), result, error in client.as_completed(tasks):
+            row = {"table": table, "state": state, "county": county, "rows": None, "status": "written", "error": None}
+            if error is None:
+                _, schema = TABLES[table]
+                df, _ = result
+                problems = schema.problems(df)
+                if problems:
+                    error = ValueError("; ".join(problems))
+                else:
+                    try:
+                        write_partition(schema.conform(df), store_dir, table, year, state, county)
+                        row["rows"] = len(df)
+                    except OSError as exc:
+                        error = exc
+            if error is not None:
+                row.update(status="failed", error=str(error))
+            report.append(row)
+    finally:
+        if owns_client:
+            client.close()
+    return pd.DataFrame(report, columns=["table", "state", "county", "rows", "status", "error"])
+
+
+def _dataset(store_dir, table: str):
+    _require_pyarrow()
+    root = Path(store_dir) / table
+    if not root.exists():
+        raise FileNotFoundError(f"No {table} partitions under {store_dir}; ingest them with python acs_store.py")
+    # Partition values stay strings so FIPS codes keep their leading zeros
+    partitioning = ds.partitioning(pa.schema([(key, pa.string()) for key in PARTITION_KEYS]), flavor="hive")
+    return ds.dataset(root, format="parquet", partitioning=partitioning)
+
+
+def read_region(
+    table: str,
+    counties: Iterable | None = None,
+    year: str = ACS_YEAR,
+    store_dir=DEFAULT_STORE_DIR,
+    columns: Sequence[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Rows of table for the vintage, limited to counties (None = every ingested
+    county). Partition filters prune the scan to the matching county files;
+    the state and county partition columns are included unless columns says
+    otherwise.
+    """
+    dataset = _dataset(store_dir, table)
+    condition = ds.field("year") == str(year)
+    if counties is not None:
+        by_state = {}
+        for state, county in {parse_county_fips(county) for county in counties}:
+            by_state.setdefault(state, []).append(county)
+        if not by_state:
+            return dataset.schema.empty_table().to_pandas()
+        region = None
+        for state, codes in sorted(by_state.items()):
+            match = (ds.field("state") == state) & ds.field("county").isin(sorted(codes))
+            region = match if region is None else region | match
+        condition = condition & region
+    if columns is None:
+        columns = [name for name in dataset.schema.names if name != "year"]
+    return dataset.to_table(columns=list(columns), filter=condition).to_pandas()
+
+
+def ingested_partitions(table: str, store_dir=DEFAULT_STORE_DIR) -> pd.DataFrame:
+    """(year, state, county) of every partition present for table"""
+    partitions = [
+        dict(part.split("=", 1) for part in path.parent.relative_to(Path(store_dir) / table).parts)
+        for path in sorted((Path(store_dir) / table).glob(f"year=*/state=*/county=*/{PART_FILE}"))
+    ]
+    return pd.DataFrame(partitions, columns=list(PARTITION_KEYS))
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bulk-ingest ACS tables for many counties into a partitioned Parquet store")
+    scope = parser.add_mutually_exclusive_group(required=True)
+    scope.add_argument("--counties", nargs="+", help="5-digit county FIPS codes (state + county), e.g. 42101 42045")
+    scope.add_argument("--state", help="2-digit state FIPS: ingest every county in the state")
+    parser.add_argument("--year", default=ACS_YEAR, help="ACS 5-year vintage")
+    parser.add_argument("--tables", nargs="+", choices=list(TABLES), default=list(TABLES))
+    parser.add_argument("--output", type=Path, default=DEFAULT_STORE_DIR)
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent API requests")
+    parser.add_argument("--skip-existing", action="store_true", help="Keep partitions that are already in the store")
+    parser.add_argument("--census-key", default=None, help="Census API key (default: CENSUS_API_KEY)")
+
+    args = parser.parse_args(argv)
+
+    if pa is None:
+        print("[acs_store] Error: pyarrow is not installed.")
+        return 1
+    api_key = args.census_key or os.getenv("CENSUS_API_KEY")
+    client = ACSClient(max_workers=args.workers)
+    try:
+        counties = args.counties or list_state_counties(client, args.state.zfill(2), args.year, api_key)
+        report = ingest_counties(
+            counties, args.year, args.output, args.tables, client=client, api_key=api_key, skip_existing=args.skip_existing,
+        )
+    finally:
+        client.close()
+
+    for status, group in report.groupby("status"):
+        print(f"[acs_store] {status}: {len(group)} partitions")
+    failed = report[report["status"] == "failed"]
+    for row in failed.itertuples():
+        print(f"[acs_store]   {row.table} {row.state}{row.county}: {row.error}")
+    written = report[report["status"] == "written"]
+    print(f"[acs_store] Wrote {int(written['rows'].sum()) if len(written) else 0:,} rows for {len(counties)} counties to {args.output}")
+    return 1 if len(failed) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
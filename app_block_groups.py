@@ -14,12 +14,46 @@ import json
 from typing import Dict
 import os
 from pathlib import Path
+from datetime import timedelta
+from functools import partial
 import requests
+import threading
 from typing import Tuple
-from educational_desert_index_bg import compute_edi_block_groups, haversine_km
+from educational_desert_index_bg import (
+    ACCESSIBILITY_MODELS,
+    EDIWhatIf,
+    combine_edi_components,
+    compute_edi_components,
+    sweep_edi_parameters,
+)
+from travel_network import NetworkDistanceBackend, RoadNetwork, network_available
+from edi_uncertainty import run_edi_hpfi_monte_carlo
+from edi_panel import EDIPanel, build_edi_panel
+from bg_crosswalk import find_crosswalk, load_crosswalk
+from hpfi import HPFI_COMPONENTS, HPFI_DEFAULT_WEIGHTS, blend_hpfi, hpfi_component_arrays, resolve_hpfi_weights
+from campus_registry import HPFI_ANCHOR, OPERATING, CampusDistanceIndex, campus_frame, campus_proximity_score
+from scoring_rules import classify, load_rule_tables, score_points
+from student_density import student_index
+from score_graph import ScoreGraph
+from weight_space import explore_weight_space
+from filter_engine import FilterEngine, top_n_mask
+from layer_registry import align_layers, layer_columns, load_layer_registry
+from data_snapshot import ACS_SENTINEL, SENTINEL_COLUMNS, load_block_group_frames
+from acs_cache import ACSTableCache
+from acs_client import ACSClient
+from acs_store import (
+    ACS_YEAR,
+    BG_AGE_SCHEMA,
+    BG_MOE_SCHEMA,
+    TRACT_ENROLLMENT_SCHEMA,
+    request_block_group_ages,
+    request_block_group_moes,
+    request_tract_enrollment,
+)
+from site_selection import select_campus_sites
+from areal_aggregation import ArealAggregator, list_polygon_layers, load_polygon_layer
 from scripts.utils.data_quality import compute_legitimate_flag as compute_legitimate_flag_module
 import numpy as np
-from sklearn.preprocessing import MinMaxScaler
 try:
     from competition_ingest import load_competition_schools
 except ModuleNotFoundError:
@@ -62,49 +96,35 @@ except Exception:
 
 STATE_FIPS = "42"  # Pennsylvania
 COUNTY_FIPS = "101"  # Philadelphia County
-ACS_YEAR = "2023"
-ACS_ACS5_ENDPOINT = f"https://api.census.gov/data/{ACS_YEAR}/acs/acs5"
-ACS_SUBJECT_ENDPOINT = f"https://api.census.gov/data/{ACS_YEAR}/acs/acs5/subject"
-
-BG_AGE_FIELDS = {
-    "B01001_004E": "male_5_9",
-    "B01001_005E": "male_10_14",
-    "B01001_006E": "male_15_17",
-    "B01001_028E": "female_5_9",
-    "B01001_029E": "female_10_14",
-    "B01001_030E": "female_15_17",
-}
+# ACS 5-year vintages on 2020 block-group geography
+ACS_PANEL_YEARS = ("2020", "2021", "2022", "2023")
+# Earlier vintages use 2010 block groups and are offered only when a crosswalk file is present
+ACS_LEGACY_YEARS = ("2015", "2016", "2017", "2018", "2019")
+CROSSWALK_DIR = Path("data/crosswalk")
 
-TRACT_ENROLLMENT_FIELDS = {
-    # per ACS S1401 documentation: kindergarten, grades 1-8, grades 9-12 enrollment counts
-    "S1401_C01_004E": "kindergarten_total",
-    "S1401_C01_005E": "grades_1_to_8_total",
-    "S1401_C01_006E": "grades_9_to_12_total",
-}
 
 DATA_CACHE_DIR = Path("data/cache")
 DATA_CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
+# ACS tables are read through DATA_CACHE_DIR (see acs_cache): the API is only hit to fill a missing
+# table or, in the background, to re-check one older than ACS_CACHE_MAX_AGE
+ACS_CACHE_MAX_AGE = timedelta(days=30)
+
+# Optional local road network (nodes.csv + edges.csv or a .graphml export)
+ROAD_NETWORK_DIR = Path("data/network")
+
+# Polygon layers (ZCTAs, council districts, SDP catchments) for roll-up exports
+BOUNDARY_DIR = Path("data/boundaries")
+
 # Paths for optional external layers (CSV files stored locally)
 EXTERNAL_DATA_DIR = Path("data/external")
 EXTERNAL_DATA_DIR.mkdir(parents=True, exist_ok=True)
-LAYER_PATHS = {
-    'vacancy': EXTERNAL_DATA_DIR / 'vacancy_block_groups.csv',
-    'crime': EXTERNAL_DATA_DIR / 'crime_per_block_group.csv',
-    'food': EXTERNAL_DATA_DIR / 'food_access_block_groups.csv',
-    'transit': EXTERNAL_DATA_DIR / 'transit_access_block_groups.csv',
-    'gini': EXTERNAL_DATA_DIR / 'gini_block_groups.csv',
-    'hud': EXTERNAL_DATA_DIR / 'hud_assisted_block_groups.csv',
-}
+# Optional external layers (vacancy, crime, ...) are declared in layer_registry; this JSON file may add or replace layers
+LAYER_REGISTRY_PATH = Path("data/external_layers.json")
 
 # Default weight profile for interactive sliders
 WEIGHT_DEFAULTS: Dict[str, float] = {
-    'hpfi_income': 0.45,
-    'hpfi_inverse_poverty': 0.18,
-    'hpfi_proximity': 0.13,
-    'hpfi_christian': 0.12,
-    'hpfi_k12': 0.09,
-    'hpfi_inverse_edi': 0.03,
+    **{f'hpfi_{name}': weight for name, weight in HPFI_DEFAULT_WEIGHTS.items()},
     'edi_access': 0.40,
     'edi_ratio': 0.30,
     'edi_need': 0.20,
@@ -118,6 +138,12 @@ WEIGHT_DEFAULTS: Dict[str, float] = {
     'rhi_faith': 0.05,
 }
 
+# Normalized component columns behind the weighted RHI sum (weight key = prefix + name); HPFI's are hpfi.HPFI_COMPONENTS
+RHI_COMPONENTS = ("premium", "transit", "crime", "vacancy", "gini", "student_proximity", "faith")
+
+# Columns read by the sidebar filters (see load_filter_engine)
+FILTER_COLUMNS = ("block_group_id", "income", "poverty_rate", "total_pop", "k12_pop", "is_legit")
+
 # Helper function to get Census API key from multiple sources
 def get_census_api_key():
     """Try to get Census API key from Streamlit secrets, env vars, or .env file"""
@@ -149,126 +175,70 @@ def get_census_api_key():
     return None
 
 
-def _acs_request(url: str, params: dict) -> list:
-    api_key = get_census_api_key()
-    if api_key:
-        params = {**params, "key": api_key}
-    response = requests.get(url, params=params, timeout=60)
-    response.raise_for_status()
-    return response.json()
+try:
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+except ImportError:  # pragma: no cover - older / stripped-down streamlit
+    add_script_run_ctx = get_script_run_ctx = None
 
 
-@st.cache_data(ttl=86400)
-def fetch_block_group_age_data() -> Tuple[pd.DataFrame, dict]:
-    """Retrieve ACS block-group counts for population age 5-17."""
+def with_script_run_context(task):
+    """Wrap task so a worker thread runs it with the calling script's Streamlit context (st.cache_data, st.*)"""
+    if get_script_run_ctx is None:
+        return task
+    ctx = get_script_run_ctx()
 
-    params = {
-        "get": ",".join(list(BG_AGE_FIELDS.keys()) + ["NAME"]),
-        "for": "block group:*",
-        "in": f"state:{STATE_FIPS}+county:{COUNTY_FIPS}+tract:*",
-    }
-    payload = _acs_request(ACS_ACS5_ENDPOINT, params)
-    headers = payload[0]
-    expected = list(BG_AGE_FIELDS.keys()) + ["NAME", "state", "county", "tract", "block group"]
-    missing = [col for col in expected if col not in headers]
-    if missing:
-        raise ValueError(f"Missing required ACS variables for block group ages: {', '.join(missing)}")
+    def run():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return task()
+    return run
 
-    df = pd.DataFrame(payload[1:], columns=headers)
-    df["block_group_id"] = df["state"] + df["county"] + df["tract"] + df["block group"]
-    df["tract_id"] = df["state"] + df["county"] + df["tract"]
 
-    for code, alias in BG_AGE_FIELDS.items():
-        df[alias] = pd.to_numeric(df[code], errors="coerce")
+@st.cache_resource(show_spinner=False)
+def acs_client() -> ACSClient:
+    """Pooled, retrying ACS API client (see acs_client) shared by every session and rerun."""
+    return ACSClient(max_workers=4, retries=4, backoff=0.5, timeout=60)
 
-    df["bg_age_5_17"] = df[list(BG_AGE_FIELDS.values())].fillna(0).sum(axis=1)
-    df["is_modeled"] = True
 
-    timestamp = pd.Timestamp.utcnow().isoformat()
-    cache_path = DATA_CACHE_DIR / f"bg_age_{ACS_YEAR}.csv"
-    df.to_csv(cache_path, index=False)
+@st.cache_resource(show_spinner=False)
+def acs_table_cache() -> ACSTableCache:
+    """Disk read-through cache of ACS tables (see acs_cache), one per process so refreshes are not duplicated."""
+    return ACSTableCache(DATA_CACHE_DIR, max_age=ACS_CACHE_MAX_AGE)
 
-    summary = {
-        "timestamp": timestamp,
-        "records": len(df),
-    }
-    cols_to_return = ["block_group_id", "tract_id", "bg_age_5_17", "is_modeled"]
-    return df[cols_to_return], summary
 
+def _county_request(request, year: str):
+    """ACS table request (see acs_store) for the app's county, called with the cached validators"""
+    return partial(request, acs_client(), year, STATE_FIPS, COUNTY_FIPS, api_key=get_census_api_key())
 
-@st.cache_data(ttl=86400)
-def fetch_tract_enrollment_data() -> Tuple[pd.DataFrame, dict]:
-    """Retrieve ACS tract-level enrollment totals and compute K-12 rates."""
 
-    # Enrollment counts from S1401 (kindergarten, grades 1-8, grades 9-12)
-    enrollment_params = {
-        "get": ",".join(list(TRACT_ENROLLMENT_FIELDS.keys()) + ["NAME"]),
-        "for": "tract:*",
-        "in": f"state:{STATE_FIPS}+county:{COUNTY_FIPS}",
+def _acs_summary(df: pd.DataFrame, meta: dict) -> dict:
+    return {
+        "timestamp": meta.get("fetched_at"),
+        "records": len(df),
+        "source": meta.get("source"),
     }
-    enrollment_payload = _acs_request(ACS_SUBJECT_ENDPOINT, enrollment_params)
-    enrollment_headers = enrollment_payload[0]
-    expected_enrollment = list(TRACT_ENROLLMENT_FIELDS.keys()) + ["NAME", "state", "county", "tract"]
-    missing_enrollment = [col for col in expected_enrollment if col not in enrollment_headers]
-    if missing_enrollment:
-        raise ValueError(
-            "Missing S1401 enrollment variables: " + ", ".join(missing_enrollment)
-        )
 
-    enrollment_df = pd.DataFrame(enrollment_payload[1:], columns=enrollment_headers)
-    enrollment_df["tract_id"] = enrollment_df["state"] + enrollment_df["county"] + enrollment_df["tract"]
 
-    for code, alias in TRACT_ENROLLMENT_FIELDS.items():
-        enrollment_df[alias] = pd.to_numeric(enrollment_df[code], errors="coerce")
+@st.cache_data(ttl=3600)
+def fetch_block_group_age_data(year: str = ACS_YEAR) -> Tuple[pd.DataFrame, dict]:
+    """ACS block-group counts for population age 5-17 for one 5-year vintage, read through the ACS table cache."""
+    df, meta = acs_table_cache().get(f"bg_age_{year}", _county_request(request_block_group_ages, year), BG_AGE_SCHEMA)
+    return df.assign(is_modeled=True), _acs_summary(df, meta)
 
-    enrollment_df["tract_enrolled_k12"] = (
-        enrollment_df["kindergarten_total"].fillna(0)
-        + enrollment_df["grades_1_to_8_total"].fillna(0)
-        + enrollment_df["grades_9_to_12_total"].fillna(0)
-    )
 
-    # Tract population age 5-17 from B01001
-    tract_params = {
-        "get": ",".join(list(BG_AGE_FIELDS.keys()) + ["NAME"]),
-        "for": "tract:*",
-        "in": f"state:{STATE_FIPS}+county:{COUNTY_FIPS}",
-    }
-    tract_payload = _acs_request(ACS_ACS5_ENDPOINT, tract_params)
-    tract_headers = tract_payload[0]
-    expected_tract = list(BG_AGE_FIELDS.keys()) + ["NAME", "state", "county", "tract"]
-    missing_tract = [col for col in expected_tract if col not in tract_headers]
-    if missing_tract:
-        raise ValueError(f"Missing tract B01001 variables: {', '.join(missing_tract)}")
-
-    tract_df = pd.DataFrame(tract_payload[1:], columns=tract_headers)
-    tract_df["tract_id"] = tract_df["state"] + tract_df["county"] + tract_df["tract"]
-    for code, alias in BG_AGE_FIELDS.items():
-        tract_df[alias] = pd.to_numeric(tract_df[code], errors="coerce")
-    tract_df["tract_pop_5_17"] = tract_df[list(BG_AGE_FIELDS.values())].fillna(0).sum(axis=1)
-
-    combined = enrollment_df.merge(tract_df[["tract_id", "tract_pop_5_17"]], on="tract_id", how="left")
-    combined["tract_pop_5_17"] = combined["tract_pop_5_17"].fillna(0)
-    combined["tract_rate_k12"] = combined.apply(
-        lambda row: 0.0 if row["tract_pop_5_17"] <= 0 else row["tract_enrolled_k12"] / row["tract_pop_5_17"],
-        axis=1
-    )
+@st.cache_data(ttl=3600)
+def fetch_block_group_moe_data(year: str = ACS_YEAR) -> Tuple[pd.DataFrame, dict]:
+    """ACS block-group income and poverty-rate estimates with margins of error, read through the ACS table cache."""
+    df, meta = acs_table_cache().get(f"bg_moe_{year}", _county_request(request_block_group_moes, year), BG_MOE_SCHEMA)
+    return df, _acs_summary(df, meta)
 
-    timestamp = pd.Timestamp.utcnow().isoformat()
-    cache_path = DATA_CACHE_DIR / f"tract_enrollment_{ACS_YEAR}.csv"
-    combined.to_csv(cache_path, index=False)
 
-    summary = {
-        "timestamp": timestamp,
-        "records": len(combined),
-    }
-
-    cols = [
-        "tract_id",
-        "tract_enrolled_k12",
-        "tract_pop_5_17",
-        "tract_rate_k12",
-    ]
-    return combined[cols], summary
+@st.cache_data(ttl=3600)
+def fetch_tract_enrollment_data(year: str = ACS_YEAR) -> Tuple[pd.DataFrame, dict]:
+    """ACS tract-level enrollment totals and K-12 rates for one vintage, read through the ACS table cache."""
+    df, meta = acs_table_cache().get(
+        f"tract_enrollment_{year}", _county_request(request_tract_enrollment, year), TRACT_ENROLLMENT_SCHEMA,
+    )
+    return df, _acs_summary(df, meta)
 
 
 def validate_k12_total(demographics: pd.DataFrame, tract_enrollment_data: pd.DataFrame) -> dict:
@@ -310,23 +280,6 @@ def validate_k12_total(demographics: pd.DataFrame, tract_enrollment_data: pd.Dat
     return result
 
 
-@st.cache_data(ttl=86400)
-def load_external_layer(name: str) -> pd.DataFrame:
-    """Load optional external layer CSV into a DataFrame (if available).
-
-    Expected column: block_group_id plus a numeric metric column per layer (e.g., vacant_pct, crimes_per_1k, transit_score, food_access_score, gini_index).
-    """
-    path = LAYER_PATHS.get(name)
-    if path is None or not path.exists():
-        return pd.DataFrame()
-    try:
-        df = pd.read_csv(path)
-        df['block_group_id'] = df['block_group_id'].astype(str)
-        return df
-    except Exception:
-        return pd.DataFrame()
-
-
 def normalise_series(series: pd.Series) -> pd.Series:
     """Normalize numeric series to [0,1] using min-max scaling; handle constant series by returning 0.5."""
     ser = pd.to_numeric(series, errors='coerce')
@@ -350,64 +303,24 @@ def merge_optional_layers(demos: pd.DataFrame) -> pd.DataFrame:
     - gini_norm (higher => more inequality)
     - hud_presence (1 if HUD-assisted housing present else 0)
     """
-    df = demos.copy()
-    # Vacancy
-    vac = load_external_layer('vacancy')
-    if not vac.empty:
-        df = df.merge(vac[['block_group_id', 'vacant_pct']], on='block_group_id', how='left')
-    else:
-        df['vacant_pct'] = df.get('vacant_pct', 0)
-    df['vacancy_norm'] = normalise_series(df['vacant_pct'])
-    # Crime
-    crime = load_external_layer('crime')
-    if not crime.empty:
-        df = df.merge(crime[['block_group_id', 'crimes_per_1k']], on='block_group_id', how='left')
-    else:
-        df['crimes_per_1k'] = df.get('crimes_per_1k', 0)
-    # Higher `crimes_per_1k` -> worse; we invert it to safety score
-    df['crime_norm'] = 1.0 - normalise_series(df['crimes_per_1k'])
-    # Transit
-    transit = load_external_layer('transit')
-    if not transit.empty:
-        df = df.merge(transit[['block_group_id', 'transit_access_score']], on='block_group_id', how='left')
-    else:
-        df['transit_access_score'] = df.get('transit_access_score', 0)
-    df['transit_norm'] = normalise_series(df['transit_access_score'])
-    # Food access
-    food = load_external_layer('food')
-    if not food.empty:
-        df = df.merge(food[['block_group_id', 'food_access_score']], on='block_group_id', how='left')
-    else:
-        df['food_access_score'] = df.get('food_access_score', 0)
-    df['food_access_norm'] = normalise_series(df['food_access_score'])
-    # Gini index
-    gini = load_external_layer('gini')
-    if not gini.empty:
-        df = df.merge(gini[['block_group_id', 'gini_index']], on='block_group_id', how='left')
-    else:
-        df['gini_index'] = df.get('gini_index', 0)
-    df['gini_norm'] = normalise_series(df['gini_index'])
-    # HUD presence
-    hud = load_external_layer('hud')
-    if not hud.empty:
-        df = df.merge(hud[['block_group_id', 'hud_assisted']], on='block_group_id', how='left')
-        df['hud_assisted'] = df['hud_assisted'].fillna(0)
-    else:
-        df['hud_assisted'] = 0
-    df['hud_presence'] = df['hud_assisted'].fillna(0).astype(int)
+    registry = load_layer_registry(LAYER_REGISTRY_PATH)
+    layers = align_layers(demos['block_group_id'].astype(str), registry, EXTERNAL_DATA_DIR, base=demos)
+    columns = layer_columns(layers, registry)
 
     # Faith / Christian normalization
-    if '%Christian' in df.columns:
-        df['faith_norm'] = normalise_series(df['%Christian'])
-    elif 'pct_christian' in df.columns:
-        df['faith_norm'] = normalise_series(df['pct_christian'])
+    if '%Christian' in demos.columns:
+        columns['faith_norm'] = normalise_series(demos['%Christian']).to_numpy()
+    elif 'pct_christian' in demos.columns:
+        columns['faith_norm'] = normalise_series(demos['pct_christian']).to_numpy()
     else:
-        df['faith_norm'] = 0.0
+        columns['faith_norm'] = 0.0
 
-    return df
+    # One concat extends the base frame with every layer column
+    added = pd.DataFrame(columns, index=demos.index)
+    return pd.concat([demos.drop(columns=[col for col in added.columns if col in demos.columns]), added], axis=1)
 
 
-def compute_edi_hpfi_zones(demographics: pd.DataFrame, edi_col: str = "EDI", hpfi_col: str = "hpfi") -> pd.DataFrame:
+def compute_edi_hpfi_zones(demographics: pd.DataFrame, edi_col: str = "EDI", hpfi_col: str = "hpfi", rules: dict | None = None) -> pd.DataFrame:
     """
     Create 4-zone overlay using 75th percentile thresholds for EDI and HPFI.
     
@@ -423,33 +336,18 @@ def compute_edi_hpfi_zones(demographics: pd.DataFrame, edi_col: str = "EDI", hpf
     working[edi_col] = pd.to_numeric(working.get(edi_col), errors='coerce').fillna(0)
     working[hpfi_col] = pd.to_numeric(working.get(hpfi_col), errors='coerce').fillna(0)
     
-    # Compute quantiles
-    edi_75 = working[edi_col].quantile(0.75)
-    hpfi_75 = working[hpfi_col].quantile(0.75)
-    
-    edi_high = working[edi_col] >= edi_75
-    hpfi_high = working[hpfi_col] >= hpfi_75
-    
-    def classify_zone(edi_h, hpfi_h):
-        if edi_h and hpfi_h:
-            return 'Golden Zone'
-        elif edi_h and not hpfi_h:
-            return 'Mission Zone'
-        elif not edi_h and hpfi_h:
-            return 'Affluent Opportunity Zone'
-        else:
-            return 'Low Priority Zone'
-    
-    working['zone'] = [classify_zone(e, h) for e, h in zip(edi_high, hpfi_high)]
+    # Thresholds and zone rules come from the "edi_hpfi_zone" rule table (scoring_rules)
+    table = (rules or load_rule_tables())["edi_hpfi_zone"]
+    working['zone'], thresholds = classify(working, table, columns={"EDI": edi_col, "hpfi": hpfi_col})
     
     # Store thresholds as metadata
-    working['_edi_75_threshold'] = edi_75
-    working['_hpfi_75_threshold'] = hpfi_75
+    for name, value in thresholds.items():
+        working[f'_{name}_threshold'] = value
     
     return working
 
 
-def compute_marketing_zones(demographics: pd.DataFrame, edi_col: str = "EDI", hpfi_col: str = "hpfi") -> pd.DataFrame:
+def compute_marketing_zones(demographics: pd.DataFrame, edi_col: str = "EDI", hpfi_col: str = "hpfi", rules: dict | None = None) -> pd.DataFrame:
     """
     Create High-Potential Marketing Zones optimized for growth strategy.
     
@@ -471,46 +369,25 @@ def compute_marketing_zones(demographics: pd.DataFrame, edi_col: str = "EDI", hp
     working[hpfi_col] = pd.to_numeric(working.get(hpfi_col), errors='coerce').fillna(0)
     working['k12_pop'] = pd.to_numeric(working.get('k12_pop'), errors='coerce').fillna(0)
     
-    # Compute quantiles
-    edi_25 = working[edi_col].quantile(0.25)
-    edi_75 = working[edi_col].quantile(0.75)
-    hpfi_50 = working[hpfi_col].quantile(0.50)
-    hpfi_75 = working[hpfi_col].quantile(0.75)
-    k12_median = working['k12_pop'].median()
-    
-    def classify_marketing_zone(row):
-        edi = row[edi_col]
-        hpfi = row[hpfi_col]
-        k12 = row['k12_pop']
-        
-        # Premium Growth: High HPFI + Moderate EDI + Good K12 population
-        if hpfi >= hpfi_75 and edi_25 <= edi <= edi_75 and k12 >= k12_median:
-            return 'Premium Growth Target'
-        
-        # Established Markets: High HPFI + Low EDI (already well-served but affluent)
-        elif hpfi >= hpfi_75 and edi < edi_25:
-            return 'Established Market'
-        
-        # Emerging Opportunity: Medium HPFI + Moderate EDI
-        elif hpfi >= hpfi_50 and edi_25 <= edi <= edi_75:
-            return 'Emerging Opportunity'
-        
-        # Foundation Building: Everything else
-        else:
-            return 'Foundation Building'
-    
-    working['marketing_zone'] = working.apply(classify_marketing_zone, axis=1)
+    # Thresholds and zone rules come from the "marketing_zone" rule table (scoring_rules)
+    table = (rules or load_rule_tables())["marketing_zone"]
+    working['marketing_zone'], thresholds = classify(working, table, columns={"EDI": edi_col, "hpfi": hpfi_col})
     
     # Store thresholds as metadata
-    working['_edi_25_threshold'] = edi_25
-    working['_edi_75_threshold'] = edi_75
-    working['_hpfi_50_threshold'] = hpfi_50
-    working['_hpfi_75_threshold'] = hpfi_75
-    working['_k12_median'] = k12_median
+    for name, value in thresholds.items():
+        working[f'_{name}_threshold'] = value
     
     return working
 
 
+def zone_threshold(zone_df: pd.DataFrame, name: str, default: float = 0.0) -> float:
+    """Resolved rule-table threshold stored on a zone frame (default when absent)."""
+    column = f'_{name}_threshold'
+    if zone_df.empty or column not in zone_df.columns:
+        return default
+    return float(zone_df[column].iloc[0])
+
+
 def ensure_block_group_id(df: pd.DataFrame) -> pd.DataFrame:
     """Guarantee presence of a string ``block_group_id`` column for stable merges."""
 
@@ -598,28 +475,22 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-def compute_hpfi_scores(df: pd.DataFrame, edi_col: str = "EDI", weights: Dict[str, float] | None = None) -> pd.DataFrame:
-    """Attach High-Potential Family Index (0-1) to the provided DataFrame.
-    
-    Tuned to prioritize tuition-paying potential through higher income weighting,
-    inverse poverty signal, and proximity to CCA campuses to support growth strategy.
-    """
+def hpfi_components(
+    df: pd.DataFrame,
+    edi_col: str = "EDI",
+    distance_backend=None,
+    campus_index: CampusDistanceIndex | None = None,
+) -> pd.DataFrame:
+    """Normalized HPFI component columns (HPFI_COMPONENTS) plus hpfi_anchor_km, aligned to df.
 
-    def normalise(series: pd.Series) -> pd.Series:
-        series = pd.to_numeric(series, errors="coerce")
-        if series.nunique(dropna=True) <= 1:
-            return pd.Series(0.5, index=series.index)
-        scaled = MinMaxScaler().fit_transform(series.to_frame()).flatten()
-        return pd.Series(scaled, index=series.index)
+    Proximity is scored against the registry's HPFI anchor sites (see
+    campus_registry). Distances come from campus_index when given (an index
+    over campus_frame(role=HPFI_ANCHOR)); otherwise they are computed for this
+    frame, along the road network when distance_backend is given, else
+    straight-line km.
+    """
 
-    working = df.copy()
-    
-    # CCA Campus locations
-    cca_campuses = pd.DataFrame({
-        'name': ['West Oak Lane', 'Hunting Park'],
-        'lat': [40.056339, 40.015278],
-        'lon': [-75.153858, -75.138889]
-    })
+    working = df
 
     candidate_names = []
     if isinstance(edi_col, str):
@@ -643,60 +514,48 @@ def compute_hpfi_scores(df: pd.DataFrame, edi_col: str = "EDI", weights: Dict[st
             edi_series = edi_series.reindex(range(len(working.index)))
         edi_series.index = working.index
 
-    income_norm = normalise(working.get("income"))
-    k12_norm = normalise(working.get("k12_pop"))
-
-    # Inverse poverty as additional tuition-potential signal
-    poverty_series = pd.to_numeric(working.get("poverty_rate"), errors="coerce").fillna(0)
-    inverse_poverty = 1.0 - (poverty_series / 100.0).clip(lower=0.0, upper=1.0)
-    inverse_poverty_norm = normalise(pd.Series(inverse_poverty, index=working.index))
-
-    edi_values = pd.to_numeric(edi_series, errors="coerce").fillna(0.0)
-    inverse_edi = 1.0 - (edi_values / 100.0).clip(lower=0.0, upper=1.0)
-    
-    # Campus proximity score (closer = higher HPFI)
-    proximity_scores = []
-    for _, row in working.iterrows():
-        if pd.notna(row.get('lat')) and pd.notna(row.get('lon')):
-            min_dist = min([
-                haversine_km(row['lat'], row['lon'], campus['lat'], campus['lon'])
-                for _, campus in cca_campuses.iterrows()
-            ])
-            # Convert to score: 0km=1.0, 20km=0.0, exponential decay
-            proximity_score = np.exp(-min_dist / 8.0)  # 8km half-life
-        else:
-            proximity_score = 0.0
-        proximity_scores.append(proximity_score)
-    
-    proximity_norm = normalise(pd.Series(proximity_scores, index=working.index))
-
-    # Christian % as mission alignment signal (now with block-level variation)
-    christian_series = pd.to_numeric(working.get('%Christian'), errors='coerce').fillna(36.3)
-    # Normalize to 0-1 scale (36.3% min, 47.5% max based on church density)
-    christian_norm = normalise(christian_series)
-
-    # Allow dynamic weights from session state or fallback to defaults
-    if weights is None:
-        weights = {
-            "income": 0.45,           # Primary tuition signal
-            "inverse_poverty": 0.18,  # Economic stability
-            "proximity": 0.13,        # Distance to CCA campuses
-            "christian": 0.12,        # Mission alignment
-            "k12": 0.09,              # Market size
-            "inverse_edi": 0.03,      # Low competition signal
-        }
-
-    hpfi = (
-        weights.get('income', 0.45) * income_norm +
-        weights.get('inverse_poverty', 0.18) * inverse_poverty_norm +
-        weights.get('proximity', 0.13) * proximity_norm +
-        weights.get('christian', 0.12) * christian_norm +
-        weights.get('k12', 0.09) * k12_norm +
-        weights.get('inverse_edi', 0.03) * inverse_edi
+    def column(name: str) -> np.ndarray:
+        if name not in working.columns:
+            return np.full(len(working), np.nan)
+        return pd.to_numeric(working[name], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+    # Campus proximity score (closer = higher HPFI): exp(-km / 8), missing or unreachable -> 0
+    if campus_index is None:
+        campus_index = CampusDistanceIndex.from_frame(working, campus_frame(role=HPFI_ANCHOR), distance_backend)
+    nearest_km = campus_index.nearest_km(working)
+
+    components = hpfi_component_arrays(
+        income=column("income"),
+        poverty_rate=column("poverty_rate"),
+        k12_pop=column("k12_pop"),
+        edi=pd.to_numeric(edi_series, errors="coerce").to_numpy(dtype=float, na_value=np.nan),
+        proximity=campus_proximity_score(nearest_km),
+        christian=column("%Christian"),
     )
+    frame = pd.DataFrame({name: values[0] for name, values in components.items()}, index=working.index)
+    frame["hpfi_anchor_km"] = np.where(np.isfinite(nearest_km), nearest_km, np.nan)
+    return frame
+
+
+def compute_hpfi_scores(
+    df: pd.DataFrame,
+    edi_col: str = "EDI",
+    weights: Dict[str, float] | None = None,
+    distance_backend=None,
+    campus_index: CampusDistanceIndex | None = None,
+) -> pd.DataFrame:
+    """Attach High-Potential Family Index (0-1) to the provided DataFrame.
+    
+    Tuned to prioritize tuition-paying potential through higher income weighting,
+    inverse poverty signal, and proximity to CCA campuses to support growth strategy.
+    Components come from hpfi_components().
+    """
+    working = df.copy()
+    components = hpfi_components(working, edi_col, distance_backend, campus_index)
 
-    working["hpfi"] = hpfi.clip(0.0, 1.0)
-    working["nearest_campus_km"] = proximity_scores  # Store for reference
+    # Sidebar weights (hpfi_income, ...) or component names; unset components use HPFI_DEFAULT_WEIGHTS
+    working["hpfi"] = blend_hpfi(components, weights)
+    working["hpfi_anchor_km"] = components["hpfi_anchor_km"]
     return working
 
 @st.cache_data(ttl=3600)  # Cache for 1 hour, then reload
@@ -704,8 +563,9 @@ def load_block_group_data():
     """Load block group geometries and enrich demographics with modeled ACS enrollment."""
 
     try:
-        gdf = gpd.read_file('philadelphia_block_groups.geojson')
-        demographics = pd.read_csv('demographics_block_groups.csv')
+        # GeoParquet/Feather snapshot when it matches the GeoJSON/CSV by content (see data_snapshot)
+        gdf, demographics, frames_source = load_block_group_frames()
+        print(f"[QA] Block group geometry and demographics read from {frames_source}.")
     except Exception as exc:
         st.error(f"Error loading block group data: {exc}")
         st.info("Please run fetch_block_groups.py first to download Census block group data")
@@ -717,10 +577,9 @@ def load_block_group_data():
     gdf['GEOID'] = gdf['GEOID'].astype(str)
     demographics['block_group_id'] = demographics['block_group_id'].astype(str)
 
-    sentinel_cols = ['income', 'poverty_rate', 'total_pop', 'pct_black', 'pct_white', 'hh_with_u18', '%Christian']
-    for col in sentinel_cols:
+    for col in SENTINEL_COLUMNS:
         if col in demographics.columns:
-            demographics[col] = demographics[col].replace(-666666666, pd.NA)
+            demographics[col] = demographics[col].replace(ACS_SENTINEL, pd.NA)
             demographics[col] = pd.to_numeric(demographics[col], errors='coerce')
 
     if 'TRACTCE' in demographics.columns:
@@ -732,9 +591,21 @@ def load_block_group_data():
     else:
         demographics['k12_pop_legacy'] = pd.NA
 
+    def optional_moe():
+        try:
+            return fetch_block_group_moe_data()
+        except Exception as exc:
+            return exc
+
+    # The three ACS tables are independent: fetch (or read from the disk cache) concurrently
     try:
-        bg_age_df, bg_meta = fetch_block_group_age_data()
-        tract_enrollment_df, tract_meta = fetch_tract_enrollment_data()
+        acs_tables = acs_client().gather({
+            'bg_age': fetch_block_group_age_data,
+            'tract_enrollment': fetch_tract_enrollment_data,
+            'bg_moe': optional_moe,
+        }, wrap=with_script_run_context)
+        bg_age_df, bg_meta = acs_tables['bg_age']
+        tract_enrollment_df, tract_meta = acs_tables['tract_enrollment']
     except Exception as exc:
         raise RuntimeError(
             "Unable to retrieve ACS 2023 B01001/S1401 data. Provide a valid CENSUS_API_KEY and internet access."
@@ -749,6 +620,8 @@ def load_block_group_data():
     demographics['tract_rate_k12'] = demographics['tract_rate_k12'].fillna(0)
     demographics['bg_enrolled_k12'] = (demographics['bg_age_5_17'] * demographics['tract_rate_k12']).clip(lower=0)
     demographics['k12_pop'] = demographics['bg_enrolled_k12'].round(0)
+    # Tract enrollment rate treated as fixed: K-12 MOE scales with the age-count MOE
+    demographics['k12_pop_moe'] = demographics['bg_age_5_17_moe'].fillna(0) * demographics['tract_rate_k12']
     demographics['is_modeled'] = True
     demographics['k12_imputed'] = False
 
@@ -756,6 +629,15 @@ def load_block_group_data():
         demographics.loc[missing_mask, 'k12_pop'] = 0
         demographics.loc[missing_mask, 'k12_imputed'] = True
 
+    # Income / poverty MOEs only feed the uncertainty panel, so they are optional
+    if isinstance(acs_tables['bg_moe'], Exception):
+        print(f"[QA] ACS income/poverty MOEs unavailable ({acs_tables['bg_moe']}); uncertainty bands cover K-12 only.")
+    else:
+        bg_moe_df, _ = acs_tables['bg_moe']
+        demographics = demographics.merge(
+            bg_moe_df[['block_group_id', 'income_moe', 'poverty_rate_moe']], on='block_group_id', how='left'
+        )
+
     demos_summary = {
         'block_groups': len(demographics),
         'k12_total': float(demographics['k12_pop'].sum()),
@@ -783,6 +665,234 @@ def load_block_group_data():
     demographics = compute_legitimate_flag_module(demographics)
     return gdf, demographics, demos_summary
 
+EDI_INPUT_COLUMNS = ['block_group_id', 'lat', 'lon', 'k12_pop', 'poverty_rate', 'pct_lt_hs', 'broadband_pct']
+UNCERTAINTY_INPUT_COLUMNS = EDI_INPUT_COLUMNS + [
+    'income', '%Christian', 'k12_pop_moe', 'poverty_rate_moe', 'income_moe',
+]
+
+
+@st.cache_data(show_spinner=False)
+def compute_edi_components_cached(
+    demographics_for_edi: pd.DataFrame,
+    edi_supply_df: pd.DataFrame,
+    catchment_km: float,
+    decay_type: str,
+    decay_param: float,
+    accessibility_model: str = '2sfca',
+    network_key: str | None = None,
+    _distance_backend: NetworkDistanceBackend | None = None,
+) -> pd.DataFrame:
+    """Stage one of the EDI (distances, decay, 2SFCA ratios), cached across reruns.
+
+    Only the input frames, decay/catchment settings, accessibility model and road
+    network fingerprint (``network_key``) key this cache; the EDI weight sliders are
+    applied afterwards with ``combine_edi_components``.
+    """
+    return compute_edi_components(
+        demographics_for_edi, edi_supply_df,
+        catchment_km=catchment_km, beta_km=decay_param, decay_type=decay_type, decay_param=decay_param,
+        engine='sparse',
+        distance_cache_dir=DATA_CACHE_DIR,
+        model=accessibility_model,
+        distance_backend=_distance_backend,
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def load_campus_index(
+    bg_coords: pd.DataFrame,
+    network_key: str | None = None,
+    _distance_backend: NetworkDistanceBackend | None = None,
+    role: str = OPERATING,
+) -> CampusDistanceIndex:
+    """Block group x CCA campus distance matrix for the registry campuses with role, shared by their consumers."""
+    return CampusDistanceIndex.from_frame(bg_coords, campus_frame(role=role), _distance_backend)
+
+
+@st.cache_resource(show_spinner=False)
+def load_filter_engine(filter_frame: pd.DataFrame) -> FilterEngine:
+    """FilterEngine over the block-group rows, reused (with its cached masks and range indexes) per data version"""
+    return FilterEngine(filter_frame)
+
+
+@st.cache_resource(show_spinner="Loading road network...")
+def load_distance_backend(network_path: str) -> NetworkDistanceBackend:
+    """Road-network distance backend shared by all sessions (travel costs in km)."""
+    return NetworkDistanceBackend(RoadNetwork.load(network_path), cache_dir=DATA_CACHE_DIR)
+
+
+@st.cache_data(show_spinner=False)
+def run_edi_sweep_cached(
+    demographics_for_edi: pd.DataFrame,
+    edi_supply_df: pd.DataFrame,
+    default_decay_type: str,
+    default_decay_param: float,
+    default_catchment_km: float,
+    comp_weights: Tuple[float, float, float, float],
+    accessibility_model: str = '2sfca',
+):
+    """Batched EDI parameter sweep around the current sidebar settings (cached)."""
+    return sweep_edi_parameters(
+        demographics_for_edi, edi_supply_df,
+        beta_kms=tuple(sorted({2.5, 5.0, 7.5, 10.0, float(default_decay_param)})),
+        catchment_kms=tuple(sorted({10.0, 15.0, 20.0, float(default_catchment_km)})),
+        default_setting=(default_decay_type, default_decay_param, default_catchment_km),
+        comp_weights=comp_weights,
+        distance_cache_dir=DATA_CACHE_DIR,
+        model=accessibility_model,
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def load_what_if_engine(
+    demographics_for_edi: pd.DataFrame,
+    edi_supply_df: pd.DataFrame,
+    catchment_km: float,
+    decay_type: str,
+    decay_param: float,
+    accessibility_model: str = '2sfca',
+    network_key: str | None = None,
+    _distance_backend: NetworkDistanceBackend | None = None,
+) -> EDIWhatIf:
+    """Incremental what-if engine for the current EDI setup (previews never mutate it)."""
+    return EDIWhatIf(
+        demographics_for_edi, edi_supply_df,
+        catchment_km=catchment_km, beta_km=decay_param, decay_type=decay_type, decay_param=decay_param,
+        model=accessibility_model,
+        distance_cache_dir=DATA_CACHE_DIR,
+        distance_backend=_distance_backend,
+    )
+
+
+@st.cache_resource(show_spinner="Computing polygon overlaps...")
+def load_areal_aggregator(layer_path: str, layer_mtime: float, _block_group_gdf) -> ArealAggregator:
+    """Block-group -> polygon overlap weights for one boundary file (disk-cached as .npz)."""
+    layer, id_col = load_polygon_layer(layer_path)
+    source = _block_group_gdf[['GEOID', 'geometry']].copy()
+    source['GEOID'] = source['GEOID'].astype(str)
+    return ArealAggregator.from_layers(source, layer, source_id_col='GEOID', target_id_col=id_col, cache_dir=DATA_CACHE_DIR)
+
+
+@st.cache_data(show_spinner=False)
+def run_uncertainty_cached(
+    demographics_for_mc: pd.DataFrame,
+    campus_proximity: np.ndarray,
+    edi_supply_df: pd.DataFrame,
+    catchment_km: float,
+    decay_type: str,
+    decay_param: float,
+    accessibility_model: str,
+    comp_weights: Tuple[float, float, float, float],
+    hpfi_weights_items: tuple | None,
+    n_draws: int,
+):
+    """Monte Carlo EDI/HPFI bands from ACS MOEs (cached per settings and draw count)."""
+    return run_edi_hpfi_monte_carlo(
+        demographics_for_mc, edi_supply_df,
+        n_draws=n_draws,
+        catchment_km=catchment_km, beta_km=decay_param, decay_type=decay_type, decay_param=decay_param,
+        comp_weights=comp_weights,
+        model=accessibility_model,
+        hpfi_weights=dict(hpfi_weights_items) if hpfi_weights_items else None,
+        campus_proximity=campus_proximity,
+        distance_cache_dir=DATA_CACHE_DIR,
+    )
+
+
+@st.cache_data(show_spinner=False)
+def run_site_selection_cached(
+    demographics_for_sites: pd.DataFrame,
+    competitor_df: pd.DataFrame,
+    existing_campuses: pd.DataFrame,
+    k: int,
+    radius_km: float,
+    network_key: str | None = None,
+    _distance_backend: NetworkDistanceBackend | None = None,
+):
+    """Lazy-greedy campus site selection (cached per inputs, k and radius)."""
+    return select_campus_sites(
+        demographics_for_sites,
+        k=k,
+        radius_km=radius_km,
+        competitor_df=competitor_df,
+        existing_sites_df=existing_campuses,
+        distance_backend=_distance_backend,
+    )
+
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def load_acs_vintage(year: str) -> pd.DataFrame:
+    """One ACS 5-year vintage's EDI/HPFI demographics (k12_pop, poverty_rate, income) per block group."""
+    acs_tables = acs_client().gather({
+        'bg_age': partial(fetch_block_group_age_data, year),
+        'tract_enrollment': partial(fetch_tract_enrollment_data, year),
+        'bg_moe': partial(fetch_block_group_moe_data, year),
+    }, wrap=with_script_run_context)
+    bg_age_df, _ = acs_tables['bg_age']
+    tract_enrollment_df, _ = acs_tables['tract_enrollment']
+    bg_moe_df, _ = acs_tables['bg_moe']
+
+    vintage = bg_age_df[['block_group_id', 'bg_age_5_17']].copy()
+    vintage['tract_id'] = vintage['block_group_id'].str.slice(0, 11)
+    vintage = vintage.merge(tract_enrollment_df[['tract_id', 'tract_rate_k12']], on='tract_id', how='left')
+    vintage['k12_pop'] = (vintage['bg_age_5_17'].fillna(0) * vintage['tract_rate_k12'].fillna(0)).clip(lower=0).round(0)
+    vintage = vintage.merge(bg_moe_df, on='block_group_id', how='left')
+    vintage['income'] = vintage['median_income_est']
+    vintage['poverty_rate'] = vintage['poverty_rate_est']
+    vintage = vintage[['block_group_id', 'k12_pop', 'poverty_rate', 'income', 'poverty_universe']]
+
+    if int(year) < 2020:
+        # 2010 block groups: re-express on 2020 geography, rates weighted by the poverty universe
+        crosswalk_path = find_crosswalk(CROSSWALK_DIR)
+        if crosswalk_path is None:
+            raise FileNotFoundError(f"ACS {year} uses 2010 block groups; add a bg2010 -> bg2020 crosswalk to {CROSSWALK_DIR}")
+        crosswalk = load_crosswalk(crosswalk_path, cache_dir=DATA_CACHE_DIR)
+        vintage = crosswalk.convert(
+            vintage,
+            counts=['k12_pop', 'poverty_universe'],
+            rates={'poverty_rate': 'poverty_universe', 'income': 'poverty_universe'},
+        )
+        vintage['k12_pop'] = vintage['k12_pop'].round(0)
+    return vintage
+
+
+@st.cache_data(show_spinner=False)
+def build_edi_panel_cached(
+    demographics_for_panel: pd.DataFrame,
+    campus_proximity: np.ndarray,
+    edi_supply_df: pd.DataFrame,
+    years: Tuple[str, ...],
+    catchment_km: float,
+    decay_type: str,
+    decay_param: float,
+    accessibility_model: str,
+    comp_weights: Tuple[float, float, float, float],
+    hpfi_weights_items: tuple | None,
+) -> EDIPanel:
+    """EDI/HPFI for every selected ACS vintage on the shared geometry (cached per settings)."""
+    vintages = {year: load_acs_vintage(year) for year in years}
+    return build_edi_panel(
+        demographics_for_panel, vintages, edi_supply_df,
+        catchment_km=catchment_km, beta_km=decay_param, decay_type=decay_type, decay_param=decay_param,
+        comp_weights=comp_weights,
+        model=accessibility_model,
+        hpfi_weights=dict(hpfi_weights_items) if hpfi_weights_items else None,
+        campus_proximity=campus_proximity,
+        distance_cache_dir=DATA_CACHE_DIR,
+    )
+
+
+def edi_comp_weights() -> Tuple[float, float, float, float]:
+    """Current (access, ratio, need, infra) EDI weights from the sidebar sliders."""
+    edi_weights = st.session_state.get('edi_weights', {})
+    return (
+        edi_weights.get('edi_access', 0.40),
+        edi_weights.get('edi_ratio', 0.30),
+        edi_weights.get('edi_need', 0.20),
+        edi_weights.get('edi_infra', 0.10),
+    )
+
+
 @st.cache_data  
 def load_current_students():
     """Load current student overlay data (anonymized locations)."""
@@ -916,7 +1026,7 @@ def create_choropleth_map(
             'Emerging Opportunity': 2,
             'Foundation Building': 3
         }
-        z_vals = cleaned['marketing_zone'].map(zone_map).fillna(3).astype(int).values
+        z_vals = cleaned['marketing_zone'].astype(str).map(zone_map).fillna(3).astype(int).values
         colorscale = [
             [0.0, '#00B050'],     # Premium Growth - green
             [0.33, '#0070C0'],    # Established Market - blue
@@ -931,7 +1041,7 @@ def create_choropleth_map(
             'Affluent Opportunity Zone': 2,
             'Low Priority Zone': 3
         }
-        z_vals = cleaned['zone'].map(zone_map).fillna(3).astype(int).values
+        z_vals = cleaned['zone'].astype(str).map(zone_map).fillna(3).astype(int).values
         colorscale = [
             [0.0, '#00B050'],     # Golden Zone - green
             [0.33, '#FFC000'],    # Mission Zone - gold
@@ -1143,12 +1253,7 @@ def create_choropleth_map(
     )
     
     # Add CCA campus markers (yellow stars with address)
-    cca_campuses = pd.DataFrame({
-        'name': ['CCA Main Campus (58th St)', 'CCA Baltimore Ave Campus'],
-        'lat': [39.9386, 39.9508],
-        'lon': [-75.2312, -75.2085],
-        'address': ['1939 S. 58th St. Philadelphia, PA', '4109 Baltimore Ave Philadelphia, PA']
-    })
+    cca_campuses = campus_frame()
     
     fig.add_scattermapbox(
         lat=cca_campuses['lat'],
@@ -1295,113 +1400,166 @@ def create_choropleth_map(
     
     return fig
 
-def calculate_marketing_priority_bg(demographics_df, cca_campuses):
-    """Balanced marketing priority that favors nearby, high-need, high-potential communities."""
+def calculate_marketing_priority_bg(demographics_df, campus_index: CampusDistanceIndex | None = None, rules: dict | None = None):
+    """Balanced marketing priority that favors nearby, high-need, high-potential communities.
 
-    marketing_scores = []
+    Points per band (campus distance, HPFI, EDI, K-12 size, faith alignment) come
+    from the "marketing_priority" rule table in scoring_rules.
+    """
 
-    for _, bg in demographics_df.iterrows():
-        score = 0
+    if campus_index is None:
+        campus_index = CampusDistanceIndex.from_frame(demographics_df)
+    # Distance to nearest campus (access & operational feasibility); unknown scores no distance points
+    nearest_km = campus_index.nearest_km(demographics_df)
+    scoring_frame = demographics_df.assign(nearest_campus_km=np.where(np.isfinite(nearest_km), nearest_km, np.nan))
+    table = (rules or load_rule_tables())["marketing_priority"]
+    return score_points(scoring_frame, table).astype(int)
 
-        # Distance to nearest campus (access & operational feasibility)
-        distances = [
-            haversine_km(bg['lat'], bg['lon'], campus['lat'], campus['lon'])
-            for _, campus in cca_campuses.iterrows()
-            if pd.notna(bg.get('lat')) and pd.notna(bg.get('lon'))
-        ]
-        min_distance = min(distances) if distances else 50
-        if min_distance <= 5:
-            score += 3
-        elif min_distance <= 10:
-            score += 2
-        elif min_distance <= 15:
-            score += 1
-
-        # High-Potential Family Index (economic capacity component)
-        hpfi = bg.get('hpfi', np.nan)
-        if pd.notna(hpfi):
-            if hpfi >= 0.65:
-                score += 2
-            elif hpfi >= 0.5:
-                score += 1
-
-        # Educational Desert Index (higher = greater unmet need)
-        edi = bg.get('EDI', np.nan)
-        if pd.notna(edi):
-            if edi >= 60:
-                score += 3
-            elif edi >= 45:
-                score += 2
-            elif edi >= 30:
-                score += 1
-
-        # Market size (school-age population)
-        k12_pop = bg.get('k12_pop', 0)
-        if k12_pop >= 250:
-            score += 2
-        elif k12_pop >= 125:
-            score += 1
-
-        # Faith alignment as optional tie-breaker
-        christian_pct = bg.get('%Christian', np.nan)
-        if pd.notna(christian_pct) and christian_pct >= 40:
-            score += 1
-
-        marketing_scores.append(score)
-
-    return marketing_scores
-
-
-def compute_student_proximity_norm(demos: pd.DataFrame, students_df: pd.DataFrame, radius_km: float = 5.0) -> pd.Series:
-    """Compute normalized proximity score based on counts of students within radius_km of block-group centroid.
+
+def compute_student_proximity_norm(
+    demos: pd.DataFrame,
+    students_df: pd.DataFrame,
+    radius_km: float = 5.0,
+    kernel: str = "count",
+    bandwidth_km: float | None = None,
+) -> pd.Series:
+    """Compute normalized proximity score based on students near each block-group centroid.
+
+    kernel="count" counts students within radius_km; "gaussian" / "epanechnikov"
+    weight them by distance (see student_density). The roster BallTree is cached
+    per roster version.
 
     Returns series with values 0-1 (higher = more nearby students).
     """
     if students_df is None or students_df.empty:
         return pd.Series(0.0, index=demos.index)
-    students = students_df.copy()
-    students['lat'] = pd.to_numeric(students.get('lat'), errors='coerce')
-    students['lon'] = pd.to_numeric(students.get('lon'), errors='coerce')
-    students = students.dropna(subset=['lat', 'lon'])
-    counts = []
-    for _, row in demos.iterrows():
-        if pd.isna(row.get('lat')) or pd.isna(row.get('lon')):
-            counts.append(0)
-            continue
-        dists = [haversine_km(row['lat'], row['lon'], lat, lon) for lat, lon in zip(students['lat'], students['lon'])]
-        counts.append(sum(1 for d in dists if d <= radius_km))
-    return normalise_series(pd.Series(counts, index=demos.index))
-
-
-def compute_recruitment_heat_index(demos: pd.DataFrame, weights: Dict[str, float], students_df: pd.DataFrame = None) -> pd.Series:
+    density = student_index(students_df).density(
+        demos.get('lat'), demos.get('lon'), radius_km=radius_km, kernel=kernel, bandwidth_km=bandwidth_km,
+    )
+    return normalise_series(pd.Series(density, index=demos.index))
+
+
+def rhi_components(
+    demos: pd.DataFrame,
+    students_df: pd.DataFrame = None,
+    student_kernel: str = "count",
+) -> pd.DataFrame:
+    """Normalized RHI component columns (RHI_COMPONENTS), aligned to demos"""
+    # Ensure normalized fields exist
+    missing = pd.Series(0.0, index=demos.index)
+    return pd.DataFrame({
+        'premium': (demos.get('marketing_zone') == 'Premium Growth Target').astype(float),
+        'transit': demos.get('transit_norm', missing).fillna(0.0),
+        'crime': demos.get('crime_norm', missing).fillna(0.0),
+        'vacancy': demos.get('vacancy_norm', missing).fillna(0.0),
+        'gini': demos.get('gini_norm', missing).fillna(0.0),
+        # student proximity normalized score
+        'student_proximity': compute_student_proximity_norm(demos, students_df, kernel=student_kernel),
+        'faith': demos.get('faith_norm', missing).fillna(0.0),
+    }, index=demos.index)
+
+
+def compute_recruitment_heat_index(
+    demos: pd.DataFrame,
+    weights: Dict[str, float],
+    students_df: pd.DataFrame = None,
+    student_kernel: str = "count",
+) -> pd.Series:
     """Compute Recruitment Heat Index (0-100) per block group.
-    Uses normalized component scores and a weighting profile.
+    Uses normalized component scores (rhi_components) and a weighting profile.
     """
-    df = demos.copy()
-    # Ensure normalized fields exist
-    df['premium_flag'] = (df.get('marketing_zone') == 'Premium Growth Target').astype(float)
-    df['transit_norm'] = df.get('transit_norm', 0.0).fillna(0.0)
-    df['crime_norm'] = df.get('crime_norm', 0.0).fillna(0.0)
-    df['vacancy_norm'] = df.get('vacancy_norm', 0.0).fillna(0.0)
-    df['gini_norm'] = df.get('gini_norm', 0.0).fillna(0.0)
-    df['faith_norm'] = df.get('faith_norm', 0.0).fillna(0.0)
-    # student proximity normalized score
-    df['student_proximity_norm'] = compute_student_proximity_norm(df, students_df)
-
-    rhi_numer = (
-        weights.get('rhi_premium', 0) * df['premium_flag'] +
-        weights.get('rhi_transit', 0) * df['transit_norm'] +
-        weights.get('rhi_crime', 0) * df['crime_norm'] +
-        weights.get('rhi_vacancy', 0) * df['vacancy_norm'] +
-        weights.get('rhi_gini', 0) * df['gini_norm'] +
-        weights.get('rhi_student_proximity', 0) * df['student_proximity_norm'] +
-        weights.get('rhi_faith', 0) * df['faith_norm']
-    )
+    components = rhi_components(demos, students_df, student_kernel)
+    rhi_numer = sum(weights.get(f'rhi_{name}', 0) * components[name] for name in RHI_COMPONENTS)
     denom = sum(weights.get(k, 0) for k in weights if k.startswith('rhi_'))
     denom = denom if denom > 0 else 1.0
     rhi_score = (rhi_numer / denom).clip(0, 1)
     return (rhi_score * 100).round(2)
 
+def build_score_graph(cache: dict, stats: dict) -> ScoreGraph:
+    """Dashboard score pipeline as a memoized dependency graph (see score_graph).
+
+    Every node returns values aligned to the ``base`` block-group frame; results
+    are shared with later reruns through ``cache`` and must not be mutated.
+    """
+    graph = ScoreGraph(cache=cache, stats=stats)
+
+    @graph.node("edi", inputs=(
+        "base", "edi_supply", "catchment_km", "decay_type", "decay_param", "accessibility_model",
+        "comp_weights", "network_key", "_distance_backend",
+    ))
+    def edi_node(base, edi_supply, catchment_km, decay_type, decay_param, accessibility_model,
+                 comp_weights, network_key, _distance_backend):
+        edi = pd.Series(0.0, index=base.index)
+        if edi_supply.empty:
+            return edi
+        demographics_for_edi = base[(base['total_pop'] > 0) & (base.get('is_legit', False) == True)]
+        if demographics_for_edi.empty:
+            return edi
+        with st.spinner("Calculating Educational Desert Index across all block groups..."):
+            edi_input_cols = [col for col in EDI_INPUT_COLUMNS if col in demographics_for_edi.columns]
+            edi_components_df = compute_edi_components_cached(
+                demographics_for_edi[edi_input_cols], edi_supply,
+                catchment_km, decay_type, decay_param, accessibility_model,
+                network_key, _distance_backend,
+            )
+            # Weight sliders only re-blend the cached components
+            edi_full_df = combine_edi_components(edi_components_df, comp_weights)
+        by_id = edi_full_df.drop_duplicates('block_group_id').set_index('block_group_id')['EDI']
+        return base['block_group_id'].map(by_id).fillna(0.0)
+
+    @graph.node("campus_distance", inputs=("base", "network_key", "_proximity_index"))
+    def campus_distance_node(base, network_key, _proximity_index):
+        nearest_km = _proximity_index.nearest_km(base)
+        return pd.Series(np.where(np.isfinite(nearest_km), nearest_km, np.nan), index=base.index)
+
+    @graph.node("hpfi", deps=("edi",), inputs=("base", "hpfi_weights", "network_key", "_hpfi_anchor_index"))
+    def hpfi_node(edi, base, hpfi_weights, network_key, _hpfi_anchor_index):
+        # Compute HPFI only on legitimate rows (presentation mode compliance)
+        hpfi = pd.Series(np.nan, index=base.index)
+        try:
+            hpfi_df = base.assign(EDI=edi)[base['is_legit'] == True]
+            if not hpfi_df.empty:
+                hpfi_df = compute_hpfi_scores(hpfi_df, edi_col="EDI", weights=hpfi_weights, campus_index=_hpfi_anchor_index)
+                hpfi.loc[hpfi_df.index] = hpfi_df['hpfi'].values
+        except Exception:
+            hpfi[:] = 0.0
+        return hpfi
+
+    @graph.node("zones", deps=("edi", "hpfi"), inputs=("base", "rule_tables"))
+    def zones_node(edi, hpfi, base, rule_tables):
+        zone_df = compute_edi_hpfi_zones(
+            base[['block_group_id']].assign(EDI=edi, hpfi=hpfi), edi_col="EDI", hpfi_col="hpfi", rules=rule_tables,
+        )
+        return zone_df.drop(columns=['EDI', 'hpfi'])
+
+    @graph.node("marketing_zones", deps=("edi", "hpfi"), inputs=("base", "rule_tables"))
+    def marketing_zones_node(edi, hpfi, base, rule_tables):
+        zone_df = compute_marketing_zones(
+            base[['block_group_id', 'k12_pop']].assign(EDI=edi, hpfi=hpfi), edi_col="EDI", hpfi_col="hpfi", rules=rule_tables,
+        )
+        return zone_df.drop(columns=['EDI', 'hpfi', 'k12_pop'])
+
+    @graph.node("marketing_priority", deps=("edi", "hpfi"), inputs=("base", "rule_tables", "network_key", "_proximity_index"))
+    def marketing_priority_node(edi, hpfi, base, rule_tables, network_key, _proximity_index):
+        # Campus-distance bands use the same (road or straight-line) km as nearest_campus_km
+        return calculate_marketing_priority_bg(base.assign(EDI=edi, hpfi=hpfi), _proximity_index, rule_tables)
+
+    @graph.node("rhi", deps=("marketing_zones",), inputs=("base", "rhi_weights", "students", "student_kernel"))
+    def rhi_node(marketing_zones, base, rhi_weights, students, student_kernel):
+        # Compute RHI only for legitimate rows
+        rhi = pd.Series(np.nan, index=base.index)
+        try:
+            rhi_df = base.assign(marketing_zone=marketing_zones['marketing_zone'])[base['is_legit'] == True]
+            rhi.loc[rhi_df.index] = compute_recruitment_heat_index(
+                rhi_df, rhi_weights, students, student_kernel=student_kernel,
+            ).values
+        except Exception:
+            pass
+        return rhi
+
+    return graph
+
+
 # Main app
 def main():
     st.title("� Cornerstone Christian Academy Growth Opportunity Explorer")
@@ -1621,23 +1779,19 @@ def main():
         show_premium_only = st.checkbox("Show Premium Growth Targets Only", value=False, help="Filter map to Premium Growth Targets (HPFI & moderate EDI)")
         premium_top_n = st.selectbox("Top N Premium Targets", options=["All", 50, 100], index=0)
     
-    # CCA Campus locations
-    cca_campuses = pd.DataFrame({
-        'name': ['CCA Main Campus (58th St)', 'CCA Baltimore Ave Campus'],
-        'lat': [39.9386, 39.9508],
-        'lon': [-75.2312, -75.2085],
-        'address': ['1939 S. 58th St. Philadelphia, PA', '4109 Baltimore Ave Philadelphia, PA']
-    })
-    
-    # Filter demographics by distance
-    def is_within_distance(row):
-        for _, campus in cca_campuses.iterrows():
-            dist = haversine_km(row['lat'], row['lon'], campus['lat'], campus['lon'])
-            if dist <= max_distance:
-                return True
-        return False
-    
-    demographics_filtered = demographics[demographics.apply(is_within_distance, axis=1)]
+    # CCA campuses (campus_registry) and straight-line block group -> campus distances, computed once per data load
+    campus_index = load_campus_index(demographics[['block_group_id', 'lat', 'lon']])
+    cca_campuses = campus_index.campuses
+    # Road-network distances are opt-in from the Refinement Options sidebar
+    distance_backend = None
+    network_key = None
+
+    # Sidebar filters are masks over the rows of demographics (filter_engine); rows are taken once after the last filter
+    filter_engine = load_filter_engine(
+        demographics[[col for col in FILTER_COLUMNS if col in demographics.columns]]
+        .assign(nearest_campus_km=campus_index.nearest_km(demographics))
+    )
+    filter_mask = filter_engine.compare('nearest_campus_km', '<=', max_distance)
     
     # Optional live data refresh (Census API)
     census_api_key = get_census_api_key()
@@ -1654,15 +1808,15 @@ def main():
     
     highlight_hpfi = False
 
-    if not demographics_filtered.empty:
+    if filter_mask.any():
         # Income Filter
         with st.sidebar.expander("💰 **Income Targeting**", expanded=False):
-            income_series = pd.to_numeric(demographics_filtered['income'], errors='coerce').dropna()
-            if income_series.empty:
+            income_bounds = filter_engine.bounds('income', filter_mask)
+            if income_bounds is None:
                 income_floor, income_ceiling = 0, 250000
             else:
-                income_floor = int(income_series.min())
-                income_ceiling = int(income_series.max())
+                income_floor = int(income_bounds[0])
+                income_ceiling = int(income_bounds[1])
                 if income_floor == income_ceiling:
                     income_ceiling = income_floor + 1
 
@@ -1675,9 +1829,7 @@ def main():
                 format="$%d",
                 help="Target areas by economic capacity"
             )
-            demographics_filtered = demographics_filtered[
-                demographics_filtered['income'].between(income_range[0], income_range[1], inclusive="both")
-            ]
+            filter_mask = filter_mask & filter_engine.between('income', income_range[0], income_range[1])
             st.caption(f"✓ Showing incomes from ${income_range[0]:,} to ${income_range[1]:,}")
 
         # Map Layer Controls (moved earlier for clarity)
@@ -1804,9 +1956,9 @@ def main():
                 help="Removes parks, industrial zones with 0 population"
             )
             if hide_zero_pop:
-                before_count = len(demographics_filtered)
-                demographics_filtered = demographics_filtered[demographics_filtered['total_pop'] > 0].copy()
-                removed = before_count - len(demographics_filtered)
+                before_count = int(filter_mask.sum())
+                filter_mask = filter_mask & filter_engine.compare('total_pop', '>', 0)
+                removed = before_count - int(filter_mask.sum())
                 if removed > 0:
                     st.caption(f"✓ Filtered out {removed} non-residential blocks")
             
@@ -1817,29 +1969,26 @@ def main():
                 help="Focus exclusively on areas with school-age population"
             )
             if hide_zero_k12:
-                before_count = len(demographics_filtered)
-                demographics_filtered = demographics_filtered[demographics_filtered['k12_pop'] > 0].copy()
-                removed = before_count - len(demographics_filtered)
+                before_count = int(filter_mask.sum())
+                filter_mask = filter_mask & filter_engine.compare('k12_pop', '>', 0)
+                removed = before_count - int(filter_mask.sum())
                 if removed > 0:
                     st.caption(f"✓ Filtered out {removed} blocks with 0 K-12 children")
             
             # Poverty rate filter - now optional and off by default
             apply_poverty_filter = st.checkbox("Apply Economic Opportunity Filter", value=False)
             if apply_poverty_filter:
-                valid_poverty = demographics_filtered['poverty_rate'].dropna()
-                if len(valid_poverty) > 0:
+                poverty_bounds = filter_engine.bounds('poverty_rate', filter_mask)
+                if poverty_bounds is not None:
                     poverty_range = st.slider(
                         "Economic Stability Range (inverse poverty %)", 
-                        float(valid_poverty.min()), 
-                        float(valid_poverty.max()), 
-                        (float(valid_poverty.min()), float(valid_poverty.max())),
+                        poverty_bounds[0], 
+                        poverty_bounds[1], 
+                        poverty_bounds,
                         step=1.0,
                         help="Lower poverty rates may indicate greater economic capacity"
                     )
-                    demographics_filtered = demographics_filtered[
-                        (demographics_filtered['poverty_rate'] >= poverty_range[0]) &
-                        (demographics_filtered['poverty_rate'] <= poverty_range[1])
-                    ]
+                    filter_mask = filter_mask & filter_engine.between('poverty_rate', poverty_range[0], poverty_range[1])
                 else:
                     st.warning("No valid economic data available")
             # Decay options for EDI calculation (advanced)
@@ -1852,6 +2001,23 @@ def main():
             )
             decay_param = st.slider("Decay Parameter (km)", min_value=1.0, max_value=25.0, value=5.0, step=0.5, help="Beta or radius parameter for the selected decay function")
             catchment_km = st.slider("Catchment Radius (km)", min_value=5, max_value=50, value=15, step=1, help="Max distance to consider schools for EDI calculations")
+            accessibility_model = st.selectbox(
+                "Accessibility Model",
+                options=list(ACCESSIBILITY_MODELS.keys()),
+                index=0,
+                format_func=lambda name: f"{name.upper()} – {ACCESSIBILITY_MODELS[name].description}",
+                help="2SFCA variant used for the EDI access component. E2SFCA uses stepped distance zones (thirds of the catchment) instead of the decay function."
+            )
+            distance_backend = None
+            if network_available(ROAD_NETWORK_DIR):
+                use_road_network = st.checkbox(
+                    "Use road-network distances",
+                    value=False,
+                    help="Measure EDI catchments and campus proximity along the local road graph in data/network instead of straight-line distance (km of road)"
+                )
+                if use_road_network:
+                    distance_backend = load_distance_backend(str(ROAD_NETWORK_DIR))
+            network_key = distance_backend.network.fingerprint if distance_backend is not None else None
 
             # Include imputed/missing data toggle — default False to show only legitimate data
             if presentation_mode:
@@ -1864,7 +2030,7 @@ def main():
         
     else:
         st.info("📍 No block groups found within the specified radius. Try expanding your geographic scope.")
-        demographics_filtered = demographics.iloc[0:0]
+        filter_mask = np.zeros(filter_engine.n, dtype=bool)
         
     # Map Layer Controls are shown in the Geographic/Income filter section above
 
@@ -1935,6 +2101,13 @@ def main():
             for key in list(st.session_state['rhi_weights'].keys()):
                 label = key.replace('rhi_', '').replace('_', ' ').title()
                 st.session_state['rhi_weights'][key] = st.slider(label, 0.0, 1.0, float(st.session_state['rhi_weights'][key]), 0.01)
+            st.selectbox(
+                'Student proximity',
+                options=['count', 'gaussian', 'epanechnikov'],
+                format_func=lambda name: {'count': 'Count within 5 km', 'gaussian': 'Gaussian kernel', 'epanechnikov': 'Epanechnikov kernel'}[name],
+                key='student_kernel',
+                help="How students near a block group feed the RHI: a plain 5 km count or a distance-weighted kernel density",
+            )
         if st.button('Restore Default Weights'):
             st.session_state['hpfi_weights'] = {k: v for k, v in WEIGHT_DEFAULTS.items() if k.startswith('hpfi')}
             st.session_state['edi_weights'] = {k: v for k, v in WEIGHT_DEFAULTS.items() if k.startswith('edi')}
@@ -1974,82 +2147,73 @@ def main():
     )
 
     # Compute global EDI and HPFI before applying additional filters so scores remain comparable
-    demographics = ensure_block_group_id(demographics.copy())
+    demographics = ensure_block_group_id(demographics.copy()).reset_index(drop=True)
     # Ensure 'is_legit' is present and normalized
     if 'is_legit' not in demographics.columns:
         demographics = compute_legitimate_flag_module(demographics)
 
-    if not edi_supply_df.empty:
-        with st.spinner("Calculating Educational Desert Index across all block groups..."):
-            demographics_for_edi = demographics[(demographics['total_pop'] > 0) & (demographics.get('is_legit', False) == True)].copy()
-            if not demographics_for_edi.empty:
-                edi_full_df = compute_edi_block_groups(
-                    demographics_for_edi, edi_supply_df,
-                    catchment_km=catchment_km, beta_km=decay_param, decay_type=decay_type, decay_param=decay_param,
-                    comp_weights=(
-                        st.session_state.get('edi_weights', {}).get('edi_access', 0.40),
-                        st.session_state.get('edi_weights', {}).get('edi_ratio', 0.30),
-                        st.session_state.get('edi_weights', {}).get('edi_need', 0.20),
-                        st.session_state.get('edi_weights', {}).get('edi_infra', 0.10),
-                    )
-                )
-                demographics = demographics.drop(columns=['EDI'], errors='ignore')
-                demographics = demographics.merge(
-                    edi_full_df[['block_group_id', 'EDI']],
-                    on='block_group_id',
-                    how='left'
-                )
-                demographics['EDI'] = demographics['EDI'].fillna(0.0)
-            else:
-                demographics['EDI'] = 0.0
-    else:
-        demographics = demographics.drop(columns=['EDI'], errors='ignore')
-        demographics['EDI'] = 0.0
+    # Campus proximity follows the road network when it is enabled; nearest_campus_km holds real km (or road km)
+    proximity_index = campus_index
+    if distance_backend is not None:
+        proximity_index = load_campus_index(demographics[['block_group_id', 'lat', 'lon']], network_key, distance_backend)
+    # HPFI proximity is scored against the registry's HPFI anchor sites, not the operating campuses
+    hpfi_anchor_index = load_campus_index(
+        demographics[['block_group_id', 'lat', 'lon']], network_key, distance_backend, role=HPFI_ANCHOR,
+    )
 
-    demographics = demographics.drop(columns=['hpfi'], errors='ignore')
-    # Compute HPFI only on legitimate rows (presentation mode compliance)
-    try:
-        hpfi_df = demographics[demographics['is_legit'] == True].copy()
-        if not hpfi_df.empty:
-            hpfi_df = compute_hpfi_scores(hpfi_df, edi_col="EDI", weights=st.session_state.get('hpfi_weights'))
-            # Remove any existing hpfi column and merge back
-            demographics['hpfi'] = np.nan
-            demographics.loc[hpfi_df.index, 'hpfi'] = hpfi_df['hpfi'].values
-        else:
-            demographics['hpfi'] = np.nan
-    except Exception:
-        demographics['hpfi'] = 0.0
+    # Zone and priority rules: defaults in scoring_rules, overridable via data/scoring_rules.json
+    rule_tables = load_rule_tables()
+
+    # EDI -> HPFI -> zones -> marketing priority -> RHI; only nodes whose inputs changed are recomputed
+    score_graph = build_score_graph(
+        st.session_state.setdefault('score_graph_cache', {}),
+        st.session_state.setdefault('score_graph_stats', {}),
+    )
+    scores = score_graph.evaluate({
+        'base': demographics,
+        'edi_supply': edi_supply_df,
+        'catchment_km': catchment_km,
+        'decay_type': decay_type,
+        'decay_param': decay_param,
+        'accessibility_model': accessibility_model,
+        'comp_weights': edi_comp_weights(),
+        'network_key': network_key,
+        '_distance_backend': distance_backend,
+        '_proximity_index': proximity_index,
+        '_hpfi_anchor_index': hpfi_anchor_index,
+        'hpfi_weights': st.session_state.get('hpfi_weights'),
+        'rule_tables': rule_tables,
+        'rhi_weights': st.session_state.get('rhi_weights', {k: v for k, v in WEIGHT_DEFAULTS.items() if k.startswith('rhi')}),
+        'students': current_students,
+        'student_kernel': st.session_state.get('student_kernel', 'count'),
+    })
+
+    demographics['EDI'] = scores['edi']
+    demographics['nearest_campus_km'] = scores['campus_distance']
+    demographics['hpfi'] = scores['hpfi']
     hpfi_global_75 = float(demographics['hpfi'].quantile(0.75)) if not demographics['hpfi'].empty else 0.75
 
-    edi_zone_df = compute_edi_hpfi_zones(demographics, edi_col="EDI", hpfi_col="hpfi")
+    edi_zone_df = scores['zones']
     demographics['zone'] = edi_zone_df['zone']
-    global_edi_75 = float(edi_zone_df['_edi_75_threshold'].iloc[0]) if not edi_zone_df.empty else 0.0
+    global_edi_75 = zone_threshold(edi_zone_df, 'edi_75')
 
-    marketing_zone_df = compute_marketing_zones(demographics, edi_col="EDI", hpfi_col="hpfi")
+    marketing_zone_df = scores['marketing_zones']
     demographics['marketing_zone'] = marketing_zone_df['marketing_zone']
-    if not marketing_zone_df.empty:
-        marketing_edi_25 = float(marketing_zone_df['_edi_25_threshold'].iloc[0])
-        marketing_edi_75 = float(marketing_zone_df['_edi_75_threshold'].iloc[0])
-        marketing_hpfi_50 = float(marketing_zone_df['_hpfi_50_threshold'].iloc[0])
-        marketing_hpfi_75 = float(marketing_zone_df['_hpfi_75_threshold'].iloc[0])
-        marketing_k12_median = float(marketing_zone_df['_k12_median'].iloc[0])
-    else:
-        marketing_edi_25 = marketing_edi_75 = 0.0
-        marketing_hpfi_50 = marketing_hpfi_75 = 0.0
-        marketing_k12_median = 0.0
-
-    demographics['marketing_priority'] = calculate_marketing_priority_bg(demographics, cca_campuses)
-
-    # Compute Recruitment Heat Index (RHI)
-    try:
-        rhi_weights = st.session_state.get('rhi_weights', {k: v for k, v in WEIGHT_DEFAULTS.items() if k.startswith('rhi')})
-        # Compute RHI only for legitimate rows
-        rhi_df = demographics[demographics['is_legit'] == True].copy()
-        rhi_df['recruitment_heat_index'] = compute_recruitment_heat_index(rhi_df, rhi_weights, current_students)
-        demographics['recruitment_heat_index'] = np.nan
-        demographics.loc[rhi_df.index, 'recruitment_heat_index'] = rhi_df['recruitment_heat_index'].values
-    except Exception:
-        demographics['recruitment_heat_index'] = np.nan
+    marketing_edi_25 = zone_threshold(marketing_zone_df, 'edi_25')
+    marketing_edi_75 = zone_threshold(marketing_zone_df, 'edi_75')
+    marketing_hpfi_50 = zone_threshold(marketing_zone_df, 'hpfi_50')
+    marketing_hpfi_75 = zone_threshold(marketing_zone_df, 'hpfi_75')
+    marketing_k12_median = zone_threshold(marketing_zone_df, 'k12_median')
+
+    demographics['marketing_priority'] = scores['marketing_priority']
+    demographics['recruitment_heat_index'] = scores['rhi']
+
+    if not presentation_mode:
+        with st.sidebar.expander("🧮 Score Cache (debug)", expanded=False):
+            st.caption("Memoized score nodes: a hit reuses the last result because none of the node's inputs changed.")
+            st.dataframe(score_graph.stats_frame(), use_container_width=True, hide_index=True)
+            if st.button("Clear score cache", key="clear_score_cache"):
+                score_graph.clear()
 
     # Ensure expected metrics columns exist even if upstream calculations failed
     demographics = ensure_block_group_id(demographics)
@@ -2065,22 +2229,34 @@ def main():
         if col not in demographics.columns:
             demographics[col] = default
 
-    metrics_cols = ['block_group_id', 'EDI', 'hpfi', 'nearest_campus_km', 'zone', 'marketing_zone', 'marketing_priority']
-    metric_only_cols = [col for col in metrics_cols if col != 'block_group_id']
-    demographics_filtered = demographics_filtered.drop(columns=[col for col in metric_only_cols if col in demographics_filtered.columns], errors='ignore')
-
-    demographics_filtered = ensure_block_group_id(demographics_filtered)
-
-    demographics_filtered = demographics_filtered.merge(
-        demographics[metrics_cols],
-        on='block_group_id',
-        how='left'
-    )
     # Apply Premium Growth Target quick filter if enabled (use top-N if set)
     if 'show_premium_only' in locals() and show_premium_only:
-        demographics_filtered = demographics_filtered[demographics_filtered['marketing_zone'] == 'Premium Growth Target'].copy()
+        filter_mask = filter_mask & (demographics['marketing_zone'].astype(str).values == 'Premium Growth Target')
         if premium_top_n in (50, 100):
-            demographics_filtered = demographics_filtered.nlargest(premium_top_n, 'marketing_priority')
+            filter_mask = top_n_mask(filter_mask, demographics['marketing_priority'].values, premium_top_n)
+
+    # Exclude imputed/incomplete data unless user opts in
+    legit_removed = 0
+    try:
+        if not include_non_legit and 'is_legit' in demographics.columns:
+            before_count = int(filter_mask.sum())
+            filter_mask = filter_mask & filter_engine.compare('is_legit', '==', True)
+            legit_removed = before_count - int(filter_mask.sum())
+    except Exception:
+        pass
+
+    hpfi_threshold = None
+    if highlight_hpfi and filter_mask.any():
+        hpfi_values = pd.to_numeric(demographics['hpfi'], errors='coerce').values
+        if not np.isnan(hpfi_values[filter_mask]).all():
+            hpfi_threshold = hpfi_global_75
+            with np.errstate(invalid='ignore'):
+                filter_mask = filter_mask & (hpfi_values >= hpfi_threshold)
+        else:
+            st.sidebar.warning("HPFI highlight enabled, but no calculable HPFI values were found.")
+
+    # Single row take for every active filter
+    demographics_filtered = demographics.take(np.flatnonzero(filter_mask))
     
     # Visualization selection
     color_options = {
@@ -2117,20 +2293,14 @@ def main():
     
     # Ensure key metrics are available in the filtered view without recomputing on the subset
     if not demographics_filtered.empty:
-        demographics_filtered = demographics_filtered.copy()
-
-        def distance_based_edi(row: pd.Series) -> float:
-            if row.get('total_pop', 0) == 0:
-                return 0.0
+        def distance_based_edi(frame: pd.DataFrame) -> np.ndarray:
+            """Fallback EDI: 5 points per km to the nearest campus (unknown -> 50 km), capped at 100"""
             if cca_campuses.empty:
-                return 0.0
-            distances = [
-                haversine_km(row['lat'], row['lon'], c['lat'], c['lon'])
-                for _, c in cca_campuses.iterrows()
-                if pd.notna(row.get('lat')) and pd.notna(row.get('lon'))
-            ]
-            min_dist = min(distances) if distances else 50.0
-            return min(100.0, min_dist * 5.0)
+                return np.zeros(len(frame))
+            min_dist = campus_index.nearest_km(frame)
+            min_dist = np.where(np.isfinite(min_dist), min_dist, 50.0)
+            populated = pd.to_numeric(frame.get('total_pop', pd.Series(0, index=frame.index)), errors='coerce').fillna(0).values != 0
+            return np.where(populated, np.minimum(100.0, min_dist * 5.0), 0.0)
 
         if 'EDI' not in demographics_filtered.columns:
             if not edi_supply_df.empty:
@@ -2138,15 +2308,14 @@ def main():
                     try:
                         demographics_with_pop = demographics_filtered[(demographics_filtered['total_pop'] > 0) & (demographics_filtered.get('is_legit', False) == True)].copy()
                         if not demographics_with_pop.empty:
-                            edi_df = compute_edi_block_groups(
-                                demographics_with_pop, edi_supply_df,
-                                catchment_km=catchment_km, beta_km=decay_param, decay_type=decay_type, decay_param=decay_param,
-                                comp_weights=(
-                                    st.session_state.get('edi_weights', {}).get('edi_access', 0.40),
-                                    st.session_state.get('edi_weights', {}).get('edi_ratio', 0.30),
-                                    st.session_state.get('edi_weights', {}).get('edi_need', 0.20),
-                                    st.session_state.get('edi_weights', {}).get('edi_infra', 0.10),
-                                )
+                            edi_input_cols = [col for col in EDI_INPUT_COLUMNS if col in demographics_with_pop.columns]
+                            edi_df = combine_edi_components(
+                                compute_edi_components_cached(
+                                    demographics_with_pop[edi_input_cols], edi_supply_df,
+                                    catchment_km, decay_type, decay_param, accessibility_model,
+                                    network_key, distance_backend,
+                                ),
+                                edi_comp_weights(),
                             )
                             demographics_filtered = demographics_filtered.merge(
                                 edi_df[['block_group_id', 'EDI']],
@@ -2157,10 +2326,10 @@ def main():
                             demographics_filtered['EDI'] = 0.0
                     except Exception as exc:
                         st.sidebar.warning(f"⚠️ EDI calculation issue: {str(exc)[:100]}")
-                        demographics_filtered['EDI'] = demographics_filtered.apply(distance_based_edi, axis=1)
+                        demographics_filtered['EDI'] = distance_based_edi(demographics_filtered)
             else:
                 st.sidebar.info("No school supply data available; using a distance-based EDI estimate.")
-                demographics_filtered['EDI'] = demographics_filtered.apply(distance_based_edi, axis=1)
+                demographics_filtered['EDI'] = distance_based_edi(demographics_filtered)
         else:
             demographics_filtered['EDI'] = pd.to_numeric(demographics_filtered['EDI'], errors='coerce').fillna(0.0)
 
@@ -2168,11 +2337,12 @@ def main():
             demographics_filtered = compute_hpfi_scores(
                 demographics_filtered,
                 edi_col="EDI" if 'EDI' in demographics_filtered.columns else 'edi',
-                weights=st.session_state.get('hpfi_weights')
+                weights=st.session_state.get('hpfi_weights'),
+                campus_index=hpfi_anchor_index,
             )
 
         if 'marketing_priority' not in demographics_filtered.columns:
-            demographics_filtered['marketing_priority'] = calculate_marketing_priority_bg(demographics_filtered, cca_campuses)
+            demographics_filtered['marketing_priority'] = calculate_marketing_priority_bg(demographics_filtered, proximity_index, rule_tables)
 
         if 'zone' not in demographics_filtered.columns and not edi_zone_df.empty:
             demographics_filtered = demographics_filtered.merge(
@@ -2193,26 +2363,8 @@ def main():
     else:
         demographics_filtered['first_gen_pct'] = pd.to_numeric(demographics_filtered.get('first_gen_pct'), errors='coerce')
 
-    # Exclude imputed/incomplete data unless user opts in
-    try:
-        if not include_non_legit:
-            before_count = len(demographics_filtered)
-            if 'is_legit' in demographics_filtered.columns:
-                demographics_filtered = demographics_filtered[demographics_filtered['is_legit'] == True].copy()
-            removed = before_count - len(demographics_filtered)
-            if removed > 0:
-                st.caption(f"✓ Excluded {removed} block groups due to missing/invalid demographic fields (use 'Include imputed / incomplete data' to include them)")
-    except Exception:
-        pass
-    
-
-    hpfi_threshold = None
-    if highlight_hpfi and not demographics_filtered.empty:
-        if 'hpfi' in demographics_filtered.columns:
-            hpfi_threshold = hpfi_global_75 if 'hpfi_global_75' in locals() else demographics_filtered['hpfi'].quantile(0.75)
-            demographics_filtered = demographics_filtered[demographics_filtered['hpfi'] >= hpfi_threshold]
-        else:
-            st.sidebar.warning("HPFI highlight enabled, but no calculable HPFI values were found.")
+    if legit_removed > 0:
+        st.caption(f"✓ Excluded {legit_removed} block groups due to missing/invalid demographic fields (use 'Include imputed / incomplete data' to include them)")
 
     gdf_filtered = gdf[gdf['GEOID'].isin(demographics_filtered['block_group_id'])]
     
@@ -2544,6 +2696,307 @@ def main():
                 id_list = '\n'.join(top_targets['block_group_id'].astype(str).tolist())
                 st.download_button('Copy Block Group IDs', id_list, file_name='top_recruitment_targets.txt', mime='text/plain')
         
+        # Site selection: best k new campus locations by covered HPFI-weighted demand
+        with st.expander("📍 Campus Site Selection (maximal coverage)", expanded=False):
+            st.caption(
+                "Treats every block-group centroid as a candidate campus and greedily picks the sites that "
+                "cover the most HPFI-weighted K-12 demand within the drive radius, net of competitor seats "
+                "and of areas already served by current campuses."
+            )
+            ss_col1, ss_col2 = st.columns(2)
+            with ss_col1:
+                n_sites = st.slider("Number of new sites", min_value=1, max_value=10, value=3, key="site_k")
+            with ss_col2:
+                site_radius = st.slider("Drive radius (km)", min_value=1.0, max_value=15.0, value=5.0, step=0.5, key="site_radius")
+            if st.button("Find Best Sites", key="run_site_selection"):
+                site_input = demographics[(demographics['is_legit'] == True) & demographics['hpfi'].notna()]
+                site_cols = [col for col in ['block_group_id', 'lat', 'lon', 'k12_pop', 'hpfi'] if col in site_input.columns]
+                competitor_cols = [col for col in ['lat', 'lon', 'capacity'] if col in competition_schools.columns]
+                with st.spinner("Scanning candidate sites..."):
+                    selection = run_site_selection_cached(
+                        site_input[site_cols],
+                        competition_schools[competitor_cols] if not competition_schools.empty else pd.DataFrame(),
+                        cca_campuses[['lat', 'lon']],
+                        int(n_sites), float(site_radius),
+                        network_key, distance_backend,
+                    )
+                if selection.sites.empty:
+                    st.info("No uncovered demand found within the selected radius.")
+                else:
+                    st.metric(
+                        "Additional Weighted Demand Covered",
+                        f"{selection.sites['coverage_share'].iloc[-1]:.1%}",
+                        help="Share of all HPFI-weighted K-12 demand (net of competitors) newly covered by the chosen sites",
+                    )
+                    st.dataframe(selection.sites.round(3), use_container_width=True)
+
+        # What-if: EDI change from one hypothetical campus/school (incremental 2SFCA)
+        with st.expander("🏫 What-If: Open a New Campus or School", expanded=False):
+            st.caption(
+                "Adds one supply point and updates 2SFCA accessibility only for block groups inside its "
+                "catchment, then re-blends the EDI with your current weights."
+            )
+            wi_col1, wi_col2, wi_col3 = st.columns(3)
+            with wi_col1:
+                whatif_lat = st.number_input("Latitude", value=39.9526, format="%.4f", key="whatif_lat")
+            with wi_col2:
+                whatif_lon = st.number_input("Longitude", value=-75.1652, format="%.4f", key="whatif_lon")
+            with wi_col3:
+                whatif_seats = st.number_input("Seats", min_value=50, max_value=5000, value=400, step=50, key="whatif_seats")
+            if edi_supply_df.empty:
+                st.info("No school supply data available for a what-if scenario.")
+            elif accessibility_model not in ('2sfca', 'e2sfca'):
+                st.info("What-if scenarios are available for the 2SFCA and E2SFCA models.")
+            elif st.button("Preview EDI Change", key="run_whatif"):
+                whatif_input = demographics[(demographics['total_pop'] > 0) & (demographics['is_legit'] == True)]
+                whatif_cols = [col for col in EDI_INPUT_COLUMNS if col in whatif_input.columns]
+                engine = load_what_if_engine(
+                    whatif_input[whatif_cols], edi_supply_df,
+                    catchment_km, decay_type, decay_param, accessibility_model,
+                    network_key, distance_backend,
+                )
+                comp_weights = edi_comp_weights()
+                before = combine_edi_components(engine.components(), comp_weights)
+                after = combine_edi_components(
+                    engine.add_site(whatif_lat, whatif_lon, float(whatif_seats), preview=True).components,
+                    comp_weights,
+                )
+                delta = after[['block_group_id', 'lat', 'lon']].copy()
+                delta['EDI_before'] = before['EDI'].values
+                delta['EDI_after'] = after['EDI'].values
+                delta['EDI_change'] = delta['EDI_after'] - delta['EDI_before']
+                changed = delta[delta['EDI_change'].abs() > 0.05]
+
+                m_col1, m_col2, m_col3 = st.columns(3)
+                with m_col1:
+                    st.metric("Block Groups Affected", f"{len(changed):,}")
+                with m_col2:
+                    st.metric("Mean EDI Change", f"{changed['EDI_change'].mean():+.1f}" if not changed.empty else "0.0")
+                with m_col3:
+                    edi_75 = float(before['EDI'].quantile(0.75))
+                    lifted = int(((delta['EDI_before'] >= edi_75) & (delta['EDI_after'] < edi_75)).sum())
+                    st.metric("Leaving Top-Quartile EDI", f"{lifted:,}")
+
+                if not changed.empty:
+                    span = float(changed['EDI_change'].abs().max())
+                    delta_fig = go.Figure()
+                    delta_fig.add_scattermapbox(
+                        lat=changed['lat'],
+                        lon=changed['lon'],
+                        mode='markers',
+                        marker=dict(
+                            size=9, color=changed['EDI_change'], colorscale='RdBu_r', cmin=-span, cmax=span,
+                            colorbar=dict(title='Δ EDI'),
+                        ),
+                        text=changed['block_group_id'],
+                        name='EDI change',
+                        hovertemplate='<b>%{text}</b><br>Δ EDI: %{marker.color:+.1f}<extra></extra>',
+                    )
+                    delta_fig.add_scattermapbox(
+                        lat=[whatif_lat], lon=[whatif_lon], mode='markers',
+                        marker=dict(size=16, color='gold', symbol='star'),
+                        name='Hypothetical site',
+                    )
+                    delta_fig.update_layout(
+                        mapbox_style=st.session_state.get('map_style', 'open-street-map'),
+                        mapbox_center={"lat": whatif_lat, "lon": whatif_lon},
+                        mapbox_zoom=11,
+                        height=450,
+                        margin={"r": 0, "t": 0, "l": 0, "b": 0},
+                    )
+                    st.plotly_chart(delta_fig, width='stretch')
+                    st.dataframe(
+                        changed.sort_values('EDI_change').head(20).round(2),
+                        use_container_width=True,
+                    )
+
+        # ACS MOE uncertainty: EDI/HPFI bands and Top-10 / Golden Zone probabilities
+        with st.expander("🎲 EDI & HPFI Uncertainty (ACS margins of error)", expanded=False):
+            st.caption(
+                "Draws perturbed K-12, poverty and income realizations from the ACS 90% margins of error "
+                "and re-scores every draw with your current EDI and HPFI settings."
+            )
+            n_draws = st.select_slider("Monte Carlo draws", options=[200, 500, 1000, 2000], value=1000, key="mc_draws")
+            if edi_supply_df.empty:
+                st.info("No school supply data available for uncertainty analysis.")
+            elif st.button("Run Uncertainty Analysis", key="run_edi_mc"):
+                mc_input = demographics[(demographics['total_pop'] > 0) & (demographics['is_legit'] == True)]
+                mc_cols = [col for col in UNCERTAINTY_INPUT_COLUMNS if col in mc_input.columns]
+                # Campus proximity is fixed across draws: the HPFI exp(-km / 8) signal to the HPFI anchor sites
+                campus_proximity = campus_proximity_score(hpfi_anchor_index.nearest_km(mc_input))
+                hpfi_weights = st.session_state.get('hpfi_weights')
+                with st.spinner(f"Scoring {n_draws:,} ACS realizations..."):
+                    mc = run_uncertainty_cached(
+                        mc_input[mc_cols], campus_proximity, edi_supply_df,
+                        float(catchment_km), decay_type, float(decay_param), accessibility_model,
+                        edi_comp_weights(), tuple(sorted(hpfi_weights.items())) if hpfi_weights else None,
+                        int(n_draws),
+                    )
+                summary = mc.summary
+                st.write("**Golden Zone likelihood (90% intervals)**")
+                st.dataframe(
+                    summary.sort_values('p_golden_zone', ascending=False).head(20).round(3),
+                    use_container_width=True,
+                )
+                st.write("**Top-10 EDI membership probability**")
+                st.dataframe(
+                    summary[summary['p_top_n_edi'] > 0].sort_values('p_top_n_edi', ascending=False).head(20).round(3),
+                    use_container_width=True,
+                )
+                missing_moe = [col for col in ('k12_pop_moe', 'poverty_rate_moe', 'income_moe') if col not in mc_cols]
+                if missing_moe:
+                    st.caption(f"No MOE available for: {', '.join(missing_moe)} (treated as exact).")
+
+        # Multi-vintage panel: EDI/HPFI per ACS release on the shared geometry
+        with st.expander("📈 Multi-Year Trends (ACS vintages)", expanded=False):
+            st.caption(
+                "Scores every ACS 5-year release on the same block groups, schools and EDI settings; "
+                "distances and catchments are computed once and reused for every year."
+            )
+            year_options = list(ACS_PANEL_YEARS)
+            if find_crosswalk(CROSSWALK_DIR) is not None:
+                year_options = list(ACS_LEGACY_YEARS) + year_options
+            panel_years = st.multiselect(
+                "ACS 5-year vintages", options=year_options, default=list(ACS_PANEL_YEARS), key="panel_years",
+                help="Pre-2020 releases are crosswalked from 2010 to 2020 block groups",
+            )
+            if edi_supply_df.empty:
+                st.info("No school supply data available for a multi-year panel.")
+            elif len(panel_years) < 2:
+                st.info("Select at least two vintages to compare.")
+            elif st.button("Build Multi-Year Panel", key="run_edi_panel"):
+                panel_input = demographics[(demographics['total_pop'] > 0) & (demographics['is_legit'] == True)]
+                panel_cols = [col for col in UNCERTAINTY_INPUT_COLUMNS if col in panel_input.columns]
+                campus_proximity = campus_proximity_score(hpfi_anchor_index.nearest_km(panel_input))
+                hpfi_weights = st.session_state.get('hpfi_weights')
+                try:
+                    with st.spinner(f"Scoring {len(panel_years)} ACS vintages..."):
+                        st.session_state['edi_panel'] = build_edi_panel_cached(
+                            panel_input[panel_cols], campus_proximity, edi_supply_df,
+                            tuple(sorted(panel_years)),
+                            float(catchment_km), decay_type, float(decay_param), accessibility_model,
+                            edi_comp_weights(), tuple(sorted(hpfi_weights.items())) if hpfi_weights else None,
+                        )
+                except Exception as exc:
+                    st.error(f"Unable to load ACS vintages: {exc}")
+
+            panel = st.session_state.get('edi_panel')
+            if panel is not None:
+                trend_cols = st.columns(3)
+                trend_metric = trend_cols[0].selectbox("Metric", options=list(panel.metrics), index=panel.metrics.index('EDI'), key="panel_metric")
+                start_year = trend_cols[1].selectbox("From", options=list(panel.years), index=0, key="panel_start")
+                end_year = trend_cols[2].selectbox("To", options=list(panel.years), index=len(panel.years) - 1, key="panel_end")
+                change = panel.change(trend_metric, start_year, end_year)
+                change_col = f"{trend_metric}_change"
+                trend_frame = demographics_filtered.drop(columns=[change_col], errors='ignore').merge(
+                    change[['block_group_id', change_col]], on='block_group_id', how='left'
+                )
+                trend_fig = create_choropleth_map(
+                    gdf_filtered,
+                    trend_frame,
+                    change_col,
+                    f"{trend_metric} change, ACS {start_year} → {end_year}",
+                    map_style=st.session_state.get('map_style', 'open-street-map'),
+                )
+                st.plotly_chart(trend_fig, width='stretch')
+                st.write("**Citywide K-12-weighted mean by vintage**")
+                k12 = panel.metric('k12_pop')
+                weighted = {
+                    name: (panel.metric(name) * k12).sum() / k12.where(panel.metric(name).notna()).sum()
+                    for name in ('EDI', 'hpfi', 'poverty_rate')
+                }
+                st.dataframe(pd.DataFrame(weighted).round(3), use_container_width=True)
+                st.write("**Largest changes**")
+                st.dataframe(
+                    change.reindex(change[change_col].abs().sort_values(ascending=False).index).head(20).round(2),
+                    use_container_width=True,
+                )
+                st.download_button(
+                    label="Download Panel CSV",
+                    data=panel.to_long().to_csv(index=False),
+                    file_name=f"philadelphia_edi_panel_{'_'.join(panel.years)}.csv",
+                    mime="text/csv",
+                    key="download_edi_panel",
+                )
+
+        # EDI sensitivity: stability of the Top-10 across decay/catchment settings
+        with st.expander("🔬 EDI Sensitivity Analysis (decay & catchment sweep)", expanded=False):
+            st.caption(
+                "Re-runs the 2SFCA EDI over every decay function, several β values and catchment radii "
+                "(distances computed once) and compares each ranking with your current settings."
+            )
+            if edi_supply_df.empty:
+                st.info("No school supply data available for a sensitivity sweep.")
+            elif st.button("Run EDI Parameter Sweep", key="run_edi_sweep"):
+                sweep_input = demographics[(demographics['total_pop'] > 0) & (demographics['is_legit'] == True)]
+                sweep_cols = [col for col in EDI_INPUT_COLUMNS if col in sweep_input.columns]
+                with st.spinner("Evaluating EDI parameter grid..."):
+                    sweep = run_edi_sweep_cached(
+                        sweep_input[sweep_cols], edi_supply_df,
+                        decay_type, float(decay_param), float(catchment_km), edi_comp_weights(),
+                        accessibility_model,
+                    )
+                st.write("**Agreement with current settings (Kendall τ, Top-10 overlap)**")
+                st.dataframe(sweep.settings.round(3), use_container_width=True)
+                st.write("**Most stable Top-10 block groups**")
+                st.dataframe(sweep.block_groups.head(20).round(2), use_container_width=True)
+
+        # Weight-space exploration: are the HPFI / RHI targets an artifact of the slider weights?
+        with st.expander("🎲 Weight-Space Exploration (robust targets)", expanded=False):
+            st.caption(
+                "Scores thousands of randomly sampled weight vectors at once (one matrix multiply over the "
+                "normalized components) and lists the block groups that stay in the Top-N across them."
+            )
+            explore_cols = st.columns(4)
+            explore_index = explore_cols[0].selectbox("Index", options=["HPFI", "RHI"], key="explore_index")
+            explore_samples = explore_cols[1].select_slider("Weight vectors", options=[500, 1000, 2000, 5000, 10000], value=2000, key="explore_samples")
+            explore_top_n = explore_cols[2].number_input("Top N", min_value=5, max_value=100, value=20, step=5, key="explore_top_n")
+            explore_spread = explore_cols[3].selectbox(
+                "Sampling", options=["Around current weights", "Anywhere"], key="explore_spread",
+                help="Around current weights: Dirichlet centered on the sliders. Anywhere: uniform over all weightings.",
+            )
+            if st.button("Explore Weight Space", key="run_weight_space"):
+                explore_input = demographics[demographics['is_legit'] == True]
+                if explore_index == "HPFI":
+                    components = hpfi_components(explore_input, campus_index=hpfi_anchor_index)[list(HPFI_COMPONENTS)]
+                    # The weights compute_hpfi_scores blends with, so sample 0 is the mapped HPFI
+                    base_weights = resolve_hpfi_weights(st.session_state.get('hpfi_weights'))
+                else:
+                    components = rhi_components(explore_input, current_students, st.session_state.get('student_kernel', 'count'))
+                    slider_weights = st.session_state.get('rhi_weights') or WEIGHT_DEFAULTS
+                    base_weights = {name: slider_weights.get('rhi_' + name, 0.0) for name in components.columns}
+                with st.spinner(f"Scoring {explore_samples:,} weight vectors..."):
+                    st.session_state['weight_space'] = (explore_index, explore_weight_space(
+                        components, base_weights,
+                        block_group_ids=explore_input['block_group_id'].values,
+                        top_n=int(explore_top_n), n_samples=int(explore_samples),
+                        concentration=50.0 if explore_spread == "Around current weights" else None,
+                    ))
+
+            explored = st.session_state.get('weight_space')
+            if explored is not None:
+                explored_index, weight_space = explored
+                min_share = st.slider("Robust if in Top-N for at least", 0.5, 1.0, 0.8, 0.05, key="explore_min_share", format="%.2f")
+                robust = weight_space.robust_targets(min_share)
+                st.write(
+                    f"**{len(robust)} robust {explored_index} targets** "
+                    f"(in the Top-{weight_space.top_n} for ≥{min_share:.0%} of {len(weight_space.weights):,} weight vectors)"
+                )
+                robust_view = robust.merge(
+                    demographics[['block_group_id', 'k12_pop', 'income', 'EDI', 'hpfi']], on='block_group_id', how='left'
+                )
+                st.dataframe(robust_view.round(3), use_container_width=True)
+                st.write("**Least stable current Top-N**")
+                current_top = weight_space.block_groups[weight_space.block_groups['current_rank'] <= weight_space.top_n]
+                st.dataframe(current_top.sort_values('top_n_share').head(10).round(3), use_container_width=True)
+                st.download_button(
+                    label="Download Weight-Space CSV",
+                    data=weight_space.block_groups.to_csv(index=False),
+                    file_name=f"philadelphia_{explored_index.lower()}_weight_space.csv",
+                    mime="text/csv",
+                    key="download_weight_space",
+                )
+
         # Export option
         st.subheader("📥 Export Data")
         if st.button("Download Filtered Data as CSV"):
@@ -2554,6 +3007,35 @@ def main():
                 file_name=f"philadelphia_block_groups_filtered_{pd.Timestamp.now().strftime('%Y%m%d_%H%M')}.csv",
                 mime="text/csv"
             )
+
+        # Roll block-group metrics up to a polygon layer (ZCTA, council district, catchment)
+        polygon_layers = list_polygon_layers(BOUNDARY_DIR)
+        if polygon_layers:
+            rollup_layer = st.selectbox(
+                "Aggregate to boundary layer",
+                options=list(polygon_layers.keys()),
+                help=f"Polygon files found in {BOUNDARY_DIR}; block groups are apportioned by area overlap",
+            )
+            if st.button("Download Aggregated CSV", key="download_rollup"):
+                layer_path = polygon_layers[rollup_layer]
+                aggregator = load_areal_aggregator(str(layer_path), layer_path.stat().st_mtime, gdf)
+                rollup = aggregator.aggregate(
+                    demographics_filtered,
+                    sums=['k12_pop', 'total_pop'],
+                    means={
+                        'EDI': 'k12_pop',
+                        'hpfi': 'k12_pop',
+                        'recruitment_heat_index': 'k12_pop',
+                        'income': 'total_pop',
+                        'poverty_rate': 'total_pop',
+                    },
+                )
+                st.download_button(
+                    label=f"Download {rollup_layer} CSV",
+                    data=rollup.to_csv(index=False),
+                    file_name=f"philadelphia_{rollup_layer}_rollup_{pd.Timestamp.now().strftime('%Y%m%d_%H%M')}.csv",
+                    mime="text/csv"
+                )
     
     else:
         st.info("🔍 No areas match your current filter settings. Try broadening your criteria to see more opportunities.")
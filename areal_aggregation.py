@@ -0,0 +1,194 @@
+"""Areal aggregation of block-group metrics to any polygon layer.
+
+Rolls block-group columns (EDI, HPFI, RHI, k12_pop, ...) up to ZIP Code
+Tabulation Areas, council districts, SDP catchments or any other polygon file
+on disk. The polygon intersections are computed once into a sparse overlap
+matrix W (n_targets x n_block_groups) where
+
+    W[t, b] = area(block group b ∩ target t) / area(block group b)
+
+i.e. the share of each block group falling inside each target. The matrix is
+cached under data/cache as .npz keyed by both layers' ids and geometries, so
+after the first build every re-aggregation is a single sparse mat-vec:
+
+- sums (extensive counts, area-apportioned):   W @ x
+- weighted means (e.g. k12_pop-weighted EDI):  (W @ (x * w)) / (W @ w)
+"""
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from atomic_write import write_atomic
+
+# Equal-area projection for intersection areas (NAD83 / Conus Albers)
+EQUAL_AREA_CRS = "EPSG:5070"
+DEFAULT_BOUNDARY_DIR = Path("data/boundaries")
+POLYGON_SUFFIXES = (".geojson", ".json", ".gpkg", ".shp")
+
+# Id columns tried, in order, when a layer's id column is not given
+ID_COLUMN_CANDIDATES = ("ZCTA5CE20", "ZCTA5CE10", "GEOID20", "GEOID", "DISTRICT", "district", "CATCHMENT", "name", "NAME", "id")
+
+
+def list_polygon_layers(boundary_dir=DEFAULT_BOUNDARY_DIR):
+    """Polygon files available for aggregation, keyed by file stem"""
+    boundary_dir = Path(boundary_dir)
+    if not boundary_dir.exists():
+        return {}
+    return {
+        path.stem: path
+        for path in sorted(boundary_dir.iterdir())
+        if path.suffix.lower() in POLYGON_SUFFIXES
+    }
+
+
+def load_polygon_layer(path, id_col: str | None = None) -> tuple[gpd.GeoDataFrame, str]:
+    """Read a polygon file and resolve its id column; returns (layer, id_col)"""
+    layer = gpd.read_file(path)
+    if id_col is None:
+        id_col = next((col for col in ID_COLUMN_CANDIDATES if col in layer.columns), None)
+    if id_col is None or id_col not in layer.columns:
+        raise ValueError(f"Cannot find an id column in {path}; pass id_col explicitly")
+    layer = layer[[id_col, "geometry"]].dropna(subset=["geometry"]).copy()
+    layer[id_col] = layer[id_col].astype(str)
+    return layer, id_col
+
+
+def _layer_fingerprint(*layers):
+    """Stable hash of (ids, geometry WKB) for the overlap cache key"""
+    h = hashlib.sha1()
+    for ids, geometry in layers:
+        h.update("\x1f".join(map(str, ids)).encode())
+        for wkb in geometry.to_wkb():
+            h.update(wkb)
+    return h.hexdigest()[:20]
+
+
+def overlap_weight_matrix(source: gpd.GeoSeries, target: gpd.GeoSeries) -> sparse.csr_matrix:
+    """
+    Sparse (n_target, n_source) matrix of the share of each source polygon's area
+    inside each target polygon, from one spatial-index join plus vectorized
+    intersections.
+    """
+    if source.crs is not None:
+        source = source.to_crs(EQUAL_AREA_CRS)
+    if target.crs is not None:
+        target = target.to_crs(EQUAL_AREA_CRS)
+    source = source.make_valid().reset_index(drop=True)
+    target = target.make_valid().reset_index(drop=True)
+
+    src_idx, tgt_idx = target.sindex.query(source, predicate="intersects")
+    pieces = source.iloc[src_idx].reset_index(drop=True).intersection(target.iloc[tgt_idx].reset_index(drop=True))
+    source_area = source.area.values[src_idx]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = np.where(source_area > 0, pieces.area.values / source_area, 0.0)
+    keep = share > 0
+    W = sparse.csr_matrix(
+        (share[keep], (tgt_idx[keep], src_idx[keep])),
+        shape=(len(target), len(source)),
+    )
+    W.sum_duplicates()
+    return W
+
+
+class ArealAggregator:
+    """Cached block-group -> polygon overlap weights with sum / weighted-mean roll-ups."""
+
+    def __init__(self, weights: sparse.csr_matrix, source_ids, target_ids, target_id_col: str = "target_id"):
+        self.weights = sparse.csr_matrix(weights)
+        self.source_ids = pd.Index(np.asarray(source_ids).astype(str))
+        self.target_ids = np.asarray(target_ids).astype(str)
+        self.target_id_col = target_id_col
+
+    @classmethod
+    def from_layers(
+        cls,
+        source_gdf: gpd.GeoDataFrame,
+        target_gdf: gpd.GeoDataFrame,
+        *,
+        source_id_col: str = "GEOID",
+        target_id_col: str,
+        cache_dir: str | Path | None = "data/cache",
+    ) -> "ArealAggregator":
+        """Build (or reload from cache_dir) the overlap matrix between two polygon layers"""
+        source_ids = source_gdf[source_id_col].astype(str).values
+        target_ids = target_gdf[target_id_col].astype(str).values
+        if cache_dir is None:
+            W = overlap_weight_matrix(source_gdf.geometry, target_gdf.geometry)
+            return cls(W, source_ids, target_ids, target_id_col)
+
+        cache_dir = Path(cache_dir)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        key = _layer_fingerprint((source_ids, source_gdf.geometry), (target_ids, target_gdf.geometry))
+        path = cache_dir / f"overlap_{key}.npz"
+        if path.exists():
+            try:
+                return cls(sparse.load_npz(path), source_ids, target_ids, target_id_col)
+            except (OSError, ValueError):
+                pass  # Corrupt cache entry: rebuild below
+        W = overlap_weight_matrix(source_gdf.geometry, target_gdf.geometry)
+        write_atomic(path, lambda tmp: sparse.save_npz(tmp, W), suffix=".tmp.npz")
+        return cls(W, source_ids, target_ids, target_id_col)
+
+    def _align(self, df: pd.DataFrame, columns, id_col: str) -> np.ndarray:
+        """(n_source, len(columns)) float block aligned to the overlap matrix columns"""
+        frame = df.assign(_source_id=df[id_col].astype(str).values).drop_duplicates("_source_id").set_index("_source_id")
+        aligned = frame.reindex(self.source_ids)[list(columns)]
+        return aligned.apply(pd.to_numeric, errors="coerce").values.astype(float)
+
+    def sum(self, values) -> np.ndarray:
+        """Area-apportioned sums of extensive values (NaN counts as 0)"""
+        values = np.nan_to_num(np.asarray(values, dtype=float))
+        return self.weights @ values
+
+    def weighted_mean(self, values, weights=None) -> np.ndarray:
+        """
+        Overlap- and weight-weighted means; weights default to 1 (plain overlap
+        share). Missing values drop out of both numerator and denominator.
+        """
+        values = np.asarray(values, dtype=float)
+        weights = np.ones_like(values) if weights is None else np.asarray(weights, dtype=float)
+        weights = np.broadcast_to(weights.reshape(weights.shape + (1,) * (values.ndim - weights.ndim)), values.shape)
+        valid = np.isfinite(values) & np.isfinite(weights)
+        w = np.where(valid, weights, 0.0)
+        numer = self.weights @ np.where(valid, values * w, 0.0)
+        denom = self.weights @ w
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(denom > 0, numer / np.where(denom > 0, denom, 1.0), np.nan)
+
+    def aggregate(
+        self,
+        df: pd.DataFrame,
+        *,
+        sums=(),
+        means=None,
+        id_col: str = "block_group_id",
+    ) -> pd.DataFrame:
+        """
+        Roll block-group columns up to the target layer.
+        - sums: extensive columns to apportion by area (e.g. k12_pop, total_pop)
+        - means: {column: weight column or None}, e.g. {"EDI": "k12_pop", "hpfi": "k12_pop"}
+        Each group of columns is one sparse mat-mat over the stacked values.
+        """
+        means = dict(means or {})
+        out = pd.DataFrame({self.target_id_col: self.target_ids})
+        sums = [col for col in sums if col in df.columns]
+        if sums:
+            out[sums] = self.sum(self._align(df, sums, id_col))
+
+        by_weight = {}
+        for col, weight_col in means.items():
+            if col in df.columns and (weight_col is None or weight_col in df.columns):
+                by_weight.setdefault(weight_col, []).append(col)
+        for weight_col, cols in by_weight.items():
+            values = self._align(df, cols, id_col)
+            weights = None if weight_col is None else self._align(df, [weight_col], id_col)[:, 0]
+            out[cols] = self.weighted_mean(values, weights)
+
+        out["block_group_share"] = np.asarray(self.weights.sum(axis=1)).ravel()
+        return out
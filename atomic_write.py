@@ -0,0 +1,34 @@
+"""Atomic file replacement shared by every on-disk cache and store.
+
+Readers (other Streamlit sessions, other processes) must never see a partial
+file, and concurrent writers must never share a temp file: sessions are threads
+of one process, so a pid-based temp name is not unique. write_atomic() gives
+each writer its own mkstemp file next to the target and renames it into place.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable
+
+
+def write_atomic(path, write: Callable[[str], object], suffix: str = ".tmp") -> Path:
+    """
+    Replace path with the file write(tmp) produces at the temp path tmp.
+
+    The temp file lives in path's directory (so os.replace stays on one
+    filesystem), is dot-prefixed (hidden from dataset scans) and is removed if
+    write fails. suffix keeps the extension writers such as np.save or
+    np.savez_compressed would otherwise append, e.g. ".tmp.npy".
+    """
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=suffix)
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
@@ -0,0 +1,219 @@
+"""2010 <-> 2020 block-group crosswalk for multi-year comparisons.
+
+Block groups were redrawn for the 2020 Census, so ACS releases before 2020
+(and the 2010-based demographics_block_groups.csv snapshots) do not line up
+with 2020 block groups. A crosswalk is a sparse allocation matrix W
+(n_target x n_source) where W[t, s] is the share of source block group s
+allocated to target block group t. Columns sum to 1 wherever s is fully
+covered.
+
+Allocation factors can come from:
+
+- an NHGIS block-group crosswalk CSV (bg2010ge, bg2020ge, wt_pop, wt_hh, ...),
+  i.e. population/household-weighted factors built from 2010 blocks;
+- any block-level "atoms" (source id, target id, population), e.g. 2010
+  blocks with their 2020 block-group assignment;
+- two polygon layers (area-weighted, via areal_aggregation).
+
+A whole frame is converted in one sparse mat-mat per group of columns:
+counts are apportioned (W @ x), rates are averaged with their denominators
+as weights, (W @ (rate * den)) / (W @ den), so poverty_rate is re-derived
+from the population it describes instead of being averaged by area.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from areal_aggregation import ArealAggregator
+from atomic_write import write_atomic
+
+DEFAULT_CROSSWALK_DIR = Path("data/crosswalk")
+
+# NHGIS crosswalk weight columns by weighting scheme
+NHGIS_WEIGHT_COLUMNS = {
+    "population": "wt_pop",
+    "adults": "wt_adult",
+    "families": "wt_fam",
+    "households": "wt_hh",
+    "housing_units": "wt_hu",
+    "area": "parea",
+}
+
+# Extensive columns apportioned as sums
+COUNT_COLUMNS = ("total_pop", "k12_pop", "hh_with_u18", "church_count", "bg_age_5_17", "poverty_universe")
+
+# Intensive columns -> denominator used to weight them
+RATE_DENOMINATORS = {
+    "poverty_rate": "total_pop",
+    "pct_black": "total_pop",
+    "pct_white": "total_pop",
+    "pct_lt_hs": "total_pop",
+    "broadband_pct": "total_pop",
+    "%Christian": "total_pop",
+    "%first_gen": "total_pop",
+    "churches_per_1k": "total_pop",
+    "income": "total_pop",  # median income: population-weighted approximation
+}
+
+
+def normalise_geoid(values, width: int = 12) -> np.ndarray:
+    """Block-group GEOIDs as zero-padded strings (CSV round-trips turn them into ints/floats)"""
+    ids = pd.Series(np.asarray(values)).astype(str).str.strip().str.replace(r"\.0$", "", regex=True)
+    return ids.str.zfill(width).values
+
+
+def allocation_matrix(source_ids, target_ids, factors, *, source_index=None, target_index=None) -> sparse.csr_matrix:
+    """
+    Sparse (n_target, n_source) matrix from (source, target, factor) triples;
+    repeated pairs are summed. Index order defaults to the sorted unique ids.
+    """
+    source_ids = normalise_geoid(source_ids)
+    target_ids = normalise_geoid(target_ids)
+    factors = np.nan_to_num(np.asarray(factors, dtype=float))
+    source_index = pd.Index(np.unique(source_ids) if source_index is None else normalise_geoid(source_index))
+    target_index = pd.Index(np.unique(target_ids) if target_index is None else normalise_geoid(target_index))
+    cols = source_index.get_indexer(source_ids)
+    rows = target_index.get_indexer(target_ids)
+    keep = (rows >= 0) & (cols >= 0) & (factors > 0)
+    W = sparse.csr_matrix(
+        (factors[keep], (rows[keep], cols[keep])),
+        shape=(len(target_index), len(source_index)),
+    )
+    W.sum_duplicates()
+    return W
+
+
+class BlockGroupCrosswalk(ArealAggregator):
+    """Sparse block-group allocation between two vintages with one-step frame conversion."""
+
+    def __init__(self, weights, source_ids, target_ids, target_id_col: str = "block_group_id", *, weighting: str = "area"):
+        super().__init__(weights, normalise_geoid(source_ids), normalise_geoid(target_ids), target_id_col)
+        self.weighting = weighting
+
+    @classmethod
+    def from_table(cls, table: pd.DataFrame, *, source_col: str, target_col: str, weight_col: str, weighting: str = "population"):
+        """Crosswalk from a (source id, target id, allocation factor) table"""
+        source_index = np.unique(normalise_geoid(table[source_col].values))
+        target_index = np.unique(normalise_geoid(table[target_col].values))
+        W = allocation_matrix(
+            table[source_col].values, table[target_col].values, table[weight_col].values,
+            source_index=source_index, target_index=target_index,
+        )
+        return cls(W, source_index, target_index, weighting=weighting)
+
+    @classmethod
+    def from_nhgis(cls, path, weighting: str = "population", *, source: str = "bg2010ge", target: str = "bg2020ge"):
+        """
+        Load an NHGIS block-group crosswalk CSV (e.g. nhgis_bg2010_bg2020_42.csv).
+        weighting selects the factor column (see NHGIS_WEIGHT_COLUMNS).
+        """
+        if weighting not in NHGIS_WEIGHT_COLUMNS:
+            raise ValueError(f"Unknown weighting: {weighting!r} (expected one of {', '.join(NHGIS_WEIGHT_COLUMNS)})")
+        weight_col = NHGIS_WEIGHT_COLUMNS[weighting]
+        table = pd.read_csv(path, usecols=[source, target, weight_col], dtype={source: str, target: str})
+        return cls.from_table(table, source_col=source, target_col=target, weight_col=weight_col, weighting=weighting)
+
+    @classmethod
+    def from_units(cls, source_ids, target_ids, unit_weights=None, *, weighting: str = "population"):
+        """
+        Crosswalk from nesting units (e.g. census blocks) that each sit in one
+        source and one target block group: W[t, s] is the share of s's unit
+        weight (population, housing units, ...) falling in t.
+        """
+        source_ids = normalise_geoid(source_ids)
+        unit_weights = np.ones(len(source_ids)) if unit_weights is None else np.nan_to_num(np.asarray(unit_weights, dtype=float))
+        source_index = np.unique(source_ids)
+        target_index = np.unique(normalise_geoid(target_ids))
+        W = allocation_matrix(source_ids, target_ids, unit_weights, source_index=source_index, target_index=target_index)
+        column_totals = np.asarray(W.sum(axis=0)).ravel()
+        with np.errstate(divide="ignore"):
+            scale = np.where(column_totals > 0, 1.0 / column_totals, 0.0)
+        return cls(W @ sparse.diags(scale), source_index, target_index, weighting=weighting)
+
+    def reverse(self, source_totals=None) -> "BlockGroupCrosswalk":
+        """
+        Target -> source crosswalk. Each target's contents are split back over its
+        sources in proportion to W[t, s] * source_totals[s] (e.g. source
+        populations); with no totals every source counts equally.
+        """
+        totals = np.ones(len(self.source_ids)) if source_totals is None else np.nan_to_num(np.asarray(source_totals, dtype=float))
+        contrib = self.weights @ sparse.diags(totals)
+        row_totals = np.asarray(contrib.sum(axis=1)).ravel()
+        with np.errstate(divide="ignore"):
+            scale = np.where(row_totals > 0, 1.0 / row_totals, 0.0)
+        R = (sparse.diags(scale) @ contrib).T.tocsr()
+        return BlockGroupCrosswalk(R, self.target_ids, self.source_ids, self.target_id_col, weighting=self.weighting)
+
+    def convert(self, df: pd.DataFrame, *, counts=None, rates=None, id_col: str = "block_group_id") -> pd.DataFrame:
+        """
+        Re-express a source-geography frame on the target block groups.
+        - counts: extensive columns to apportion (default: COUNT_COLUMNS present)
+        - rates: {column: denominator column}; default RATE_DENOMINATORS present.
+          A denominator missing from df falls back to plain allocation weights.
+        Returns one row per target block group with allocation_share (the summed
+        source share received; ~1 where the target is fully covered).
+        """
+        df = df.assign(**{id_col: normalise_geoid(df[id_col].values)})
+        counts = [col for col in (COUNT_COLUMNS if counts is None else counts) if col in df.columns]
+        rates = RATE_DENOMINATORS if rates is None else rates
+        rates = {
+            col: (den if den in df.columns else None)
+            for col, den in rates.items()
+            if col in df.columns
+        }
+        out = self.aggregate(df, sums=counts, means=rates, id_col=id_col)
+        return out.rename(columns={"block_group_share": "allocation_share"})
+
+    def save(self, path) -> Path:
+        """Store weights and ids as one .npz (atomic replace)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        W = self.weights.tocoo()
+        write_atomic(path, lambda tmp: np.savez_compressed(
+            tmp,
+            row=W.row, col=W.col, data=W.data, shape=np.array(W.shape),
+            source_ids=np.asarray(self.source_ids, dtype=str),
+            target_ids=np.asarray(self.target_ids, dtype=str),
+            weighting=np.array(self.weighting),
+        ), suffix=".tmp.npz")
+        return path
+
+    @classmethod
+    def load(cls, path) -> "BlockGroupCrosswalk":
+        with np.load(path, allow_pickle=False) as data:
+            W = sparse.csr_matrix((data["data"], (data["row"], data["col"])), shape=tuple(data["shape"]))
+            return cls(W, data["source_ids"], data["target_ids"], weighting=str(data["weighting"]))
+
+
+def load_crosswalk(path, weighting: str = "population", cache_dir: str | Path | None = "data/cache") -> BlockGroupCrosswalk:
+    """
+    NHGIS crosswalk CSV (or a saved .npz) as a BlockGroupCrosswalk; parsed CSVs
+    are cached under cache_dir keyed by file name, mtime and weighting.
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".npz":
+        return BlockGroupCrosswalk.load(path)
+    if cache_dir is None:
+        return BlockGroupCrosswalk.from_nhgis(path, weighting)
+    cached = Path(cache_dir) / f"crosswalk_{path.stem}_{weighting}_{int(path.stat().st_mtime)}.npz"
+    if cached.exists():
+        try:
+            return BlockGroupCrosswalk.load(cached)
+        except (OSError, ValueError, KeyError):
+            pass  # Corrupt cache entry: rebuild below
+    crosswalk = BlockGroupCrosswalk.from_nhgis(path, weighting)
+    crosswalk.save(cached)
+    return crosswalk
+
+
+def find_crosswalk(crosswalk_dir=DEFAULT_CROSSWALK_DIR) -> Path | None:
+    """First 2010 -> 2020 block-group crosswalk file in crosswalk_dir, if any"""
+    crosswalk_dir = Path(crosswalk_dir)
+    if not crosswalk_dir.exists():
+        return None
+    matches = sorted(crosswalk_dir.glob("*bg2010*bg2020*.csv")) + sorted(crosswalk_dir.glob("*bg2010*bg2020*.npz"))
+    return matches[0] if matches else None
@@ -0,0 +1,111 @@
+"""CCA campus registry and the shared block-group x campus distance index.
+
+Every campus-distance consumer reads its campus list from CCA_CAMPUSES, where
+each entry has a role:
+
+- "operating": campuses CCA runs today; marketing priority, the distance
+  filter, the distance-based EDI fallback, map markers and site selection
+- "hpfi_anchor": the sites HPFI proximity is scored against (the HPFI inputs
+  as originally defined; moving HPFI onto the operating campuses is a scoring
+  change for the index owners, not a registry edit)
+
+Opening a campus is one new entry here. CampusDistanceIndex computes the (n_block_groups x n_campuses)
+distance matrix in one vectorized haversine (or road-network) call and serves
+aligned per-frame lookups by block_group_id.
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from educational_desert_index_bg import _haversine_matrix
+
+OPERATING = "operating"
+HPFI_ANCHOR = "hpfi_anchor"
+
+CCA_CAMPUSES = (
+    {"name": "CCA Main Campus (58th St)", "lat": 39.9386, "lon": -75.2312, "address": "1939 S. 58th St. Philadelphia, PA", "role": OPERATING},
+    {"name": "CCA Baltimore Ave Campus", "lat": 39.9508, "lon": -75.2085, "address": "4109 Baltimore Ave Philadelphia, PA", "role": OPERATING},
+    {"name": "West Oak Lane", "lat": 40.056339, "lon": -75.153858, "address": None, "role": HPFI_ANCHOR},
+    {"name": "Hunting Park", "lat": 40.015278, "lon": -75.138889, "address": None, "role": HPFI_ANCHOR},
+)
+
+# HPFI campus proximity: exp(-km / PROXIMITY_DECAY_KM)
+PROXIMITY_DECAY_KM = 8.0
+
+
+def campus_frame(campuses=CCA_CAMPUSES, role: str | None = OPERATING) -> pd.DataFrame:
+    """Registry entries with the given role (None = every entry) as a name / lat / lon / address / role frame"""
+    frame = pd.DataFrame(list(campuses), columns=["name", "lat", "lon", "address", "role"])
+    if role is not None:
+        frame = frame[frame["role"] == role].reset_index(drop=True)
+    return frame
+
+
+def campus_proximity_score(nearest_km) -> np.ndarray:
+    """HPFI proximity signal from nearest-campus km (missing or unreachable -> 0)"""
+    km = np.asarray(nearest_km, dtype=float)
+    return np.where(np.isfinite(km), np.exp(-np.where(np.isfinite(km), km, 0.0) / PROXIMITY_DECAY_KM), 0.0)
+
+
+def _coords(df):
+    lat = pd.to_numeric(df["lat"], errors="coerce").values.astype(float) if "lat" in df.columns else np.full(len(df), np.nan)
+    lon = pd.to_numeric(df["lon"], errors="coerce").values.astype(float) if "lon" in df.columns else np.full(len(df), np.nan)
+    return lat, lon
+
+
+class CampusDistanceIndex:
+    """
+    Block group x campus distances, computed once (campuses defaults to the
+    operating campuses; pass campus_frame(role=HPFI_ANCHOR) for HPFI proximity).
+
+    Distances are straight-line km, or road-network cost when distance_backend
+    is given (travel_network.NetworkDistanceBackend). Rows without coordinates
+    (and unreachable pairs) are inf.
+    """
+
+    def __init__(self, block_group_ids, lat, lon, campuses=None, distance_backend=None):
+        self.campuses = campus_frame() if campuses is None else campuses.reset_index(drop=True)
+        self.distance_backend = distance_backend
+        self.block_group_ids = pd.Index(np.asarray(block_group_ids).astype(str))
+        self.distances = self._compute(np.asarray(lat, dtype=float), np.asarray(lon, dtype=float))
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, campuses=None, distance_backend=None) -> "CampusDistanceIndex":
+        """Index over df's block groups (an empty index when df has no block_group_id: lookups compute directly)"""
+        if "block_group_id" not in df.columns:
+            return cls([], np.empty(0), np.empty(0), campuses, distance_backend)
+        df = df.drop_duplicates("block_group_id")
+        lat, lon = _coords(df)
+        return cls(df["block_group_id"].values, lat, lon, campuses, distance_backend)
+
+    def _compute(self, lat, lon):
+        D = np.full((len(lat), len(self.campuses)), np.inf)
+        valid = np.isfinite(lat) & np.isfinite(lon)
+        if valid.any() and len(self.campuses):
+            c_lat = self.campuses["lat"].values.astype(float)
+            c_lon = self.campuses["lon"].values.astype(float)
+            if self.distance_backend is not None:
+                D[valid] = np.asarray(self.distance_backend.matrix(lat[valid], lon[valid], c_lat, c_lon))
+            else:
+                D[valid] = _haversine_matrix(lat[valid], lon[valid], c_lat, c_lon)
+        return D
+
+    def distances_for(self, df: pd.DataFrame) -> np.ndarray:
+        """(len(df), n_campuses) distances aligned to df rows; ids not in the index are computed on the fly"""
+        if "block_group_id" in df.columns:
+            pos = self.block_group_ids.get_indexer(df["block_group_id"].astype(str).values)
+        else:
+            pos = np.full(len(df), -1)
+        out = np.empty((len(df), len(self.campuses)))
+        found = pos >= 0
+        out[found] = self.distances[pos[found]]
+        if not found.all():
+            lat, lon = _coords(df)
+            out[~found] = self._compute(lat[~found], lon[~found])
+        return out
+
+    def nearest_km(self, df: pd.DataFrame) -> np.ndarray:
+        """Distance to the nearest campus per df row (inf when unknown)"""
+        D = self.distances_for(df)
+        return D.min(axis=1) if D.shape[1] else np.full(len(df), np.inf)
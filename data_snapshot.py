@@ -0,0 +1,240 @@
+"""Columnar snapshot of the block-group geometry and demographics inputs.
+
+Parsing philadelphia_block_groups.geojson (gpd.read_file) and
+demographics_block_groups.csv dominates load_block_group_data cold starts. The
+build step writes them once as
+
+- block_groups.parquet: GeoParquet with GEOID + geometry (WKB)
+- demographics.feather: uncompressed Arrow IPC with enforced dtypes
+  (string ids, ACS sentinels -> NaN), memory-mapped on read
+- manifest.json: size, mtime and SHA-256 of each source file plus the schema
+
+load_block_group_frames() serves the snapshot while its manifest matches the
+sources: size + mtime first, the content hash only when those differ (a fresh
+checkout touches every mtime), so an unchanged file never triggers a rebuild.
+A stale or missing snapshot falls back to the GeoJSON/CSV and is rewritten in
+place when the directory is writable. Without pyarrow the sources are always
+read directly.
+
+Build (or refresh) the snapshot: python data_snapshot.py [--force]
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Sequence
+
+import geopandas as gpd
+import pandas as pd
+
+from atomic_write import write_atomic
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - optional dependency (ships with streamlit)
+    feather = None
+
+GEOJSON_PATH = Path("philadelphia_block_groups.geojson")
+DEMOGRAPHICS_PATH = Path("demographics_block_groups.csv")
+DEFAULT_SNAPSHOT_DIR = Path("data/snapshot")
+
+GEOMETRY_FILE = "block_groups.parquet"
+DEMOGRAPHICS_FILE = "demographics.feather"
+MANIFEST_FILE = "manifest.json"
+SNAPSHOT_VERSION = 1
+
+# ACS "not available" sentinel in the demographics export
+ACS_SENTINEL = -666666666
+SENTINEL_COLUMNS = ('income', 'poverty_rate', 'total_pop', 'pct_black', 'pct_white', 'hh_with_u18', '%Christian')
+STRING_COLUMNS = ('block_group_id', 'TRACTCE', 'county_fips')
+
+
+def _file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _file_stat(path: Path) -> dict:
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def read_block_group_geometry(path=GEOJSON_PATH) -> gpd.GeoDataFrame:
+    """Block-group polygons from the GeoJSON: GEOID (str) + geometry"""
+    gdf = gpd.read_file(path)
+    gdf = gdf[[col for col in ['GEOID', 'geometry'] if col in gdf.columns]].copy()
+    if 'GEOID' in gdf.columns:
+        gdf['GEOID'] = gdf['GEOID'].astype(str)
+    return gdf
+
+
+def read_demographics(path=DEMOGRAPHICS_PATH) -> pd.DataFrame:
+    """Demographics CSV with enforced dtypes: string ids, ACS sentinels -> NaN (float64), numeric columns numeric"""
+    demographics = pd.read_csv(path)
+    for col in demographics.columns:
+        if col in STRING_COLUMNS:
+            demographics[col] = demographics[col].astype(str)
+            continue
+        values = pd.to_numeric(demographics[col], errors='coerce')
+        if col in SENTINEL_COLUMNS:
+            demographics[col] = values.mask(values == ACS_SENTINEL).astype('float64')
+        elif values.notna().sum() == demographics[col].notna().sum():
+            demographics[col] = values
+    return demographics
+
+
+def build_snapshot(
+    geojson_path=GEOJSON_PATH,
+    demographics_path=DEMOGRAPHICS_PATH,
+    snapshot_dir=DEFAULT_SNAPSHOT_DIR,
+    gdf: gpd.GeoDataFrame | None = None,
+    demographics: pd.DataFrame | None = None,
+) -> dict:
+    """
+    Write the GeoParquet / Feather snapshot and its manifest; returns the manifest.
+    gdf / demographics: already-parsed sources (as from read_block_group_geometry /
+    read_demographics) to skip re-reading them.
+    """
+    if feather is None:
+        raise RuntimeError("pyarrow is required to build the block-group snapshot")
+    geojson_path, demographics_path = Path(geojson_path), Path(demographics_path)
+    snapshot_dir = Path(snapshot_dir)
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    if gdf is None:
+        gdf = read_block_group_geometry(geojson_path)
+    if demographics is None:
+        demographics = read_demographics(demographics_path)
+
+    write_atomic(snapshot_dir / GEOMETRY_FILE, lambda tmp: gdf.to_parquet(tmp, index=False))
+    write_atomic(
+        snapshot_dir / DEMOGRAPHICS_FILE,
+        lambda tmp: feather.write_feather(demographics.reset_index(drop=True), tmp, compression="uncompressed"),
+    )
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "sources": {
+            "geometry": {"path": str(geojson_path), **_file_stat(geojson_path), "sha256": _file_hash(geojson_path)},
+            "demographics": {"path": str(demographics_path), **_file_stat(demographics_path), "sha256": _file_hash(demographics_path)},
+        },
+        "rows": {"geometry": len(gdf), "demographics": len(demographics)},
+        "crs": gdf.crs.to_string() if gdf.crs is not None else None,
+        "demographics_dtypes": {col: str(dtype) for col, dtype in demographics.dtypes.items()},
+    }
+    write_atomic(snapshot_dir / MANIFEST_FILE, lambda tmp: Path(tmp).write_text(json.dumps(manifest, indent=2)))
+    return manifest
+
+
+def _read_manifest(snapshot_dir: Path) -> dict | None:
+    try:
+        manifest = json.loads((snapshot_dir / MANIFEST_FILE).read_text())
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        return None
+    if not all((snapshot_dir / name).exists() for name in (GEOMETRY_FILE, DEMOGRAPHICS_FILE)):
+        return None
+    return manifest
+
+
+def snapshot_is_fresh(
+    geojson_path=GEOJSON_PATH,
+    demographics_path=DEMOGRAPHICS_PATH,
+    snapshot_dir=DEFAULT_SNAPSHOT_DIR,
+) -> bool:
+    """
+    True when the snapshot was built from the current sources (by content).
+    Sources that are absent (snapshot-only deployments) count as unchanged;
+    hash-confirmed mtime changes are written back to the manifest.
+    """
+    snapshot_dir = Path(snapshot_dir)
+    manifest = _read_manifest(snapshot_dir)
+    if manifest is None:
+        return False
+    touched = False
+    for key, path in (("geometry", Path(geojson_path)), ("demographics", Path(demographics_path))):
+        recorded = manifest["sources"].get(key, {})
+        if not path.exists():
+            continue
+        stat = _file_stat(path)
+        if stat == {"size": recorded.get("size"), "mtime_ns": recorded.get("mtime_ns")}:
+            continue
+        if stat["size"] != recorded.get("size") or _file_hash(path) != recorded.get("sha256"):
+            return False
+        recorded.update(stat)
+        touched = True
+    if touched:
+        try:
+            write_atomic(snapshot_dir / MANIFEST_FILE, lambda tmp: Path(tmp).write_text(json.dumps(manifest, indent=2)))
+        except OSError:
+            pass
+    return True
+
+
+def read_snapshot(snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """(gdf, demographics) from the snapshot files; the Feather file is memory-mapped"""
+    snapshot_dir = Path(snapshot_dir)
+    gdf = gpd.read_parquet(snapshot_dir / GEOMETRY_FILE, memory_map=True)
+    demographics = feather.read_table(snapshot_dir / DEMOGRAPHICS_FILE, memory_map=True).to_pandas()
+    return gdf, demographics
+
+
+def load_block_group_frames(
+    geojson_path=GEOJSON_PATH,
+    demographics_path=DEMOGRAPHICS_PATH,
+    snapshot_dir=DEFAULT_SNAPSHOT_DIR,
+):
+    """
+    (gdf, demographics, source) with source "snapshot" or "files". A stale or
+    missing snapshot is rebuilt from the parsed sources when possible.
+    """
+    if feather is not None and snapshot_is_fresh(geojson_path, demographics_path, snapshot_dir):
+        try:
+            gdf, demographics = read_snapshot(snapshot_dir)
+            return gdf, demographics, "snapshot"
+        except Exception as exc:
+            print(f"[snapshot] Unreadable snapshot in {snapshot_dir} ({exc}); reading source files.")
+
+    gdf = read_block_group_geometry(geojson_path)
+    demographics = read_demographics(demographics_path)
+    if feather is not None:
+        try:
+            build_snapshot(geojson_path, demographics_path, snapshot_dir, gdf=gdf, demographics=demographics)
+        except Exception as exc:
+            # Read-only deployments keep working from the source files
+            print(f"[snapshot] Could not write snapshot to {snapshot_dir} ({exc}).")
+    return gdf, demographics, "files"
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the GeoParquet/Feather block-group snapshot")
+    parser.add_argument("--geojson", type=Path, default=GEOJSON_PATH)
+    parser.add_argument("--demographics", type=Path, default=DEMOGRAPHICS_PATH)
+    parser.add_argument("--output", type=Path, default=DEFAULT_SNAPSHOT_DIR)
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the snapshot is fresh")
+
+    args = parser.parse_args(argv)
+
+    if feather is None:
+        print("[snapshot] Error: pyarrow is not installed.")
+        return 1
+    if not args.force and snapshot_is_fresh(args.geojson, args.demographics, args.output):
+        print(f"[snapshot] {args.output} is up to date.")
+        return 0
+    manifest = build_snapshot(args.geojson, args.demographics, args.output)
+    print(
+        f"[snapshot] Wrote {manifest['rows']['geometry']:,} geometries and "
+        f"{manifest['rows']['demographics']:,} demographic rows to {args.output}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,203 @@
+"""Multi-vintage EDI/HPFI panel across ACS 5-year releases.
+
+Each vintage only changes the demographic inputs (k12_pop, poverty_rate, income,
+...); block-group centroids, school locations and therefore the distance and
+2SFCA selection matrices are identical. build_edi_panel() builds those once and
+scores every vintage in one batched pass, storing the results as a compact
+(block_group x year x metric) float32 cube that trend maps and year-over-year
+change views slice without recomputing anything.
+
+Vintages must share block-group geography (ACS 2020+ use 2020 block groups);
+translate older vintages with bg_crosswalk.BlockGroupCrosswalk.convert() first.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from atomic_write import write_atomic
+from edi_uncertainty import edi_batch, hpfi_batch
+from educational_desert_index_bg import (
+    _edi_weight_matrix,
+    _get_accessibility_model,
+    _need_and_infra_scores,
+    _prepare_edi_inputs,
+)
+
+PANEL_METRICS = ("k12_pop", "poverty_rate", "income", "accessibility_2sfca", "EDI", "hpfi")
+
+# Columns a vintage frame may override on the shared base frame
+VINTAGE_COLUMNS = ("k12_pop", "poverty_rate", "income", "pct_lt_hs", "broadband_pct")
+
+
+@dataclass(frozen=True)
+class EDIPanel:
+    """Block group x year x metric cube produced by build_edi_panel()"""
+    block_group_ids: np.ndarray  # (n_bg,) str
+    years: tuple                 # vintage labels, ascending
+    metrics: tuple               # metric names along the last axis
+    values: np.ndarray           # (n_bg, n_years, n_metrics) float32
+
+    def _year_index(self, year) -> int:
+        return self.years.index(str(year))
+
+    def metric(self, name: str) -> pd.DataFrame:
+        """One metric as a block group x year frame"""
+        return pd.DataFrame(
+            self.values[:, :, self.metrics.index(name)],
+            index=pd.Index(self.block_group_ids, name="block_group_id"),
+            columns=list(self.years),
+        )
+
+    def year(self, year) -> pd.DataFrame:
+        """One vintage as a block_group_id + metrics frame"""
+        out = pd.DataFrame(self.values[:, self._year_index(year), :], columns=list(self.metrics))
+        out.insert(0, "block_group_id", self.block_group_ids)
+        return out
+
+    def change(self, name: str, start, end) -> pd.DataFrame:
+        """block_group_id, start and end values and their difference for one metric"""
+        k = self.metrics.index(name)
+        a = self.values[:, self._year_index(start), k]
+        b = self.values[:, self._year_index(end), k]
+        return pd.DataFrame({
+            "block_group_id": self.block_group_ids,
+            f"{name}_{start}": a,
+            f"{name}_{end}": b,
+            f"{name}_change": b - a,
+        })
+
+    def to_long(self) -> pd.DataFrame:
+        """Tidy (block_group_id, year, metric columns) frame"""
+        n_bg, n_years, _ = self.values.shape
+        out = pd.DataFrame(self.values.reshape(n_bg * n_years, -1), columns=list(self.metrics))
+        out.insert(0, "year", np.tile(np.array(self.years), n_bg))
+        out.insert(0, "block_group_id", np.repeat(self.block_group_ids, n_years))
+        return out
+
+    def save(self, path) -> Path:
+        """Write the cube to a compressed .npz (atomic replace)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(path, lambda tmp: np.savez_compressed(
+            tmp,
+            block_group_ids=np.asarray(self.block_group_ids, dtype=str),
+            years=np.array(self.years),
+            metrics=np.array(self.metrics),
+            values=self.values,
+        ), suffix=".tmp.npz")
+        return path
+
+    @classmethod
+    def load(cls, path) -> "EDIPanel":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                block_group_ids=data["block_group_ids"],
+                years=tuple(str(y) for y in data["years"]),
+                metrics=tuple(str(m) for m in data["metrics"]),
+                values=data["values"],
+            )
+
+
+def _vintage_frame(bg, vintage_df):
+    """Base block groups with one vintage's demographic columns swapped in"""
+    frame = bg.copy()
+    vintage = vintage_df.assign(block_group_id=vintage_df["block_group_id"].astype(str)).drop_duplicates("block_group_id")
+    vintage = vintage.set_index("block_group_id").reindex(frame["block_group_id"].astype(str).values)
+    for col in VINTAGE_COLUMNS:
+        if col in vintage.columns:
+            frame[col] = pd.to_numeric(vintage[col], errors="coerce").values
+    frame["k12_pop"] = pd.to_numeric(frame["k12_pop"], errors="coerce").fillna(0.0)
+    frame["poverty_rate"] = pd.to_numeric(frame["poverty_rate"], errors="coerce").fillna(0.0)
+    return frame
+
+
+def build_edi_panel(
+    base_df,
+    vintages: dict,
+    schools_df,
+    *,
+    catchment_km: float = 15.0,
+    beta_km: float = 5.0,
+    decay_type: str = 'exponential',
+    decay_param: float | None = None,
+    need_weights: tuple = (0.7, 0.3),
+    comp_weights: tuple = (0.40, 0.30, 0.20, 0.10),
+    include_school_types: tuple = None,
+    model: str = '2sfca',
+    hpfi_weights: dict | None = None,
+    campus_proximity=None,
+    distance_cache_dir=None,
+    distance_backend=None,
+) -> EDIPanel:
+    """
+    EDI and HPFI for several ACS vintages on shared geometry.
+
+    Parameters:
+    - base_df: Block groups with block_group_id, lat, lon and the static inputs
+      (%Christian, pct_lt_hs, broadband_pct, ...) plus current-year demographics
+    - vintages: {year: frame} with block_group_id and any of VINTAGE_COLUMNS;
+      block groups missing from a vintage get NaN metrics and zero demand
+    - campus_proximity: Campus proximity score per base_df row (HPFI input);
+      0.5-neutral when omitted
+    - Remaining parameters follow compute_edi_components()
+
+    Returns:
+    - EDIPanel with PANEL_METRICS for every year, each year identical to
+      compute_edi_block_groups() on that vintage's frame
+    """
+    base_df = base_df.reset_index(drop=True)
+    if campus_proximity is not None:
+        base_df = base_df.assign(_campus_proximity=np.asarray(campus_proximity, dtype=float))
+    bg, schools, seats_array = _prepare_edi_inputs(base_df, schools_df, include_school_types)
+    n_bg = len(bg)
+    years = tuple(sorted(str(year) for year in vintages))
+
+    # --- Geometry-only work, shared by every vintage ---
+    coords = (
+        bg["lat"].values.astype(float), bg["lon"].values.astype(float),
+        schools["lat"].values.astype(float), schools["lon"].values.astype(float),
+    )
+    accessibility_model = _get_accessibility_model(model)
+    param = beta_km if decay_param is None else decay_param
+    W, _ = _edi_weight_matrix(
+        coords, accessibility_model,
+        catchment_km=catchment_km, decay_type=decay_type, param=param, engine='sparse',
+        distance_cache_dir=distance_cache_dir, distance_backend=distance_backend,
+    )
+    M = sparse.csr_matrix(accessibility_model.selection(W, seats_array))
+    proximity = bg["_campus_proximity"].values if "_campus_proximity" in bg.columns else np.full(n_bg, 0.5)
+    christian = pd.to_numeric(bg["%Christian"], errors="coerce").values if "%Christian" in bg.columns else np.full(n_bg, np.nan)
+
+    # --- Stack the vintages: (n_years, n_bg) per input ---
+    present = np.zeros((len(years), n_bg), dtype=bool)
+    pop, poverty, income, need, infra = (np.empty((len(years), n_bg)) for _ in range(5))
+    lookup = {str(year): frame for year, frame in vintages.items()}
+    for y, year in enumerate(years):
+        frame = _vintage_frame(bg, lookup[year])
+        present[y] = bg["block_group_id"].astype(str).isin(lookup[year]["block_group_id"].astype(str)).values
+        pop[y] = frame["k12_pop"].values
+        poverty[y] = frame["poverty_rate"].values
+        income[y] = pd.to_numeric(frame["income"], errors="coerce").values if "income" in frame.columns else np.nan
+        need[y], infra[y] = _need_and_infra_scores(frame, need_weights)
+
+    # --- One batched 2SFCA + HPFI pass over all vintages ---
+    edi, A = edi_batch(M, W, seats_array, pop, need, infra, comp_weights)
+    hpfi = hpfi_batch(income, poverty, pop, edi, proximity[None, :], christian[None, :], hpfi_weights)
+
+    stacked = {
+        "k12_pop": pop, "poverty_rate": poverty, "income": income,
+        "accessibility_2sfca": A, "EDI": edi, "hpfi": hpfi,
+    }
+    values = np.stack([stacked[name].T for name in PANEL_METRICS], axis=-1).astype(np.float32)
+    values[~present.T] = np.nan
+    return EDIPanel(
+        block_group_ids=np.asarray(bg["block_group_id"].astype(str).values, dtype=str),
+        years=years,
+        metrics=PANEL_METRICS,
+        values=values,
+    )
@@ -0,0 +1,256 @@
+"""Monte Carlo uncertainty bands for the EDI and HPFI from ACS margins of error.
+
+ACS block-group estimates carry wide 90% margins of error (MOE), so a single
+ranking hides how often a block group would land in the Top-10 or the Golden
+Zone under equally plausible inputs. This module draws N perturbed realizations
+of the uncertain inputs at once as (n_draws, n_block_groups) arrays:
+
+- ``k12_pop``      with ``k12_pop_moe``
+- ``poverty_rate`` with ``poverty_rate_moe`` (percentage points)
+- ``income``       with ``income_moe``
+
+and pushes every realization through the EDI component math and the HPFI blend
+in batch. Distances, decay weights and the 2SFCA selection matrix do not depend
+on the perturbed inputs, so they are built once and shared by all draws; each
+draw only costs two sparse mat-mats. Chunks of draws run in a process pool with
+independent seeds, so results do not depend on the worker count.
+
+Missing MOE columns are treated as exact (zero-width) estimates.
+"""
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from educational_desert_index_bg import (
+    _edi_weight_matrix,
+    _get_accessibility_model,
+    _minmax_rows,
+    _need_and_infra_scores,
+    _prepare_edi_inputs,
+)
+from hpfi import blend_hpfi, hpfi_component_arrays
+
+# ACS MOEs are published at 90% confidence: SE = MOE / 1.645
+ACS_MOE_Z = 1.645
+
+# Perturbed input column -> (MOE column, lower bound, upper bound)
+UNCERTAIN_INPUTS = {
+    "k12_pop": ("k12_pop_moe", 0.0, None),
+    "poverty_rate": ("poverty_rate_moe", 0.0, 100.0),
+    "income": ("income_moe", 0.0, None),
+}
+
+
+@dataclass(frozen=True)
+class UncertaintyResult:
+    """Output of run_edi_hpfi_monte_carlo()"""
+    summary: pd.DataFrame   # one row per block group: CIs and Top-10 / Golden Zone probabilities
+    edi_draws: np.ndarray   # (n_draws, n_block_groups) EDI realizations
+    hpfi_draws: np.ndarray  # (n_draws, n_block_groups) HPFI realizations
+
+
+def moe_to_se(moe):
+    """Standard error from an ACS 90% MOE; negative ACS sentinel codes count as 0"""
+    moe = pd.to_numeric(pd.Series(np.asarray(moe, dtype=object).ravel()), errors="coerce").values.astype(float)
+    return np.where(np.isfinite(moe) & (moe > 0), moe, 0.0) / ACS_MOE_Z
+
+
+def draw_realizations(estimate, se, n_draws, rng, lower=None, upper=None):
+    """
+    (n_draws, n) normal draws around estimate with standard error se, clipped to
+    [lower, upper]. NaN estimates stay NaN in every draw.
+    """
+    estimate = np.asarray(estimate, dtype=float)
+    draws = estimate[None, :] + rng.standard_normal((int(n_draws), len(estimate))) * np.asarray(se, dtype=float)[None, :]
+    if lower is not None or upper is not None:
+        draws = np.clip(draws, lower, upper)
+    return draws
+
+
+def hpfi_batch(income, poverty_rate, k12_pop, edi, proximity, christian, weights=None):
+    """
+    HPFI (hpfi.blend_hpfi) over stacked realizations.
+    Every argument broadcasts to (k, n_block_groups); proximity is the campus
+    proximity score (exp(-km / 8)), christian the %Christian column.
+    Returns: (k, n_block_groups) HPFI in [0, 1]
+    """
+    return blend_hpfi(hpfi_component_arrays(income, poverty_rate, k12_pop, edi, proximity, christian), weights)
+
+
+def edi_batch(M, W, seats_array, pop_draws, need_score, infra_score, comp_weights):
+    """
+    EDI (0-100) for stacked demand realizations against a fixed selection
+    matrix M and gravity weights W (dense or CSR, shape (n_bg, n_schools)).
+    need_score / infra_score broadcast to (k, n_bg).
+    Returns: (edi, A) as (k, n_bg) arrays, A being the 2SFCA accessibility
+    """
+    pop_draws = np.atleast_2d(pop_draws)
+    # 2SFCA Step 1 and Step 2 for every realization: (k, n_schools) then (k, n_bg)
+    demand = np.asarray((M.T @ pop_draws.T).T)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        R = np.divide(seats_array[None, :], demand, out=np.zeros_like(demand), where=demand > 0)
+    A = np.asarray((M @ R.T).T)
+    local_seats = np.asarray(W @ seats_array).ravel()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        seat_ratio = np.divide(
+            local_seats[None, :], pop_draws,
+            out=np.zeros_like(pop_draws), where=pop_draws > 0,
+        )
+    w_access, w_ratio, w_need, w_infra = comp_weights
+    edi_raw = (
+        w_access * (1.0 - _minmax_rows(A)) +
+        w_ratio * (1.0 - _minmax_rows(seat_ratio)) +
+        w_need * need_score +
+        w_infra * infra_score
+    )
+    return 100.0 * _minmax_rows(np.broadcast_to(edi_raw, pop_draws.shape).copy()), A
+
+
+def _draw_chunk(task):
+    """Worker: one chunk of realizations -> (edi, hpfi) arrays"""
+    (seed, n_draws, inputs, M, W, seats_array, bg_static, need_weights, comp_weights,
+     proximity, christian, hpfi_weights) = task
+    rng = np.random.default_rng(seed)
+    draws = {
+        col: draw_realizations(est, se, n_draws, rng, lower=lower, upper=upper)
+        for col, (est, se, lower, upper) in inputs.items()
+    }
+    need_score, infra_score = _need_and_infra_scores(bg_static, need_weights, poverty_rate=draws["poverty_rate"])
+    edi, _ = edi_batch(M, W, seats_array, draws["k12_pop"], need_score, infra_score, comp_weights)
+    hpfi = hpfi_batch(
+        draws["income"], draws["poverty_rate"], draws["k12_pop"], edi,
+        proximity[None, :], christian[None, :], hpfi_weights,
+    )
+    return edi, hpfi
+
+
+def _top_n_mask(X, top_n):
+    """Boolean (k, n) mask of each row's top_n largest values"""
+    top_n = min(int(top_n), X.shape[1])
+    mask = np.zeros(X.shape, dtype=bool)
+    if top_n > 0:
+        idx = np.argpartition(-X, top_n - 1, axis=1)[:, :top_n]
+        np.put_along_axis(mask, idx, True, axis=1)
+    return mask
+
+
+def run_edi_hpfi_monte_carlo(
+    demographics_df,
+    schools_df,
+    *,
+    n_draws: int = 1000,
+    seed: int = 0,
+    catchment_km: float = 15.0,
+    beta_km: float = 5.0,
+    decay_type: str = 'exponential',
+    decay_param: float | None = None,
+    need_weights: tuple = (0.7, 0.3),
+    comp_weights: tuple = (0.40, 0.30, 0.20, 0.10),
+    include_school_types: tuple = None,
+    model: str = '2sfca',
+    hpfi_weights: dict | None = None,
+    campus_proximity=None,
+    distance_cache_dir=None,
+    top_n: int = 10,
+    ci: float = 0.90,
+    n_workers: int | None = None,
+    chunk_size: int = 125,
+):
+    """
+    Monte Carlo EDI/HPFI over ACS MOEs.
+
+    Parameters follow compute_edi_components(); additionally
+    - n_draws, seed: Number of realizations and base seed (reproducible for any n_workers)
+    - hpfi_weights: HPFI weights, as for hpfi.resolve_hpfi_weights()
+    - campus_proximity: Campus proximity score per row of demographics_df
+      (compute_hpfi_scores' exp(-km / 8) signal); 0.5-neutral when omitted
+    - top_n: Size of the Top-N tables whose membership probability is reported
+    - ci: Central interval width for the EDI/HPFI bands (0.90 -> 5th-95th pct)
+    - n_workers, chunk_size: Process count (default: all cores) and draws per task
+
+    Returns:
+    - UncertaintyResult; summary has, per block group, the point EDI/HPFI, mean,
+      CI bounds and P(Top-N by EDI), P(Top-N by HPFI), P(Golden Zone)
+    """
+    if int(n_draws) < 1:
+        raise ValueError("n_draws must be at least 1")
+    demographics_df = demographics_df.reset_index(drop=True)
+    if campus_proximity is not None:
+        demographics_df = demographics_df.assign(_campus_proximity=np.asarray(campus_proximity, dtype=float))
+    bg, schools, seats_array = _prepare_edi_inputs(demographics_df, schools_df, include_school_types)
+    n_bg = len(bg)
+
+    coords = (
+        bg["lat"].values.astype(float), bg["lon"].values.astype(float),
+        schools["lat"].values.astype(float), schools["lon"].values.astype(float),
+    )
+    accessibility_model = _get_accessibility_model(model)
+    param = beta_km if decay_param is None else decay_param
+    W, _ = _edi_weight_matrix(
+        coords, accessibility_model,
+        catchment_km=catchment_km, decay_type=decay_type, param=param, engine='sparse',
+        distance_cache_dir=distance_cache_dir,
+    )
+    M = sparse.csr_matrix(accessibility_model.selection(W, seats_array))
+
+    # Estimates + standard errors of the perturbed inputs
+    inputs = {}
+    for col, (moe_col, lower, upper) in UNCERTAIN_INPUTS.items():
+        est = pd.to_numeric(bg[col], errors="coerce").values.astype(float) if col in bg.columns else np.full(n_bg, np.nan)
+        se = moe_to_se(bg[moe_col].values) if moe_col in bg.columns else np.zeros(n_bg)
+        inputs[col] = (est, se, lower, upper)
+    bg_static = bg[[col for col in ("pct_lt_hs", "broadband_pct") if col in bg.columns]]
+    proximity = bg["_campus_proximity"].values if "_campus_proximity" in bg.columns else np.full(n_bg, 0.5)
+    christian = pd.to_numeric(bg["%Christian"], errors="coerce").values if "%Christian" in bg.columns else np.full(n_bg, np.nan)
+
+    # Point estimates: the zero-noise realization
+    point = _draw_chunk((
+        0, 1, {col: (est, np.zeros(n_bg), lower, upper) for col, (est, _, lower, upper) in inputs.items()},
+        M, W, seats_array, bg_static, need_weights, comp_weights, proximity, christian, hpfi_weights,
+    ))
+
+    chunk_size = max(int(chunk_size), 1)
+    sizes = [min(chunk_size, n_draws - start) for start in range(0, int(n_draws), chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [
+        (child, size, inputs, M, W, seats_array, bg_static, need_weights, comp_weights, proximity, christian, hpfi_weights)
+        for child, size in zip(seeds, sizes)
+    ]
+    n_workers = max(int(n_workers or os.cpu_count() or 1), 1)
+    if n_workers == 1 or len(tasks) <= 1:
+        results = [_draw_chunk(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(tasks))) as pool:
+            results = list(pool.map(_draw_chunk, tasks))
+    edi_draws = np.concatenate([edi for edi, _ in results]) if results else np.empty((0, n_bg))
+    hpfi_draws = np.concatenate([hpfi for _, hpfi in results]) if results else np.empty((0, n_bg))
+
+    # --- Per-block-group bands and membership probabilities ---
+    # Golden Zone per draw uses compute_edi_hpfi_zones' 75th-percentile rule (missing HPFI -> 0)
+    alpha = (1.0 - ci) / 2.0
+    hpfi_filled = np.nan_to_num(hpfi_draws, nan=0.0)
+    in_golden = (
+        (edi_draws >= np.quantile(edi_draws, 0.75, axis=1, keepdims=True)) &
+        (hpfi_filled >= np.quantile(hpfi_filled, 0.75, axis=1, keepdims=True))
+    )
+    summary = pd.DataFrame({
+        "block_group_id": bg["block_group_id"].astype(str).values,
+        "EDI": point[0][0],
+        "EDI_mean": edi_draws.mean(axis=0),
+        "EDI_lo": np.quantile(edi_draws, alpha, axis=0),
+        "EDI_hi": np.quantile(edi_draws, 1.0 - alpha, axis=0),
+        "hpfi": point[1][0],
+        "hpfi_mean": np.nanmean(hpfi_draws, axis=0),
+        "hpfi_lo": np.nanquantile(hpfi_draws, alpha, axis=0),
+        "hpfi_hi": np.nanquantile(hpfi_draws, 1.0 - alpha, axis=0),
+        "p_top_n_edi": _top_n_mask(edi_draws, top_n).mean(axis=0),
+        "p_top_n_hpfi": _top_n_mask(hpfi_filled, top_n).mean(axis=0),
+        "p_golden_zone": in_golden.mean(axis=0),
+    })
+    return UncertaintyResult(summary=summary, edi_draws=edi_draws, hpfi_draws=hpfi_draws)
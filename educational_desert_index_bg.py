@@ -3,10 +3,23 @@ Educational Desert Index calculation for Census Block Groups
 Uses rigorous 2-Step Floating Catchment Area (2SFCA) analysis with gravity decay
 """
 
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import product
+from pathlib import Path
+from typing import Callable
+
 import pandas as pd
 import numpy as np
+from scipy import sparse
+from scipy.stats import kendalltau, rankdata
+from sklearn.neighbors import BallTree
 from sklearn.preprocessing import MinMaxScaler
 
+from atomic_write import write_atomic
+
 EARTH_R_KM = 6371.0088
 
 def haversine_km(lat1, lon1, lat2, lon2):
@@ -32,70 +45,419 @@ def _to_rad(x):
     """Convert degrees to radians"""
     return np.deg2rad(x.astype(float))
 
-def _haversine_matrix(lat1, lon1, lat2, lon2):
+def _haversine_matrix(lat1, lon1, lat2, lon2, dtype=np.float64):
     """
     Vectorized distance matrix [n_points x n_points2] in km
     lat1, lon1: arrays (n1,)
     lat2, lon2: arrays (n2,)
+    dtype: float64 (default) or float32 to halve temporaries
     Returns: distance matrix (n1, n2)
     """
-    φ1 = _to_rad(lat1)[:, None]
-    λ1 = _to_rad(lon1)[:, None]
-    φ2 = _to_rad(lat2)[None, :]
-    λ2 = _to_rad(lon2)[None, :]
+    φ1 = _to_rad(lat1).astype(dtype, copy=False)[:, None]
+    λ1 = _to_rad(lon1).astype(dtype, copy=False)[:, None]
+    φ2 = _to_rad(lat2).astype(dtype, copy=False)[None, :]
+    λ2 = _to_rad(lon2).astype(dtype, copy=False)[None, :]
     dφ = φ2 - φ1
     dλ = λ2 - λ1
     a = np.sin(dφ/2.0)**2 + np.cos(φ1) * np.cos(φ2) * np.sin(dλ/2.0)**2
     c = 2.0 * np.arcsin(np.sqrt(a))
     return EARTH_R_KM * c  # (n1, n2)
 
-def compute_edi_block_groups(
-    demographics_df, 
-    schools_df, 
-    *,
-    catchment_km: float = 15.0,
-    beta_km: float = 5.0,
-    decay_type: str = 'exponential',  # 'exponential', 'gaussian', 'linear', 'fixed'
-    decay_param: float | None = None,
-    need_weights: tuple = (0.7, 0.3),  # poverty, <HS
-    comp_weights: tuple = (0.40, 0.30, 0.20, 0.10),  # access, ratio, need, infra
-    include_school_types: tuple = None,
+def _catchment_distance_csr(lat1, lon1, lat2, lon2, catchment_km):
+    """
+    Sparse distance matrix [n1 x n2] in km holding only pairs within catchment_km.
+    Uses a haversine BallTree radius query so memory scales with the number of
+    in-catchment pairs instead of n1 * n2.
+    Returns: scipy.sparse.csr_matrix (n1, n2) with distances as stored values
+    """
+    lat1 = np.asarray(lat1, dtype=float)
+    lon1 = np.asarray(lon1, dtype=float)
+    lat2 = np.asarray(lat2, dtype=float)
+    lon2 = np.asarray(lon2, dtype=float)
+    n1, n2 = len(lat1), len(lat2)
+    if n2 == 0:
+        # No candidate schools (e.g. a tile with an empty halo): BallTree needs at least one point
+        return sparse.csr_matrix((n1, 0))
+
+    tree = BallTree(np.deg2rad(np.column_stack([lat2, lon2])), metric="haversine")
+    # Query slightly wide, then apply the exact cutoff with our own haversine so
+    # boundary pairs match the dense path bit-for-bit
+    radius = (catchment_km / EARTH_R_KM) * (1.0 + 1e-9)
+    neighbors = tree.query_radius(np.deg2rad(np.column_stack([lat1, lon1])), r=radius)
+
+    counts = np.fromiter((len(ix) for ix in neighbors), dtype=np.int64, count=n1)
+    rows = np.repeat(np.arange(n1), counts)
+    cols = np.concatenate(neighbors).astype(np.int64) if counts.sum() else np.zeros(0, dtype=np.int64)
+    dist = haversine_km(lat1[rows], lon1[rows], lat2[cols], lon2[cols])
+
+    keep = dist <= catchment_km
+    D = sparse.csr_matrix((dist[keep], (rows[keep], cols[keep])), shape=(n1, n2))
+    D.sort_indices()
+    return D
+
+def _coords_fingerprint(*arrays):
+    """Stable hash of coordinate arrays (values + shapes) used as a cache key"""
+    h = hashlib.sha1()
+    for arr in arrays:
+        arr = np.ascontiguousarray(np.asarray(arr, dtype=np.float64))
+        h.update(str(arr.shape).encode())
+        h.update(arr.tobytes())
+    return h.hexdigest()[:20]
+
+def cached_array(prefix, key, builder, cache_dir="data/cache"):
+    """
+    Generic persistent array cache: <cache_dir>/<prefix>_<key>.npy is built once
+    with builder() and then reloaded memory-mapped (read-only) by every
+    session/process that asks for the same key.
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = cache_dir / f"{prefix}_{key}.npy"
+    if path.exists():
+        try:
+            return np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            pass  # Corrupt or truncated file: rebuild below
+    arr = builder()
+    write_atomic(path, lambda tmp: np.save(tmp, arr), suffix=".tmp.npy")
+    return np.load(path, mmap_mode="r")
+
+def cached_distance_matrix(lat1, lon1, lat2, lon2, cache_dir="data/cache"):
+    """
+    Dense haversine matrix [n1 x n2] persisted under cache_dir as a .npy file
+    keyed by a fingerprint of the four coordinate arrays.
+    Returns a read-only memory-mapped array, shared by every session/process
+    that asks for the same coordinates.
+    """
+    return cached_array(
+        "dist",
+        _coords_fingerprint(lat1, lon1, lat2, lon2),
+        lambda: _haversine_matrix(lat1, lon1, lat2, lon2),
+        cache_dir=cache_dir,
+    )
+
+def cached_catchment_distance_csr(lat1, lon1, lat2, lon2, catchment_km, cache_dir="data/cache"):
+    """
+    Sparse counterpart of cached_distance_matrix: the in-catchment CSR matrix is
+    stored as data/indices/indptr .npy files and reloaded memory-mapped.
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    key = _coords_fingerprint(lat1, lon1, lat2, lon2, [catchment_km])
+    paths = {part: cache_dir / f"csr_{key}_{part}.npy" for part in ("data", "indices", "indptr")}
+    shape = (len(lat1), len(lat2))
+    # indptr is written last, so its presence marks a complete entry
+    if paths["indptr"].exists():
+        try:
+            parts = {part: np.load(path, mmap_mode="r") for part, path in paths.items()}
+            return sparse.csr_matrix((parts["data"], parts["indices"], parts["indptr"]), shape=shape, copy=False)
+        except (OSError, ValueError):
+            pass
+    D = _catchment_distance_csr(lat1, lon1, lat2, lon2, catchment_km)
+    for part in ("data", "indices", "indptr"):
+        arr = getattr(D, part)
+        write_atomic(paths[part], lambda tmp: np.save(tmp, arr), suffix=".tmp.npy")
+    return D
+
+def _decay_weights(D, decay_type, param):
+    """
+    Gravity weight w(d) for an array of distances (dense matrix or CSR data vector).
+    Catchment masking is applied by the caller.
+    """
+    if decay_type == 'gaussian':
+        # sigma = param, w(d) = exp(- (d/sigma)^2 )
+        return np.exp(- (D / param) ** 2)
+    if decay_type == 'linear':
+        # w(d) = max(0, 1 - d / param)
+        return np.clip(1.0 - (D / param), 0.0, 1.0)
+    if decay_type == 'fixed':
+        # w(d) = 1.0 inside param radius, 0 otherwise
+        return (D <= param).astype(float)
+    # 'exponential' and default for unknown types
+    return np.exp(-D / param)
+
+# --- Pluggable accessibility models ---
+# Every model is "gravity weights -> row-local selection matrix M -> shared two steps":
+#   Step 1: R_j = seats_j / Σ_i(pop_i × M_ij)     Step 2: A_i = Σ_j(M_ij × R_j)
+# Selection only looks at one block-group row at a time, so it works unchanged on
+# dense matrices, stacked (k, n_bg, n_schools) arrays, CSR matrices and row tiles.
+
+# E2SFCA stepped zones as (upper bound as fraction of catchment_km, weight);
+# weights follow Luo & Qi (2009)
+E2SFCA_ZONES = ((1.0 / 3.0, 1.0), (2.0 / 3.0, 0.68), (1.0, 0.22))
+
+@dataclass(frozen=True)
+class AccessibilityModel:
+    """
+    Accessibility kernel used by compute_edi_components(model=...).
+    - selection(W, seats) -> M: row-local transform of the gravity weights
+    - weights(D, catchment_km) -> W: optional replacement for decay_type
+      (applied before the catchment cutoff)
+    """
+    name: str
+    selection: Callable
+    weights: Callable | None = None
+    description: str = ""
+
+def _row_sums(W):
+    """Row sums of a dense (..., n_bg, n_schools) array or CSR matrix"""
+    if sparse.issparse(W):
+        return np.asarray(W.sum(axis=1)).ravel()
+    return W.sum(axis=-1)
+
+def _scale_rows(W, scale):
+    """Multiply each row of W by scale (dense broadcast or CSR diagonal product)"""
+    if sparse.issparse(W):
+        return sparse.csr_matrix(sparse.diags(scale) @ W)
+    return W * scale[..., None]
+
+def _safe_inverse(x):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.divide(1.0, x, out=np.zeros_like(x, dtype=float), where=x > 0).astype(x.dtype, copy=False)
+
+def _select_gravity(W, seats_array):
+    """Classic 2SFCA / E2SFCA: M = W"""
+    return W
+
+def _select_3sfca(W, seats_array):
+    """3SFCA (Wan et al. 2012): M_ij = G_ij × W_ij with Huff-style selection G_ij = W_ij / Σ_k W_ik"""
+    if sparse.issparse(W):
+        squared = W.multiply(W).tocsr()
+    else:
+        squared = W * W
+    return _scale_rows(squared, _safe_inverse(_row_sums(W)))
+
+def _select_huff(W, seats_array):
+    """Huff model: M_ij = P_ij = seats_j × W_ij / Σ_k seats_k × W_ik (patronage probability)"""
+    if sparse.issparse(W):
+        attraction = sparse.csr_matrix(W @ sparse.diags(seats_array.astype(W.dtype)))
+    else:
+        attraction = W * seats_array.astype(W.dtype)
+    return _scale_rows(attraction, _safe_inverse(_row_sums(attraction)))
+
+def _stepped_zone_weights(D, catchment_km):
+    """E2SFCA step function over E2SFCA_ZONES (distances past the last zone get 0)"""
+    W = np.zeros(np.broadcast_shapes(np.shape(D), np.shape(catchment_km)), dtype=np.result_type(D, np.float32))
+    # Walk zones outermost-first so inner zones overwrite
+    for frac, weight in reversed(E2SFCA_ZONES):
+        W[np.broadcast_to(D <= catchment_km * frac, W.shape)] = weight
+    return W
+
+ACCESSIBILITY_MODELS: dict[str, AccessibilityModel] = {
+    '2sfca': AccessibilityModel('2sfca', _select_gravity, description="Classic 2SFCA with gravity decay"),
+    'e2sfca': AccessibilityModel('e2sfca', _select_gravity, weights=_stepped_zone_weights,
+                                 description="Enhanced 2SFCA with stepped distance zones"),
+    '3sfca': AccessibilityModel('3sfca', _select_3sfca,
+                                description="3SFCA: Huff-style selection weights fix demand over-counting"),
+    'huff': AccessibilityModel('huff', _select_huff,
+                               description="Huff-model patronage probabilities (seat-weighted)"),
+}
+
+def register_accessibility_model(model: AccessibilityModel):
+    """Add or replace an accessibility model available to the EDI engines"""
+    ACCESSIBILITY_MODELS[model.name] = model
+
+def _get_accessibility_model(model):
+    if isinstance(model, AccessibilityModel):
+        return model
+    try:
+        return ACCESSIBILITY_MODELS[model]
+    except KeyError:
+        raise ValueError(
+            f"Unknown accessibility model: {model!r} (expected one of {', '.join(ACCESSIBILITY_MODELS)})"
+        ) from None
+
+def _gravity_weights(D, model, decay_type, param, catchment_km):
+    """Model-specific weights if the model defines them, else the decay_type function"""
+    if model.weights is not None:
+        return model.weights(D, catchment_km)
+    return _decay_weights(D, decay_type, param)
+
+def _row_min_csr(D, fill_value):
+    """Minimum stored value per row of a CSR matrix; fill_value for empty rows"""
+    out = np.full(D.shape[0], float(fill_value))
+    nonempty = np.diff(D.indptr) > 0
+    if nonempty.any():
+        out[nonempty] = np.minimum.reduceat(D.data, D.indptr[:-1][nonempty])
+    return out
+
+def _provider_ratios(seats_array, weighted_demand_per_school):
+    """2SFCA Step 1 ratio R_j = seats_j / weighted demand_j (0 where demand is 0)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.divide(
+            seats_array, 
+            weighted_demand_per_school,
+            out=np.zeros_like(seats_array, dtype=float),
+            where=weighted_demand_per_school > 0
+        )
+
+def _blocked_2sfca(
+    lat1, lon1, lat2, lon2, pop_array, seats_array,
+    *, catchment_km, decay_type, param, model=None, tile_rows=256, dtype=np.float64,
 ):
     """
-    Educational Desert Index (0-100, higher=worse) using true 2SFCA.
+    2SFCA over tiles of tile_rows block groups without materializing the full
+    n_bg x n_schools matrix; only (tile_rows, n_schools) temporaries exist.
+    Pass 1 accumulates weighted demand per school, local seats and nearest
+    distance; pass 2 recomputes each tile's weights to apply the ratios R_j.
+    Tile matmuls run in the tile dtype; only the cross-tile reduction of the
+    per-school demand (and the outputs) is float64.
+    Accessibility models apply per tile since their selection is row-local.
+    Returns: (weighted_demand_per_school, R, A, local_seats, nearest_km)
+    """
+    model = _get_accessibility_model(model or '2sfca')
+    n1 = len(lat1)
+    tile_rows = max(int(tile_rows), 1)
+    seats_tile = seats_array.astype(dtype)
+    pop_tile = pop_array.astype(dtype)
     
-    This is the RIGOROUS method using Two-Step Floating Catchment Area analysis:
-    - Step 1: For each school, compute gravity-weighted demand in catchment
-    - Step 2: For each block group, sum accessibility from all nearby schools
-    - Gravity decay: w(d) = exp(-d / beta_km) prevents distant schools from dominating
+    def tile_weights(rows):
+        D = _haversine_matrix(lat1[rows], lon1[rows], lat2, lon2, dtype=dtype)
+        within_catchment = D <= catchment_km
+        nearest = np.where(within_catchment.any(axis=1), D.min(axis=1), catchment_km)
+        W = _gravity_weights(D, model, decay_type, param, catchment_km).astype(dtype, copy=False)
+        W *= within_catchment
+        return W, nearest
     
-    Components (higher = worse educational desert):
-    1. Accessibility (40%) - 2SFCA-based school access with gravity decay
-    2. School-to-Student Ratio (30%) - Local capacity vs K-12 population
-    3. Socioeconomic Need (20%) - Poverty rate + % adults without HS diploma
-    4. Infrastructure (10%) - Broadband access (real ACS data or poverty proxy)
+    weighted_demand_per_school = np.zeros(len(lat2))
+    local_seats = np.empty(n1)
+    nearest_km = np.empty(n1)
+    for start in range(0, n1, tile_rows):
+        rows = slice(start, start + tile_rows)
+        W, nearest_km[rows] = tile_weights(rows)
+        weighted_demand_per_school += pop_tile[rows] @ model.selection(W, seats_tile)
+        local_seats[rows] = W @ seats_tile
     
-    Required demographics_df columns:
-      - block_group_id, lat, lon, k12_pop, poverty_rate
-      - Optional: pct_lt_hs, broadband_pct
+    R = _provider_ratios(seats_array, weighted_demand_per_school)
+    R_tile = R.astype(dtype)
+    A = np.empty(n1)
+    for start in range(0, n1, tile_rows):
+        rows = slice(start, start + tile_rows)
+        W, _ = tile_weights(rows)
+        A[rows] = model.selection(W, seats_tile) @ R_tile
     
-    Required schools_df columns:
-      - lat, lon
-      - One of: capacity OR enrollment
-      - Optional: type (for filtering), school_name
+    return weighted_demand_per_school, R, A, local_seats, nearest_km
+
+KM_PER_DEGREE = EARTH_R_KM * np.pi / 180.0
+
+def _spatial_tiles(block_group_ids, lat, lon, n_tiles):
+    """
+    Partition block-group row indices into spatial tiles.
+    Multi-county inputs split by county (state+county GEOID prefix, merged into
+    at most n_tiles groups); single-county inputs split into latitude bands.
+    Returns: list of integer index arrays
+    """
+    counties = pd.Series(block_group_ids).astype(str).str[:5].values
+    unique_counties = pd.unique(counties)
+    if len(unique_counties) > 1:
+        # Largest counties first, each assigned to the currently smallest tile
+        sizes = pd.Series(counties).value_counts()
+        buckets = [[] for _ in range(min(n_tiles, len(unique_counties)))]
+        bucket_sizes = np.zeros(len(buckets))
+        for county, size in sizes.items():
+            target = int(np.argmin(bucket_sizes))
+            buckets[target].append(county)
+            bucket_sizes[target] += size
+        return [np.flatnonzero(np.isin(counties, bucket)) for bucket in buckets]
+    order = np.argsort(lat, kind="stable")
+    return [np.sort(band) for band in np.array_split(order, n_tiles) if len(band)]
+
+def _halo_school_index(tile_lat, tile_lon, school_lat, school_lon, catchment_km):
+    """Schools inside the tile bounding box grown by a catchment_km halo"""
+    dlat = catchment_km / KM_PER_DEGREE
+    max_abs_lat = min(max(np.abs(tile_lat).max() + dlat, 0.0), 89.0)
+    dlon = catchment_km / (KM_PER_DEGREE * np.cos(np.deg2rad(max_abs_lat)))
+    inside = (
+        (school_lat >= tile_lat.min() - dlat) & (school_lat <= tile_lat.max() + dlat) &
+        (school_lon >= tile_lon.min() - dlon) & (school_lon <= tile_lon.max() + dlon)
+    )
+    return np.flatnonzero(inside)
+
+def _tile_selection(task):
+    """Sparse gravity weights W and model selection M for one tile against its halo schools"""
+    D = _catchment_distance_csr(
+        task["lat"], task["lon"], task["school_lat"], task["school_lon"], task["catchment_km"]
+    )
+    W = D.copy()
+    W.data = _gravity_weights(D.data, task["model"], task["decay_type"], task["param"], task["catchment_km"])
+    return D, W, task["model"].selection(W, task["seats"])
+
+def _tile_step1(task):
+    """Worker: partial Step 1 demand over halo schools, plus tile-local diagnostics"""
+    D, W, M = _tile_selection(task)
+    return (
+        M.T @ task["pop"],
+        W @ task["seats"],
+        _row_min_csr(D, task["catchment_km"]),
+    )
+
+def _tile_step2(task):
+    """Worker: Step 2 accessibility for the tile given globally reduced R_j"""
+    _, _, M = _tile_selection(task)
+    return M @ task["R"]
+
+def _parallel_2sfca(
+    block_group_ids, lat1, lon1, lat2, lon2, pop_array, seats_array,
+    *, catchment_km, decay_type, param, model=None, n_workers=None, n_tiles=None,
+):
+    """
+    Region-partitioned 2SFCA in a process pool.
+    Block groups are split into spatial tiles; each tile only sees schools within a
+    catchment_km halo of its bounding box, which contains every school it can reach.
+    Per-school Step 1 demand from all tiles is summed before any Step 2 runs, so the
+    result matches the single-process engines.
+    Returns: (weighted_demand_per_school, R, A, local_seats, nearest_km)
+    """
+    model = _get_accessibility_model(model or '2sfca')
+    n_workers = max(int(n_workers or os.cpu_count() or 1), 1)
+    tiles = _spatial_tiles(block_group_ids, lat1, lon1, max(int(n_tiles or n_workers), 1))
     
-    Parameters:
-    - catchment_km: Maximum distance to consider schools (default 15 km)
-    - beta_km: Gravity decay scale - lower = nearby schools weighted more (default 5 km)
-    - need_weights: (poverty_weight, education_weight) default (0.7, 0.3)
-    - comp_weights: (access, ratio, need, infra) default (0.40, 0.30, 0.20, 0.10)
-    - include_school_types: Tuple of types to include, e.g., ("Public", "Charter")
+    tasks = []
+    for rows in tiles:
+        halo = _halo_school_index(lat1[rows], lon1[rows], lat2, lon2, catchment_km)
+        tasks.append({
+            "rows": rows, "halo": halo,
+            "lat": lat1[rows], "lon": lon1[rows], "pop": pop_array[rows],
+            "school_lat": lat2[halo], "school_lon": lon2[halo], "seats": seats_array[halo],
+            "catchment_km": catchment_km, "decay_type": decay_type, "param": param, "model": model,
+        })
     
-    Returns:
-    - DataFrame with EDI scores and component breakdowns for each block group
-    """
+    if n_workers == 1 or len(tasks) == 1:
+        step1 = list(map(_tile_step1, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(tasks))) as pool:
+            step1 = list(pool.map(_tile_step1, tasks))
+    
+    # Reduce Step 1 demand across tiles before computing R_j
+    n1 = len(lat1)
+    weighted_demand_per_school = np.zeros(len(lat2))
+    local_seats = np.empty(n1)
+    nearest_km = np.empty(n1)
+    for task, (partial_demand, tile_seats, tile_nearest) in zip(tasks, step1):
+        if len(task["halo"]):
+            np.add.at(weighted_demand_per_school, task["halo"], partial_demand)
+        local_seats[task["rows"]] = tile_seats
+        nearest_km[task["rows"]] = tile_nearest
+    R = _provider_ratios(seats_array, weighted_demand_per_school)
+    
+    for task in tasks:
+        task["R"] = R[task["halo"]]
+    if n_workers == 1 or len(tasks) == 1:
+        step2 = list(map(_tile_step2, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(tasks))) as pool:
+            step2 = list(pool.map(_tile_step2, tasks))
+    A = np.empty(n1)
+    for task, tile_A in zip(tasks, step2):
+        A[task["rows"]] = tile_A
     
-    # --- Input validation ---
+    return weighted_demand_per_school, R, A, local_seats, nearest_km
+
+def _prepare_edi_inputs(demographics_df, schools_df, include_school_types=None):
+    """
+    Validate and clean EDI inputs.
+    Returns: (bg, schools, seats_array) with seats imputed for every school
+    """
     bg = demographics_df.copy()
     schools = schools_df.copy()
     
@@ -129,32 +491,6 @@ def compute_edi_block_groups(
     if len(bg) == 0 or len(schools) == 0:
         raise ValueError("No valid block groups or schools after data cleaning")
     
-    # --- Distance matrix (vectorized) ---
-    D = _haversine_matrix(
-        bg["lat"].values, bg["lon"].values,
-        schools["lat"].values, schools["lon"].values
-    )  # (n_bg, n_schools)
-    
-    within_catchment = D <= catchment_km
-    
-    # --- Gravity weights: multiple decay options ---
-    # Schools outside catchment get zero weight, regardless of decay
-    param = beta_km if decay_param is None else decay_param
-    if decay_type == 'exponential':
-        W = np.exp(-D / param) * within_catchment
-    elif decay_type == 'gaussian':
-        # sigma = param, w(d) = exp(- (d/sigma)^2 )
-        W = np.exp(- (D / param) ** 2) * within_catchment
-    elif decay_type == 'linear':
-        # w(d) = max(0, 1 - d / param)
-        W = np.clip(1.0 - (D / param), 0.0, 1.0) * within_catchment
-    elif decay_type == 'fixed':
-        # w(d) = 1.0 inside param radius, 0 otherwise
-        W = (D <= param).astype(float) * within_catchment
-    else:
-        # Default exponential if unknown
-        W = np.exp(-D / param) * within_catchment
-    
     # --- School supply (seats) ---
     # Prefer capacity, else enrollment, else median by type, else global median
     if "capacity" in schools.columns:
@@ -177,44 +513,20 @@ def compute_edi_block_groups(
     seats = seats.fillna(global_median).astype(float)
     seats_array = seats.values  # (n_schools,)
     
-    # --- 2SFCA Step 1: Provider ratios R_j ---
-    # For each school j: R_j = seats_j / Σ_i(pop_i × w(d_ij))
-    pop_array = bg["k12_pop"].values  # (n_bg,)
-    weighted_demand_per_school = (pop_array[:, None] * W).sum(axis=0)  # (n_schools,)
-    
-    # Avoid division by zero
-    with np.errstate(divide='ignore', invalid='ignore'):
-        R = np.divide(
-            seats_array, 
-            weighted_demand_per_school,
-            out=np.zeros_like(seats_array),
-            where=weighted_demand_per_school > 0
-        )
-    
-    # --- 2SFCA Step 2: Accessibility A_i ---
-    # For each block group i: A_i = Σ_j(R_j × w(d_ij))
-    A = (W * R[None, :]).sum(axis=1)  # (n_bg,)
-    
-    # --- Component 1: Accessibility score (40%) ---
-    # Higher A = better access, so invert for "desert" score
-    scaler = MinMaxScaler()
-    access_score = 1.0 - scaler.fit_transform(A.reshape(-1, 1)).ravel()
-    
-    # --- Component 2: School-to-student ratio (30%) ---
-    # Simple local capacity check: total nearby seats / k12_pop
-    local_seats = (W * seats_array[None, :]).sum(axis=1)
-    with np.errstate(divide='ignore', invalid='ignore'):
-        seat_ratio = np.divide(
-            local_seats, 
-            pop_array,
-            out=np.zeros_like(local_seats),
-            where=pop_array > 0
-        )
-    ratio_score = 1.0 - MinMaxScaler().fit_transform(seat_ratio.reshape(-1, 1)).ravel()
-    
+    return bg, schools, seats_array
+
+def _need_and_infra_scores(bg, need_weights, poverty_rate=None):
+    """
+    Distance-independent EDI components (0-1, higher = worse).
+    poverty_rate optionally overrides bg["poverty_rate"] with a (k, n_bg) stack of
+    realizations (e.g. Monte Carlo draws); scores then come back stacked too.
+    Returns: (need_score, infra_score)
+    """
     # --- Component 3: Socioeconomic Need (20%) ---
     # Combine poverty rate + % adults without HS diploma
-    poverty_norm = bg["poverty_rate"].values / 100.0
+    if poverty_rate is None:
+        poverty_rate = bg["poverty_rate"].values
+    poverty_norm = np.asarray(poverty_rate, dtype=float) / 100.0
     
     if "pct_lt_hs" in bg.columns:
         lt_hs = pd.to_numeric(bg["pct_lt_hs"], errors="coerce").fillna(0.0).values / 100.0
@@ -234,31 +546,75 @@ def compute_edi_block_groups(
         infra_score = 1.0 - broadband  # Invert: lower broadband = worse
     else:
         # Fallback: mild inverse-poverty proxy
-        max_pov = max(poverty_norm.max(), 1e-6)
+        max_pov = np.maximum(poverty_norm.max(axis=-1, keepdims=True), 1e-6)
         infra_score = np.clip(0.5 * (poverty_norm / max_pov), 0, 1)
     
-    # --- Combine into final EDI ---
-    w_access, w_ratio, w_need, w_infra = comp_weights
-    edi_raw = (
-        w_access * access_score +
-        w_ratio * ratio_score +
-        w_need * need_score +
-        w_infra * infra_score
-    )
+    return need_score, infra_score
+
+def _edi_weight_matrix(
+    coords, accessibility_model, *, catchment_km, decay_type, param,
+    engine='dense', distance_cache_dir=None, distance_backend=None,
+):
+    """
+    In-catchment gravity weights W (dense array or CSR) for the 'dense' and
+    'sparse' engines, plus each block group's nearest in-catchment distance.
+    Returns: (W, nearest_km)
+    """
+    if engine == 'sparse':
+        if distance_backend is not None:
+            D = distance_backend.catchment_csr(*coords, catchment_km)
+        elif distance_cache_dir is not None:
+            D = cached_catchment_distance_csr(*coords, catchment_km, cache_dir=distance_cache_dir)
+        else:
+            D = _catchment_distance_csr(*coords, catchment_km)
+        # D: CSR (n_bg, n_schools), in-catchment pairs only
+        W = D.copy()
+        W.data = _gravity_weights(D.data, accessibility_model, decay_type, param, catchment_km)
+        nearest_km = _row_min_csr(D, catchment_km)
+    elif engine == 'dense':
+        if distance_backend is not None:
+            D = distance_backend.matrix(*coords, catchment_km)
+        elif distance_cache_dir is not None:
+            D = cached_distance_matrix(*coords, cache_dir=distance_cache_dir)
+        else:
+            D = _haversine_matrix(*coords)
+        # D: (n_bg, n_schools); network backends mark out-of-reach pairs as inf
+        within_catchment = D <= catchment_km
+        W = np.where(within_catchment, _gravity_weights(D, accessibility_model, decay_type, param, catchment_km), 0.0)
+        nearest_km = np.where(within_catchment.any(axis=1), D.min(axis=1), catchment_km)
+    else:
+        raise ValueError(f"Unknown engine: {engine!r} (expected 'dense', 'sparse', 'blocked' or 'parallel')")
+    return W, nearest_km
+
+def _edi_component_frame(bg, pop_array, A, local_seats, nearest_km, need_weights):
+    """
+    Component scores + diagnostics frame shared by compute_edi_components() and
+    EDIWhatIf: turns 2SFCA accessibility A and gravity-weighted local seats into
+    the four 0-1 components.
+    """
+    # --- Component 1: Accessibility score (40%) ---
+    # Higher A = better access, so invert for "desert" score
+    scaler = MinMaxScaler()
+    access_score = 1.0 - scaler.fit_transform(A.reshape(-1, 1)).ravel()
     
-    # Scale to 0-100 for interpretability
-    edi_0_100 = MinMaxScaler(feature_range=(0, 100)).fit_transform(
-        edi_raw.reshape(-1, 1)
-    ).ravel()
+    # --- Component 2: School-to-student ratio (30%) ---
+    # Simple local capacity check: total nearby seats / k12_pop
+    with np.errstate(divide='ignore', invalid='ignore'):
+        seat_ratio = np.divide(
+            local_seats, 
+            pop_array,
+            out=np.zeros_like(local_seats),
+            where=pop_array > 0
+        )
+    ratio_score = 1.0 - MinMaxScaler().fit_transform(seat_ratio.reshape(-1, 1)).ravel()
     
-    # --- Build output DataFrame ---
+    # --- Components 3 & 4: Socioeconomic Need (20%) + Infrastructure (10%) ---
+    need_score, infra_score = _need_and_infra_scores(bg, need_weights)
+    
+    # --- Build output DataFrame (EDI blend happens in combine_edi_components) ---
     out = bg[["block_group_id", "lat", "lon", "k12_pop"]].copy()
     out["poverty_rate"] = bg["poverty_rate"].values
-    out["nearest_school_km"] = np.where(
-        within_catchment.any(axis=1), 
-        D.min(axis=1), 
-        catchment_km
-    )
+    out["nearest_school_km"] = nearest_km
     out["nearby_seats"] = local_seats
     out["seat_ratio"] = seat_ratio
     out["accessibility_2sfca"] = A
@@ -267,10 +623,532 @@ def compute_edi_block_groups(
     out["ratio_score"] = ratio_score
     out["need_score"] = need_score
     out["infra_score"] = infra_score
-    out["EDI"] = edi_0_100
     
     return out
 
+EDI_COMPONENT_COLUMNS = ("access_score", "ratio_score", "need_score", "infra_score")
+
+def compute_edi_block_groups(
+    demographics_df, 
+    schools_df, 
+    *,
+    catchment_km: float = 15.0,
+    beta_km: float = 5.0,
+    decay_type: str = 'exponential',  # 'exponential', 'gaussian', 'linear', 'fixed'
+    decay_param: float | None = None,
+    need_weights: tuple = (0.7, 0.3),  # poverty, <HS
+    comp_weights: tuple = (0.40, 0.30, 0.20, 0.10),  # access, ratio, need, infra
+    include_school_types: tuple = None,
+    engine: str = 'dense',  # 'dense', 'sparse', 'blocked' or 'parallel'
+    distance_cache_dir: str | Path | None = None,
+    tile_rows: int = 256,
+    dtype=np.float64,
+    model: str | AccessibilityModel = '2sfca',  # see ACCESSIBILITY_MODELS
+    n_workers: int | None = None,
+    n_tiles: int | None = None,
+    distance_backend=None,
+):
+    """
+    Educational Desert Index (0-100, higher=worse) using true 2SFCA.
+    
+    One-shot wrapper around the two-stage API:
+    compute_edi_components() (distances, decay, 2SFCA ratios, need/infra) followed by
+    combine_edi_components() (weighted blend of the four components + 0-100 rescale).
+    Callers that re-weight repeatedly should cache stage one and only call stage two.
+    
+    See compute_edi_components() for the methodology and parameters;
+    comp_weights is (access, ratio, need, infra), default (0.40, 0.30, 0.20, 0.10).
+    
+    Returns:
+    - DataFrame with EDI scores and component breakdowns for each block group
+    """
+    components = compute_edi_components(
+        demographics_df,
+        schools_df,
+        catchment_km=catchment_km,
+        beta_km=beta_km,
+        decay_type=decay_type,
+        decay_param=decay_param,
+        need_weights=need_weights,
+        include_school_types=include_school_types,
+        engine=engine,
+        distance_cache_dir=distance_cache_dir,
+        tile_rows=tile_rows,
+        dtype=dtype,
+        model=model,
+        n_workers=n_workers,
+        n_tiles=n_tiles,
+        distance_backend=distance_backend,
+    )
+    return combine_edi_components(components, comp_weights)
+
+def combine_edi_components(components_df, comp_weights: tuple = (0.40, 0.30, 0.20, 0.10)):
+    """
+    Stage two of the EDI: blend the raw component columns under comp_weights
+    (access, ratio, need, infra) and rescale to 0-100.
+    
+    O(n_block_groups) - no distances or 2SFCA work - so weight sliders can call it
+    on every rerun against a cached compute_edi_components() frame.
+    
+    Returns:
+    - Copy of components_df with an 'EDI' column
+    """
+    missing = [col for col in EDI_COMPONENT_COLUMNS if col not in components_df.columns]
+    if missing:
+        raise ValueError(f"components_df missing EDI component columns: {', '.join(missing)}")
+    
+    w_access, w_ratio, w_need, w_infra = comp_weights
+    edi_raw = (
+        w_access * components_df["access_score"].values +
+        w_ratio * components_df["ratio_score"].values +
+        w_need * components_df["need_score"].values +
+        w_infra * components_df["infra_score"].values
+    )
+    
+    out = components_df.copy()
+    if len(out) == 0:
+        out["EDI"] = np.zeros(0)
+        return out
+    
+    # Scale to 0-100 for interpretability
+    out["EDI"] = MinMaxScaler(feature_range=(0, 100)).fit_transform(
+        edi_raw.reshape(-1, 1)
+    ).ravel()
+    return out
+
+def compute_edi_components(
+    demographics_df, 
+    schools_df, 
+    *,
+    catchment_km: float = 15.0,
+    beta_km: float = 5.0,
+    decay_type: str = 'exponential',  # 'exponential', 'gaussian', 'linear', 'fixed'
+    decay_param: float | None = None,
+    need_weights: tuple = (0.7, 0.3),  # poverty, <HS
+    include_school_types: tuple = None,
+    engine: str = 'dense',  # 'dense', 'sparse', 'blocked' or 'parallel'
+    distance_cache_dir: str | Path | None = None,
+    tile_rows: int = 256,
+    dtype=np.float64,
+    model: str | AccessibilityModel = '2sfca',  # see ACCESSIBILITY_MODELS
+    n_workers: int | None = None,
+    n_tiles: int | None = None,
+    distance_backend=None,
+):
+    """
+    Stage one of the Educational Desert Index: raw components from true 2SFCA.
+    
+    This is the RIGOROUS method using Two-Step Floating Catchment Area analysis:
+    - Step 1: For each school, compute gravity-weighted demand in catchment
+    - Step 2: For each block group, sum accessibility from all nearby schools
+    - Gravity decay: w(d) = exp(-d / beta_km) prevents distant schools from dominating
+    
+    Components (higher = worse educational desert):
+    1. Accessibility (40%) - 2SFCA-based school access with gravity decay
+    2. School-to-Student Ratio (30%) - Local capacity vs K-12 population
+    3. Socioeconomic Need (20%) - Poverty rate + % adults without HS diploma
+    4. Infrastructure (10%) - Broadband access (real ACS data or poverty proxy)
+    
+    Required demographics_df columns:
+      - block_group_id, lat, lon, k12_pop, poverty_rate
+      - Optional: pct_lt_hs, broadband_pct
+    
+    Required schools_df columns:
+      - lat, lon
+      - One of: capacity OR enrollment
+      - Optional: type (for filtering), school_name
+    
+    Parameters:
+    - catchment_km: Maximum distance to consider schools (default 15 km)
+    - beta_km: Gravity decay scale - lower = nearby schools weighted more (default 5 km)
+    - need_weights: (poverty_weight, education_weight) default (0.7, 0.3)
+    - include_school_types: Tuple of types to include, e.g., ("Public", "Charter")
+    - engine: 'dense' builds the full n_bg x n_schools matrix; 'sparse' keeps only
+      in-catchment pairs (BallTree query + CSR) and scales with that pair count
+      'blocked' streams block-group rows in tiles of tile_rows and never holds the
+      full matrix, so peak memory stays flat regardless of region size;
+      'parallel' splits the study area into spatial tiles (by county when several
+      are present) with a catchment_km halo and runs them in a process pool
+    - distance_cache_dir: If set (e.g. "data/cache"), distance matrices are persisted
+      there as memory-mapped .npy files keyed by the coordinates, so reruns with the
+      same block groups and schools skip the trigonometry entirely (dense/sparse only)
+    - tile_rows, dtype: Tile height and float precision (np.float32 halves tile
+      memory) for the 'blocked' engine
+    - model: Accessibility kernel - '2sfca' (default), 'e2sfca' (stepped zones,
+      ignores decay_type), '3sfca' (Huff-style selection weights) or 'huff'
+      (patronage probabilities); all run on the same single distance matrix
+    - n_workers, n_tiles: Process count (default: all cores) and tile count
+      (default: n_workers) for the 'parallel' engine
+    - distance_backend: Optional travel-cost backend replacing haversine distances,
+      e.g. travel_network.NetworkDistanceBackend over a local road graph. It must
+      provide matrix(lat1, lon1, lat2, lon2, cutoff) (dense, inf beyond cutoff) and
+      catchment_csr(...) (sparse); catchment_km, beta_km and decay_param are then
+      read in the backend's units (km of road, or minutes). Dense/sparse engines only
+    
+    Returns:
+    - DataFrame with 2SFCA diagnostics and the four 0-1 component scores
+      (access_score, ratio_score, need_score, infra_score) per block group; pass it
+      to combine_edi_components() to get the EDI
+    """
+    
+    bg, schools, seats_array = _prepare_edi_inputs(demographics_df, schools_df, include_school_types)
+    
+    # --- Distance matrix + gravity weights ---
+    # Schools outside catchment get zero weight, regardless of decay
+    param = beta_km if decay_param is None else decay_param
+    coords = (
+        bg["lat"].values.astype(float), bg["lon"].values.astype(float),
+        schools["lat"].values.astype(float), schools["lon"].values.astype(float),
+    )
+    accessibility_model = _get_accessibility_model(model)
+    pop_array = bg["k12_pop"].values.astype(float)  # (n_bg,)
+    if distance_backend is not None and engine not in ('dense', 'sparse'):
+        raise ValueError(f"distance_backend requires engine='dense' or 'sparse' (got {engine!r})")
+    if engine == 'blocked':
+        # Tiled 2SFCA: Step 1 sums are accumulated tile by tile before Step 2
+        weighted_demand_per_school, R, A, local_seats, nearest_km = _blocked_2sfca(
+            *coords, pop_array, seats_array,
+            catchment_km=catchment_km, decay_type=decay_type, param=param,
+            model=accessibility_model, tile_rows=tile_rows, dtype=dtype,
+        )
+    elif engine == 'parallel':
+        # Spatial tiles in a process pool; Step 1 is reduced across tiles before Step 2
+        weighted_demand_per_school, R, A, local_seats, nearest_km = _parallel_2sfca(
+            bg["block_group_id"].values, *coords, pop_array, seats_array,
+            catchment_km=catchment_km, decay_type=decay_type, param=param,
+            model=accessibility_model, n_workers=n_workers, n_tiles=n_tiles,
+        )
+    else:
+        W, nearest_km = _edi_weight_matrix(
+            coords, accessibility_model,
+            catchment_km=catchment_km, decay_type=decay_type, param=param, engine=engine,
+            distance_cache_dir=distance_cache_dir, distance_backend=distance_backend,
+        )
+        
+        # Model selection matrix (M = W for classic 2SFCA)
+        M = accessibility_model.selection(W, seats_array)
+        
+        # --- 2SFCA Step 1: Provider ratios R_j ---
+        # For each school j: R_j = seats_j / Σ_i(pop_i × M_ij)
+        weighted_demand_per_school = M.T @ pop_array  # (n_schools,)
+        R = _provider_ratios(seats_array, weighted_demand_per_school)
+        
+        # --- 2SFCA Step 2: Accessibility A_i ---
+        # For each block group i: A_i = Σ_j(R_j × M_ij)
+        A = M @ R  # (n_bg,)
+        
+        # Gravity-weighted nearby seats (used by the ratio component)
+        local_seats = W @ seats_array
+    
+    return _edi_component_frame(bg, pop_array, A, local_seats, nearest_km, need_weights)
+
+@dataclass(frozen=True)
+class EDISweepResult:
+    """Output of sweep_edi_parameters()"""
+    long: pd.DataFrame          # one row per (block group, setting): EDI, rank, in_top_n
+    settings: pd.DataFrame      # one row per setting: Kendall tau / Top-N overlap vs default
+    block_groups: pd.DataFrame  # one row per block group: rank spread and Top-N frequency
+
+def _minmax_rows(X):
+    """Row-wise MinMaxScaler for a (k, n) array; constant rows map to 0 like sklearn"""
+    lo = X.min(axis=1, keepdims=True)
+    span = X.max(axis=1, keepdims=True) - lo
+    span[span == 0] = 1.0
+    return (X - lo) / span
+
+def sweep_edi_parameters(
+    demographics_df,
+    schools_df,
+    *,
+    decay_types: tuple = ('exponential', 'gaussian', 'linear', 'fixed'),
+    beta_kms: tuple = (2.5, 5.0, 7.5, 10.0),
+    catchment_kms: tuple = (10.0, 15.0, 20.0),
+    default_setting: tuple = ('exponential', 5.0, 15.0),  # decay_type, beta_km, catchment_km
+    need_weights: tuple = (0.7, 0.3),
+    comp_weights: tuple = (0.40, 0.30, 0.20, 0.10),
+    include_school_types: tuple = None,
+    top_n: int = 10,
+    chunk_size: int = 8,
+    distance_cache_dir: str | Path | None = None,
+    model: str | AccessibilityModel = '2sfca',
+):
+    """
+    EDI sensitivity analysis over a grid of decay / catchment settings.
+    
+    The distance matrix and the distance-independent components (need, infra,
+    seats) are computed once. Settings are then evaluated in chunks of
+    chunk_size: gravity weights for the whole chunk are stacked into a
+    (chunk, n_bg, n_schools) array and both 2SFCA steps run as batched matmuls,
+    so peak memory is about chunk_size x n_bg x n_schools x 8 bytes.
+    Each setting reproduces compute_edi_block_groups(engine='dense') exactly.
+    
+    Parameters:
+    - decay_types, beta_kms, catchment_kms: Grid axes (full Cartesian product)
+    - default_setting: Reference (decay_type, beta_km, catchment_km) for stability
+      statistics; added to the grid if missing
+    - top_n: Size of the "Top-N" table whose membership is tracked
+    - model: Accessibility kernel applied to every setting (see ACCESSIBILITY_MODELS)
+    
+    Returns:
+    - EDISweepResult with tidy long-format EDI values plus per-setting and
+      per-block-group rank-stability summaries
+    """
+    accessibility_model = _get_accessibility_model(model)
+    bg, schools, seats_array = _prepare_edi_inputs(demographics_df, schools_df, include_school_types)
+    need_score, infra_score = _need_and_infra_scores(bg, need_weights)
+    pop_array = bg["k12_pop"].values.astype(float)
+    
+    coords = (
+        bg["lat"].values.astype(float), bg["lon"].values.astype(float),
+        schools["lat"].values.astype(float), schools["lon"].values.astype(float),
+    )
+    if distance_cache_dir is not None:
+        D = cached_distance_matrix(*coords, cache_dir=distance_cache_dir)
+    else:
+        D = _haversine_matrix(*coords)
+    D = np.asarray(D)[None, :, :]  # (1, n_bg, n_schools) for broadcasting over settings
+    
+    default_setting = (default_setting[0], float(default_setting[1]), float(default_setting[2]))
+    grid = [(dt, float(beta), float(catch)) for dt, beta, catch in product(decay_types, beta_kms, catchment_kms)]
+    grid = [default_setting] + [setting for setting in grid if setting != default_setting]
+    
+    n_bg = len(bg)
+    edi_all = np.empty((len(grid), n_bg))
+    w_access, w_ratio, w_need, w_infra = comp_weights
+    static_part = w_need * need_score + w_infra * infra_score  # (n_bg,)
+    
+    for start in range(0, len(grid), max(int(chunk_size), 1)):
+        chunk = grid[start:start + max(int(chunk_size), 1)]
+        betas = np.array([setting[1] for setting in chunk])[:, None, None]
+        catchments = np.array([setting[2] for setting in chunk])[:, None, None]
+        
+        # Stacked gravity weights, one decay family at a time
+        W = np.empty((len(chunk),) + D.shape[1:])
+        chunk_types = np.array([setting[0] for setting in chunk])
+        for decay_type in np.unique(chunk_types):
+            sel = np.flatnonzero(chunk_types == decay_type)
+            W[sel] = _gravity_weights(D, accessibility_model, decay_type, betas[sel], catchments[sel])
+        W *= D <= catchments
+        M = accessibility_model.selection(W, seats_array)
+        
+        # 2SFCA Step 1 + Step 2 for every setting in the chunk
+        demand = pop_array @ M  # (k, n_schools)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            R = np.divide(seats_array[None, :], demand, out=np.zeros_like(demand), where=demand > 0)
+        A = np.matmul(M, R[:, :, None])[:, :, 0]  # (k, n_bg)
+        local_seats = W @ seats_array  # (k, n_bg)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            seat_ratio = np.divide(local_seats, pop_array[None, :], out=np.zeros_like(local_seats), where=pop_array[None, :] > 0)
+        
+        edi_raw = (
+            w_access * (1.0 - _minmax_rows(A)) +
+            w_ratio * (1.0 - _minmax_rows(seat_ratio)) +
+            static_part[None, :]
+        )
+        edi_all[start:start + len(chunk)] = 100.0 * _minmax_rows(edi_raw)
+        del W, M
+    
+    # --- Ranks (1 = most severe desert) ---
+    ranks = rankdata(-edi_all, axis=1, method="min")
+    in_top = ranks <= top_n
+    bg_ids = bg["block_group_id"].astype(str).values
+    
+    long = pd.DataFrame({
+        "block_group_id": np.tile(bg_ids, len(grid)),
+        "decay_type": np.repeat([setting[0] for setting in grid], n_bg),
+        "beta_km": np.repeat([setting[1] for setting in grid], n_bg),
+        "catchment_km": np.repeat([setting[2] for setting in grid], n_bg),
+        "EDI": edi_all.ravel(),
+        "rank": ranks.ravel(),
+        "in_top_n": in_top.ravel(),
+    })
+    
+    # --- Per-setting agreement with the default ---
+    taus = [kendalltau(edi_all[0], edi_all[k]).statistic if n_bg > 1 else np.nan for k in range(len(grid))]
+    settings = pd.DataFrame({
+        "decay_type": [setting[0] for setting in grid],
+        "beta_km": [setting[1] for setting in grid],
+        "catchment_km": [setting[2] for setting in grid],
+        "is_default": [k == 0 for k in range(len(grid))],
+        "kendall_tau_vs_default": taus,
+        "top_n_overlap": (in_top & in_top[0]).sum(axis=1) / max(min(top_n, n_bg), 1),
+    })
+    
+    # --- Per-block-group rank stability ---
+    block_groups = pd.DataFrame({
+        "block_group_id": bg_ids,
+        "default_EDI": edi_all[0],
+        "default_rank": ranks[0],
+        "median_rank": np.median(ranks, axis=0),
+        "rank_min": ranks.min(axis=0),
+        "rank_max": ranks.max(axis=0),
+        "rank_std": ranks.std(axis=0),
+        "top_n_share": in_top.mean(axis=0),
+    }).sort_values(["top_n_share", "default_rank"], ascending=[False, True]).reset_index(drop=True)
+    
+    return EDISweepResult(long=long, settings=settings, block_groups=block_groups)
+
+@dataclass(frozen=True)
+class WhatIfResult:
+    """Effect of one supply change from EDIWhatIf.add_site()/remove_site()"""
+    site_id: int
+    affected_rows: np.ndarray  # positions (in EDIWhatIf.block_groups) whose A_i / seats changed
+    components: pd.DataFrame   # full compute_edi_components() frame after the change
+
+class EDIWhatIf:
+    """
+    Incremental "what if we add/remove a school or campus" on a fixed EDI setup.
+    
+    Under 2SFCA-type models (selection M = W: '2sfca', 'e2sfca') a supply point j
+    only enters R_j and the A_i / local-seat sums of block groups inside its own
+    catchment, so adding or removing one point updates weighted demand, R_j and
+    those rows in place instead of recomputing the whole matrix. Models with
+    row-normalized selection ('3sfca', 'huff') couple every school in a block
+    group's catchment and need a full compute_edi_components() run.
+    
+    Sites are addressed by integer site_id: existing schools are 0..n_schools-1
+    in schools_df order after cleaning, added sites continue from there.
+    preview=True returns the changed frame without committing the change.
+    """
+    
+    def __init__(
+        self,
+        demographics_df,
+        schools_df,
+        *,
+        catchment_km: float = 15.0,
+        beta_km: float = 5.0,
+        decay_type: str = 'exponential',
+        decay_param: float | None = None,
+        need_weights: tuple = (0.7, 0.3),
+        include_school_types: tuple = None,
+        model: str | AccessibilityModel = '2sfca',
+        distance_cache_dir: str | Path | None = None,
+        distance_backend=None,
+    ):
+        self.model = _get_accessibility_model(model)
+        if self.model.selection is not _select_gravity:
+            raise ValueError(
+                f"Incremental what-if needs a 2SFCA-type model (selection M = W), got {self.model.name!r}; "
+                "use compute_edi_components() for a full recomputation"
+            )
+        bg, schools, seats_array = _prepare_edi_inputs(demographics_df, schools_df, include_school_types)
+        self.block_groups = bg
+        self.catchment_km = catchment_km
+        self.decay_type = decay_type
+        self.param = beta_km if decay_param is None else decay_param
+        self.need_weights = need_weights
+        self.distance_backend = distance_backend
+        self._bg_lat = bg["lat"].values.astype(float)
+        self._bg_lon = bg["lon"].values.astype(float)
+        self._pop = bg["k12_pop"].values.astype(float)
+        self._bg_tree = None
+        
+        coords = (self._bg_lat, self._bg_lon, schools["lat"].values.astype(float), schools["lon"].values.astype(float))
+        if distance_backend is not None:
+            D = distance_backend.catchment_csr(*coords, catchment_km)
+        elif distance_cache_dir is not None:
+            D = cached_catchment_distance_csr(*coords, catchment_km, cache_dir=distance_cache_dir)
+        else:
+            D = _catchment_distance_csr(*coords, catchment_km)
+        D = sparse.csc_matrix(D)
+        D.sort_indices()
+        W = D.copy()
+        W.data = _gravity_weights(D.data, self.model, decay_type, self.param, catchment_km)
+        
+        # Per-site catchment columns: (rows, distances, weights)
+        self._columns = [
+            (D.indices[D.indptr[j]:D.indptr[j + 1]].copy(), D.data[D.indptr[j]:D.indptr[j + 1]].copy(),
+             W.data[W.indptr[j]:W.indptr[j + 1]].copy())
+            for j in range(D.shape[1])
+        ]
+        self.sites = pd.DataFrame({
+            "site_name": schools["school_name"].astype(str).values if "school_name" in schools.columns else [f"school_{j}" for j in range(len(schools))],
+            "lat": schools["lat"].values.astype(float),
+            "lon": schools["lon"].values.astype(float),
+            "seats": seats_array,
+            "active": True,
+        })
+        
+        # Baseline 2SFCA state
+        self.weighted_demand = np.asarray(W.T @ self._pop).ravel()
+        self.R = _provider_ratios(seats_array, self.weighted_demand)
+        self.A = np.asarray(W @ self.R).ravel()
+        self.local_seats = np.asarray(W @ seats_array).ravel()
+        self.nearest_km = _row_min_csr(sparse.csr_matrix(D), catchment_km)
+    
+    def _site_column(self, lat, lon):
+        """Catchment rows, distances and weights for one supply point"""
+        if self.distance_backend is not None:
+            d = np.asarray(self.distance_backend.matrix(self._bg_lat, self._bg_lon, [lat], [lon], self.catchment_km))[:, 0]
+            rows = np.flatnonzero(d <= self.catchment_km)
+            dist = d[rows]
+        else:
+            if self._bg_tree is None:
+                self._bg_tree = BallTree(np.deg2rad(np.column_stack([self._bg_lat, self._bg_lon])), metric="haversine")
+            # Same slightly-wide query + exact cutoff as _catchment_distance_csr
+            radius = (self.catchment_km / EARTH_R_KM) * (1.0 + 1e-9)
+            rows = np.sort(self._bg_tree.query_radius(np.deg2rad([[lat, lon]]), r=radius)[0]).astype(np.int64)
+            dist = haversine_km(self._bg_lat[rows], self._bg_lon[rows], lat, lon)
+            keep = dist <= self.catchment_km
+            rows, dist = rows[keep], dist[keep]
+        weights = _gravity_weights(dist, self.model, self.decay_type, self.param, self.catchment_km)
+        return rows, dist, weights
+    
+    def _rows_nearest(self, rows, exclude=None):
+        """Nearest active site within catchment for the given block-group rows"""
+        nearest = np.full(len(rows), float(self.catchment_km))
+        active = self.sites["active"].values.copy()
+        if exclude is not None:
+            active[exclude] = False
+        for j in np.flatnonzero(active):
+            site_rows, dist, _ = self._columns[j]
+            hit = np.isin(site_rows, rows)
+            if hit.any():
+                pos = np.searchsorted(rows, site_rows[hit])
+                nearest[pos] = np.minimum(nearest[pos], dist[hit])
+        return nearest
+    
+    def components(self) -> pd.DataFrame:
+        """Current compute_edi_components() frame"""
+        return _edi_component_frame(self.block_groups, self._pop, self.A, self.local_seats, self.nearest_km, self.need_weights)
+    
+    def add_site(self, lat: float, lon: float, seats: float, site_name: str = "New site", *, preview: bool = False) -> WhatIfResult:
+        """Add a supply point with the given seat count"""
+        rows, dist, weights = self._site_column(float(lat), float(lon))
+        demand = float(self._pop[rows] @ weights)
+        ratio = seats / demand if demand > 0 else 0.0
+        A, local_seats, nearest_km = self.A.copy(), self.local_seats.copy(), self.nearest_km.copy()
+        A[rows] += weights * ratio
+        local_seats[rows] += weights * seats
+        nearest_km[rows] = np.minimum(nearest_km[rows], dist)
+        site_id = len(self.sites)
+        if not preview:
+            self._columns.append((rows, dist, weights))
+            self.sites.loc[site_id] = [site_name, float(lat), float(lon), float(seats), True]
+            self.weighted_demand = np.append(self.weighted_demand, demand)
+            self.R = np.append(self.R, ratio)
+            self.A, self.local_seats, self.nearest_km = A, local_seats, nearest_km
+        frame = _edi_component_frame(self.block_groups, self._pop, A, local_seats, nearest_km, self.need_weights)
+        return WhatIfResult(site_id=site_id, affected_rows=rows, components=frame)
+    
+    def remove_site(self, site_id: int, *, preview: bool = False) -> WhatIfResult:
+        """Remove an existing school or a previously added site"""
+        if not 0 <= site_id < len(self.sites) or not self.sites.at[site_id, "active"]:
+            raise ValueError(f"Unknown or already removed site_id: {site_id}")
+        rows, dist, weights = self._columns[site_id]
+        A, local_seats, nearest_km = self.A.copy(), self.local_seats.copy(), self.nearest_km.copy()
+        A[rows] -= weights * self.R[site_id]
+        local_seats[rows] -= weights * self.sites.at[site_id, "seats"]
+        nearest_km[rows] = self._rows_nearest(rows, exclude=site_id)
+        if not preview:
+            self.sites.at[site_id, "active"] = False
+            self.weighted_demand[site_id] = 0.0
+            self.R[site_id] = 0.0
+            self.A, self.local_seats, self.nearest_km = A, local_seats, nearest_km
+        frame = _edi_component_frame(self.block_groups, self._pop, A, local_seats, nearest_km, self.need_weights)
+        return WhatIfResult(site_id=site_id, affected_rows=rows, components=frame)
+
 def compute_edi(demographics_df, schools_df):
     """
     Wrapper function to maintain compatibility with existing code
@@ -282,26 +1160,29 @@ def compute_edi(demographics_df, schools_df):
         # Fall back to original ZIP code calculation
         return compute_edi_zip_codes(demographics_df, schools_df)
 
-def compute_edi_zip_codes(demographics_df, schools_df):
-    """
-    Original ZIP code EDI calculation for backward compatibility
+def compute_edi_zip_codes(demographics_df, schools_df, **edi_kwargs):
     """
-    # This is the original function - keeping for compatibility
-    # (Insert the original compute_edi function here if needed)
+    EDI for ZIP-level rows (ZIP or geoid_bg id + centroid lat/lon, k12_pop,
+    optional poverty_rate) through the same 2SFCA pipeline as block groups, with
+    ZIP centroids standing in for block-group centroids.
     
-    # For now, create a simple version
-    results = []
+    To roll block-group EDI up to ZCTA polygons instead, use
+    areal_aggregation.ArealAggregator.
     
-    for _, row in demographics_df.iterrows():
-        results.append({
-            'geoid_bg': row.get('ZIP', row.get('geoid_bg')),
-            'lat': row['lat'],
-            'lon': row['lon'],
-            'k12_pop': row.get('k12_pop', 0),
-            'EDI': np.random.uniform(10, 80)  # Placeholder
-        })
+    Returns:
+    - DataFrame keyed by geoid_bg (the ZIP) with EDI and its components
+    """
+    zips = demographics_df.copy()
+    id_col = "ZIP" if "ZIP" in zips.columns else "geoid_bg"
+    zips["block_group_id"] = zips[id_col].astype(str)
+    zips = zips.drop(columns=["geoid_bg"], errors="ignore")
+    if "k12_pop" not in zips.columns:
+        zips["k12_pop"] = 0.0
+    if "poverty_rate" not in zips.columns:
+        zips["poverty_rate"] = 0.0
     
-    return pd.DataFrame(results)
+    result = compute_edi_block_groups(zips, schools_df, **edi_kwargs)
+    return result.rename(columns={"block_group_id": "geoid_bg"})
 
 if __name__ == "__main__":
     # Test the 2SFCA implementation with sample data
@@ -343,5 +1224,58 @@ if __name__ == "__main__":
         'need_score', 'infra_score'
     ]].round(3))
     
+    # Sparse engine must reproduce the dense EDI values
+    sparse_result = compute_edi_block_groups(sample_demographics, sample_schools, engine='sparse')
+    assert np.allclose(sparse_result['EDI'].values, edi_result['EDI'].values)
+    print("\n✓ Sparse (BallTree + CSR) engine matches dense EDI")
+
+    # Re-weighting cached components must match a full recomputation
+    components = compute_edi_components(sample_demographics, sample_schools)
+    reweighted = combine_edi_components(components, (0.25, 0.25, 0.25, 0.25))
+    direct = compute_edi_block_groups(sample_demographics, sample_schools, comp_weights=(0.25, 0.25, 0.25, 0.25))
+    assert np.allclose(reweighted['EDI'].values, direct['EDI'].values)
+    print("✓ Cached components re-weight to the same EDI")
+
+    # Parameter sweep settings must reproduce individual runs
+    sweep = sweep_edi_parameters(sample_demographics, sample_schools, beta_kms=(3.0, 5.0), catchment_kms=(15.0,), top_n=2)
+    gaussian = sweep.long[(sweep.long['decay_type'] == 'gaussian') & (sweep.long['beta_km'] == 3.0)]
+    direct = compute_edi_block_groups(sample_demographics, sample_schools, decay_type='gaussian', beta_km=3.0)
+    assert np.allclose(gaussian['EDI'].values, direct['EDI'].values)
+    # Blocked float32 kernel must agree with the dense engine
+    blocked = compute_edi_block_groups(sample_demographics, sample_schools, engine='blocked', tile_rows=3)
+    assert np.allclose(blocked['EDI'].values, edi_result['EDI'].values)
+    blocked32 = compute_edi_block_groups(sample_demographics, sample_schools, engine='blocked', tile_rows=3, dtype=np.float32)
+    print(f"✓ Blocked engine matches dense EDI (float32 max deviation {np.abs(blocked32['EDI'].values - edi_result['EDI'].values).max():.3f} pts)")
+    # Every accessibility model must give identical results on all engines
+    for model_name in ACCESSIBILITY_MODELS:
+        results = [
+            compute_edi_block_groups(sample_demographics, sample_schools, model=model_name, engine=engine, tile_rows=3)
+            for engine in ('dense', 'sparse', 'blocked', 'parallel')
+        ]
+        assert all(np.allclose(r['EDI'].values, results[0]['EDI'].values) for r in results)
+    print(f"✓ Accessibility models agree across engines: {', '.join(ACCESSIBILITY_MODELS)}")
+    # A second county with no school within the catchment gives a parallel tile with an empty halo
+    remote_demographics = pd.concat([
+        sample_demographics,
+        sample_demographics.assign(
+            block_group_id=sample_demographics['block_group_id'].str.replace('42101', '42045', n=1),
+            lat=sample_demographics['lat'] + 1.5,
+        ),
+    ], ignore_index=True)
+    remote = [
+        compute_edi_block_groups(remote_demographics, sample_schools, engine=engine, n_workers=2)
+        for engine in ('sparse', 'blocked', 'parallel')
+    ]
+    assert all(np.allclose(r['EDI'].values, remote[0]['EDI'].values) for r in remote)
+    print("✓ Parallel engine handles tiles without reachable schools")
+    print(f"✓ Parameter sweep evaluated {len(sweep.settings)} settings in one batched pass")
+    # Incremental what-if must match recomputing with the extra school
+    what_if = EDIWhatIf(sample_demographics, sample_schools)
+    added = combine_edi_components(what_if.add_site(39.949, -75.199, 300, preview=True).components)
+    extra_school = pd.DataFrame({'lat': [39.949], 'lon': [-75.199], 'capacity': [300]})
+    direct = compute_edi_block_groups(sample_demographics, pd.concat([sample_schools, extra_school], ignore_index=True))
+    assert np.allclose(added['EDI'].values, direct['EDI'].values)
+    print("✓ What-if site addition matches a full recomputation")
+
     print("\n✓ All components properly normalized to [0,1]")
     print("✓ EDI scaled to [0,100] where higher = worse educational desert")
\ No newline at end of file
@@ -0,0 +1,116 @@
+"""Mask-based evaluation of the sidebar filters.
+
+Each sidebar filter is a boolean mask over the block-group rows of one frame
+instead of a boolean-indexed copy of the previous filter's output. Masks for
+fixed predicates (total_pop > 0, is_legit == True, ...) are computed once per
+FilterEngine and reused; numeric range sliders (income, poverty) are answered
+from a RangeIndex, i.e. the column's sort order, with two searchsorted calls.
+The selection is the AND of the active masks followed by one row take, so a
+rerun allocates n-row bool arrays rather than intermediate frames.
+
+Row positions are what the masks refer to: combine masks from engines and
+arrays built over the same rows in the same order.
+"""
+from __future__ import annotations
+
+import operator
+
+import numpy as np
+import pandas as pd
+
+_COMPARE = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+class RangeIndex:
+    """Sorted view of one numeric column; NaN never matches a range"""
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype=float)
+        finite = np.flatnonzero(~np.isnan(values))
+        order = np.argsort(values[finite], kind="stable")
+        self.n = len(values)
+        self.positions = finite[order]
+        self.sorted_values = values[self.positions]
+
+    def between(self, lo, hi) -> np.ndarray:
+        """Mask of rows with lo <= value <= hi (like Series.between(..., inclusive="both"))"""
+        start = np.searchsorted(self.sorted_values, lo, side="left")
+        stop = np.searchsorted(self.sorted_values, hi, side="right")
+        mask = np.zeros(self.n, dtype=bool)
+        mask[self.positions[start:stop]] = True
+        return mask
+
+
+class FilterEngine:
+    """
+    Cached predicate masks and range indexes over a frame's rows.
+    - df: frame whose rows the masks refer to (only the columns used are read)
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.n = len(df)
+        self._df = df
+        self._values = {}
+        self._masks = {}
+        self._ranges = {}
+
+    def values(self, column: str) -> np.ndarray:
+        """Column as a float array (NaN when absent or non-numeric)"""
+        if column not in self._values:
+            if column in self._df.columns:
+                self._values[column] = pd.to_numeric(self._df[column], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+            else:
+                self._values[column] = np.full(self.n, np.nan)
+        return self._values[column]
+
+    def compare(self, column: str, op: str, value) -> np.ndarray:
+        """Mask of column <op> value (NaN -> False), cached per (column, op, value)"""
+        key = (column, op, value)
+        if key not in self._masks:
+            if op not in _COMPARE:
+                raise ValueError(f"Unsupported operator {op!r}")
+            if isinstance(value, (bool, np.bool_)) and column in self._df.columns:
+                values = self._df[column].to_numpy()
+            else:
+                values = self.values(column)
+            with np.errstate(invalid="ignore"):
+                mask = np.asarray(_COMPARE[op](values, value), dtype=bool)
+            # Shared across reruns: combine with &, never modify in place
+            mask.flags.writeable = False
+            self._masks[key] = mask
+        return self._masks[key]
+
+    def between(self, column: str, lo, hi) -> np.ndarray:
+        """Mask of lo <= column <= hi from the column's RangeIndex"""
+        if column not in self._ranges:
+            self._ranges[column] = RangeIndex(self.values(column))
+        return self._ranges[column].between(lo, hi)
+
+    def bounds(self, column: str, mask: np.ndarray | None = None):
+        """(min, max) of the non-missing column values among the masked rows, or None if there are none"""
+        values = self.values(column)
+        if mask is not None:
+            values = values[mask]
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return None
+        return float(values.min()), float(values.max())
+
+def top_n_mask(mask: np.ndarray, values, n: int) -> np.ndarray:
+    """
+    The n masked rows with the largest values (NaN never selected, ties keep
+    the earlier row), like DataFrame.nlargest on the masked rows.
+    """
+    values = np.asarray(values, dtype=float)
+    candidates = np.flatnonzero(mask & ~np.isnan(values))
+    keep = candidates[np.argsort(-values[candidates], kind="stable")[:n]]
+    out = np.zeros(len(mask), dtype=bool)
+    out[keep] = True
+    return out
@@ -0,0 +1,90 @@
+"""High-Potential Family Index (HPFI): component definitions and default weights.
+
+The HPFI blends six normalized signals into a 0-1 score; the dashboard
+(compute_hpfi_scores in app_block_groups.py), the Monte Carlo bands
+(edi_uncertainty) and the panel (edi_panel) all score through this module, so
+they share one definition of the components and their weights.
+
+Inputs broadcast to (k, n_block_groups): k stacked realizations (k = 1 for the
+dashboard), min-max normalized across block groups within each realization.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+# Component -> default weight; the weighted HPFI sum runs in this order
+HPFI_DEFAULT_WEIGHTS = {
+    "income": 0.45,           # Primary tuition signal
+    "inverse_poverty": 0.18,  # Economic stability
+    "proximity": 0.13,        # Distance to HPFI anchor campuses
+    "christian": 0.12,        # Mission alignment
+    "k12": 0.09,              # Market size
+    "inverse_edi": 0.03,      # Low competition signal
+}
+HPFI_COMPONENTS = tuple(HPFI_DEFAULT_WEIGHTS)
+
+# Sidebar weight keys carry this prefix (WEIGHT_DEFAULTS in app_block_groups.py)
+WEIGHT_KEY_PREFIX = "hpfi_"
+
+# %Christian assumed where the block-group value is missing (regional floor)
+CHRISTIAN_FILL_PCT = 36.3
+
+
+def normalise_rows(X) -> np.ndarray:
+    """
+    NaN-aware min-max scaling per row: NaN stays NaN, and a row with a single
+    distinct value (or none) is 0.5 everywhere
+    """
+    X = np.atleast_2d(np.asarray(X, dtype=float))
+    with np.errstate(invalid="ignore"):
+        finite = np.isfinite(X)
+        lo = np.where(finite, X, np.inf).min(axis=1, keepdims=True)
+        hi = np.where(finite, X, -np.inf).max(axis=1, keepdims=True)
+        constant = ~(hi > lo)
+        span = np.where(constant, 1.0, hi - lo)
+        out = (X - lo) / span
+    return np.where(constant, 0.5, out)
+
+
+def hpfi_component_arrays(income, poverty_rate, k12_pop, edi, proximity, christian) -> dict:
+    """
+    {component: (k, n) array} in HPFI_COMPONENTS order.
+    proximity is the campus proximity score (campus_registry.campus_proximity_score),
+    christian the %Christian column, poverty_rate and edi on a 0-100 scale.
+    """
+    poverty = np.nan_to_num(np.atleast_2d(np.asarray(poverty_rate, dtype=float)), nan=0.0)
+    edi_values = np.nan_to_num(np.atleast_2d(np.asarray(edi, dtype=float)), nan=0.0)
+    christian = np.atleast_2d(np.asarray(christian, dtype=float))
+    return {
+        "income": normalise_rows(income),
+        "inverse_poverty": normalise_rows(1.0 - np.clip(poverty / 100.0, 0.0, 1.0)),
+        "proximity": normalise_rows(proximity),
+        "christian": normalise_rows(np.where(np.isnan(christian), CHRISTIAN_FILL_PCT, christian)),
+        "k12": normalise_rows(k12_pop),
+        "inverse_edi": 1.0 - np.clip(edi_values / 100.0, 0.0, 1.0),
+    }
+
+
+def resolve_hpfi_weights(weights: dict | None = None) -> dict:
+    """
+    {component: weight} for every HPFI_COMPONENTS name: HPFI_DEFAULT_WEIGHTS
+    overridden by weights, keyed by component ("income") or sidebar key
+    ("hpfi_income"). Raises ValueError on any other key.
+    """
+    resolved = dict(HPFI_DEFAULT_WEIGHTS)
+    for key, value in (weights or {}).items():
+        name = key[len(WEIGHT_KEY_PREFIX):] if key.startswith(WEIGHT_KEY_PREFIX) else key
+        if name not in resolved:
+            raise ValueError(f"Unknown HPFI weight {key!r}; expected one of {', '.join(HPFI_COMPONENTS)}")
+        resolved[name] = float(value)
+    return resolved
+
+
+def blend_hpfi(components, weights: dict | None = None) -> np.ndarray:
+    """
+    Weighted HPFI sum clipped to [0, 1]. components maps each HPFI_COMPONENTS
+    name to an array (or Series); weights are resolved by resolve_hpfi_weights().
+    """
+    weights = resolve_hpfi_weights(weights)
+    hpfi = sum(weights[name] * np.asarray(components[name], dtype=float) for name in HPFI_COMPONENTS)
+    return np.clip(hpfi, 0.0, 1.0)
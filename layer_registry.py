@@ -0,0 +1,215 @@
+"""Declarative registry of the optional external block-group layers.
+
+Each layer (vacancy, crime, transit, ...) is data, not code: the CSV it is read
+from (relative to the external data directory), the value columns taken from
+it, the fill for block groups the file does not cover and the derived columns
+computed from those values. DEFAULT_LAYERS holds the built-in layers;
+data/external_layers.json may add layers or replace built-in ones by name, e.g.
+
+    {"parks": {"file": "parks_block_groups.csv", "columns": ["park_acres"],
+               "outputs": {"parks_norm": {"from": "park_acres", "method": "minmax"}}}}
+
+align_layers() reads every available layer file, stacks their values on the
+union of their block-group ids and aligns the stack to the base frame's ids with
+one indexer, giving a LayerTable: one Fortran-ordered float64 matrix whose
+columns are contiguous arrays. layer_columns() derives the outputs from it, so
+the base frame is extended once instead of being copied by a merge per layer.
+"""
+from __future__ import annotations
+
+import copy
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_LAYERS_PATH = Path("data/external_layers.json")
+
+DEFAULT_LAYERS = {
+    # Higher => more vacant properties
+    "vacancy": {
+        "file": "vacancy_block_groups.csv",
+        "columns": ["vacant_pct"],
+        "outputs": {"vacancy_norm": {"from": "vacant_pct", "method": "minmax"}},
+    },
+    # Higher crimes_per_1k is worse: inverted to a safety score
+    "crime": {
+        "file": "crime_per_block_group.csv",
+        "columns": ["crimes_per_1k"],
+        "outputs": {"crime_norm": {"from": "crimes_per_1k", "method": "inverse_minmax"}},
+    },
+    "transit": {
+        "file": "transit_access_block_groups.csv",
+        "columns": ["transit_access_score"],
+        "outputs": {"transit_norm": {"from": "transit_access_score", "method": "minmax"}},
+    },
+    "food": {
+        "file": "food_access_block_groups.csv",
+        "columns": ["food_access_score"],
+        "outputs": {"food_access_norm": {"from": "food_access_score", "method": "minmax"}},
+    },
+    # Higher => more inequality
+    "gini": {
+        "file": "gini_block_groups.csv",
+        "columns": ["gini_index"],
+        "outputs": {"gini_norm": {"from": "gini_index", "method": "minmax"}},
+    },
+    # Block groups without HUD-assisted housing are absent from the file: count 0
+    "hud": {
+        "file": "hud_assisted_block_groups.csv",
+        "columns": ["hud_assisted"],
+        "fill": 0,
+        "outputs": {"hud_presence": {"from": "hud_assisted", "method": "count"}},
+    },
+}
+
+
+def minmax_normalise(values) -> np.ndarray:
+    """
+    Min-max scaling to [0, 1] with normalise_series semantics: missing values
+    -> 0, all-missing -> 0, no spread -> 0.5 everywhere.
+    """
+    values = np.asarray(values, dtype=float)
+    finite = values[~np.isnan(values)]
+    if not len(finite):
+        return np.zeros(len(values))
+    lo, hi = finite.min(), finite.max()
+    if lo == hi:
+        return np.full(len(values), 0.5)
+    return np.nan_to_num(np.clip((values - lo) / (hi - lo), 0, 1), nan=0.0)
+
+
+NORMALISERS = {
+    "minmax": minmax_normalise,
+    "inverse_minmax": lambda values: 1.0 - minmax_normalise(values),
+    "count": lambda values: np.nan_to_num(np.asarray(values, dtype=float), nan=0.0).astype(int),
+    "raw": lambda values: np.asarray(values, dtype=float),
+}
+
+
+def _check_layer(name: str, spec: dict):
+    if not spec.get("file") or not spec.get("columns"):
+        raise ValueError(f"Layer {name!r} needs a file and at least one value column")
+    for output, rule in spec.get("outputs", {}).items():
+        if rule.get("from") not in spec["columns"]:
+            raise ValueError(f"Layer {name!r} output {output!r} reads {rule.get('from')!r}, which is not one of its columns")
+        if rule.get("method", "minmax") not in NORMALISERS:
+            raise ValueError(f"Layer {name!r} output {output!r}: unknown method {rule.get('method')!r}")
+
+
+@lru_cache(maxsize=8)
+def _read_overrides(path: str, mtime: float) -> dict:
+    with open(path, encoding="utf-8") as handle:
+        overrides = json.load(handle)
+    if not isinstance(overrides, dict):
+        raise ValueError(f"{path} must hold a JSON object of layers")
+    return overrides
+
+
+def load_layer_registry(path=DEFAULT_LAYERS_PATH) -> dict:
+    """DEFAULT_LAYERS plus any layers from the JSON file at path (same name replaces; re-read when it changes)"""
+    layers = copy.deepcopy(DEFAULT_LAYERS)
+    path = Path(path)
+    if path.exists():
+        layers.update(copy.deepcopy(_read_overrides(str(path), path.stat().st_mtime)))
+    seen = {}
+    for name, spec in layers.items():
+        _check_layer(name, spec)
+        for col in spec["columns"]:
+            if col in seen:
+                raise ValueError(f"Column {col!r} is declared by both layer {seen[col]!r} and layer {name!r}")
+            seen[col] = name
+    return layers
+
+
+def read_layer(spec: dict, data_dir):
+    """(block_group_ids, (rows x columns) float values) from the layer's file, or None when absent or unusable"""
+    path = Path(data_dir) / spec["file"]
+    if not path.exists():
+        return None
+    columns = list(spec["columns"])
+    try:
+        df = pd.read_csv(path, usecols=lambda col: col in columns or col == "block_group_id", dtype={"block_group_id": str})
+    except Exception as exc:
+        print(f"[layers] Could not read {path} ({exc}); skipping.")
+        return None
+    missing = [col for col in ["block_group_id"] + columns if col not in df.columns]
+    if missing:
+        print(f"[layers] {path.name} lacks {', '.join(missing)}; skipping.")
+        return None
+    values = np.column_stack([pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float) for col in columns])
+    return df["block_group_id"].to_numpy(dtype=str), values
+
+
+@dataclass(frozen=True)
+class LayerTable:
+    """Layer value columns aligned to a block-group id sequence"""
+    block_group_ids: np.ndarray  # (n,) str, in base-frame order
+    columns: tuple               # value column names
+    values: np.ndarray           # (n, len(columns)) float64, Fortran order: each column contiguous
+    available: tuple             # layers whose files were read
+
+    def column(self, name: str) -> np.ndarray:
+        return self.values[:, self.columns.index(name)]
+
+
+def align_layers(block_group_ids, layers: dict, data_dir, base: pd.DataFrame | None = None) -> LayerTable:
+    """
+    Read every layer's file and align all value columns to block_group_ids
+    with a single indexer. Rows a file does not cover get the layer's fill
+    (NaN by default). Columns of layers whose file is missing come from base
+    when it already has them, else 0.
+    """
+    ids = np.asarray(block_group_ids, dtype=str)
+    columns, read = [], {}
+    for name, spec in layers.items():
+        layer = read_layer(spec, data_dir)
+        if layer is not None:
+            read[name] = layer
+        columns.extend(spec["columns"])
+
+    # Stack the file values on the union of their ids, then take base rows in one pass;
+    # the extra last row is all-NaN and serves ids no file covers
+    union = pd.Index(np.concatenate([layer_ids for layer_ids, _ in read.values()] or [np.array([], dtype=str)])).unique()
+    stacked = np.full((len(union) + 1, len(columns)), np.nan)
+    offset = 0
+    for name, spec in layers.items():
+        width = len(spec["columns"])
+        if name in read:
+            layer_ids, layer_values = read[name]
+            stacked[union.get_indexer(layer_ids), offset:offset + width] = layer_values
+        offset += width
+    positions = union.get_indexer(ids)
+    positions[positions < 0] = len(union)
+    values = np.asfortranarray(stacked[positions])
+
+    offset = 0
+    for name, spec in layers.items():
+        width = len(spec["columns"])
+        block = values[:, offset:offset + width]
+        if name not in read:
+            for j, col in enumerate(spec["columns"]):
+                block[:, j] = (
+                    pd.to_numeric(base[col], errors="coerce").to_numpy(dtype=float)
+                    if base is not None and col in base.columns else 0.0
+                )
+        if spec.get("fill") is not None:
+            block[np.isnan(block)] = float(spec["fill"])
+        offset += width
+    return LayerTable(ids, tuple(columns), values, tuple(read))
+
+
+def layer_columns(table: LayerTable, layers: dict) -> dict:
+    """{column: array} of every layer value column and derived output, in registry order"""
+    out = {}
+    offset = 0
+    for spec in layers.values():
+        for j, col in enumerate(spec["columns"]):
+            out[col] = table.values[:, offset + j]
+        for output, rule in spec.get("outputs", {}).items():
+            out[output] = NORMALISERS[rule.get("method", "minmax")](table.column(rule["from"]))
+        offset += len(spec["columns"])
+    return out
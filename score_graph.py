@@ -0,0 +1,173 @@
+"""Dependency-aware, memoized score pipeline.
+
+The dashboard's scores form a small DAG (EDI -> HPFI -> zones -> marketing
+priority -> RHI, ...). Each ScoreGraph node declares the nodes it depends on
+and the external inputs it reads (data version, slider values, rule tables).
+A node's cache key is the fingerprint of its own inputs plus the keys of its
+dependencies (each external input is fingerprinted once per evaluate(), however
+many nodes read it), so on a rerun only nodes downstream of a changed input are
+recomputed; everything else is served from the cache. Per-node hit/miss
+counts and timings are kept for a debug panel.
+
+Inputs whose name starts with an underscore are passed to the node but left
+out of the key (as with Streamlit's cache decorators), for unhashable handles
+such as distance backends; pass a hashable stand-in (e.g. network_key) next to
+them.
+"""
+from __future__ import annotations
+
+import hashlib
+import pickle
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+
+def fingerprint(value) -> str:
+    """Stable content hash for node inputs (frames, arrays, containers, scalars)"""
+    h = hashlib.sha1()
+    _update(h, value)
+    return h.hexdigest()[:20]
+
+
+def _update(h, value):
+    if isinstance(value, pd.DataFrame):
+        h.update(b"df")
+        h.update(repr((list(value.columns), [str(t) for t in value.dtypes])).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, pd.Series):
+        h.update(b"series")
+        h.update(str(value.name).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, np.ndarray):
+        h.update(b"nd")
+        h.update(str((value.shape, value.dtype)).encode())
+        h.update(np.ascontiguousarray(value).tobytes() if value.dtype != object else pickle.dumps(value.tolist()))
+    elif isinstance(value, dict):
+        h.update(b"dict")
+        for key in sorted(value, key=repr):
+            _update(h, key)
+            _update(h, value[key])
+    elif isinstance(value, (list, tuple)):
+        h.update(b"seq")
+        for item in value:
+            _update(h, item)
+    else:
+        h.update(repr(value).encode())
+
+
+@dataclass
+class ScoreNode:
+    name: str
+    func: Callable
+    deps: tuple = ()
+    inputs: tuple = ()
+
+
+@dataclass
+class NodeStats:
+    hits: int = 0
+    misses: int = 0
+    last_ms: float = 0.0
+    last_status: str = ""
+
+
+@dataclass
+class ScoreGraph:
+    """
+    Nodes registered in dependency order with @graph.node(...); evaluate()
+    returns every node's value.
+    - cache: mapping for memoized (key, value) pairs, e.g. a dict kept in
+      st.session_state so it survives reruns
+    - stats: mapping for NodeStats, kept alongside the cache
+    """
+    cache: dict = field(default_factory=dict)
+    stats: dict = field(default_factory=dict)
+    nodes: dict = field(default_factory=dict)
+
+    def node(self, name: str, *, deps=(), inputs=()):
+        """Register func(**deps, **inputs) as node name"""
+        missing = [dep for dep in deps if dep not in self.nodes]
+        if missing:
+            raise ValueError(f"Node {name!r} depends on unregistered nodes: {', '.join(missing)}")
+
+        def register(func):
+            self.nodes[name] = ScoreNode(name, func, tuple(deps), tuple(inputs))
+            return func
+        return register
+
+    def evaluate(self, inputs: dict, targets=None) -> dict:
+        """
+        Values of the target nodes (default: all) and everything they depend on,
+        reusing cached values whose key is unchanged.
+        """
+        needed = self._closure(targets)
+        values, keys, input_keys = {}, {}, {}
+        for name, node in self.nodes.items():
+            if name not in needed:
+                continue
+            missing = [key for key in node.inputs if key not in inputs]
+            if missing:
+                raise KeyError(f"Node {name!r} is missing inputs: {', '.join(missing)}")
+            for key in node.inputs:
+                if key not in input_keys and not key.startswith("_"):
+                    input_keys[key] = fingerprint(inputs[key])
+            key = fingerprint((
+                name,
+                [(key, input_keys[key]) for key in node.inputs if not key.startswith("_")],
+                [keys[dep] for dep in node.deps],
+            ))
+            keys[name] = key
+            stats = self.stats.setdefault(name, NodeStats())
+            cached = self.cache.get(name)
+            if cached is not None and cached[0] == key:
+                values[name] = cached[1]
+                stats.hits += 1
+                stats.last_status = "hit"
+                continue
+            start = time.perf_counter()
+            values[name] = node.func(
+                **{dep: values[dep] for dep in node.deps},
+                **{key: inputs[key] for key in node.inputs},
+            )
+            stats.last_ms = (time.perf_counter() - start) * 1000.0
+            stats.misses += 1
+            stats.last_status = "recomputed"
+            self.cache[name] = (key, values[name])
+        return values
+
+    def _closure(self, targets):
+        if targets is None:
+            return set(self.nodes)
+        needed, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in self.nodes:
+                raise KeyError(f"Unknown node: {name!r}")
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self.nodes[name].deps)
+        return needed
+
+    def clear(self):
+        self.cache.clear()
+        self.stats.clear()
+
+    def stats_frame(self) -> pd.DataFrame:
+        """Per-node hit/miss counts, last status and last compute time"""
+        rows = []
+        for name, node in self.nodes.items():
+            stats = self.stats.get(name, NodeStats())
+            rows.append({
+                "node": name,
+                "depends_on": ", ".join(node.deps) or "-",
+                "hits": stats.hits,
+                "misses": stats.misses,
+                "hit_rate": stats.hits / (stats.hits + stats.misses) if stats.hits + stats.misses else np.nan,
+                "last": stats.last_status or "-",
+                "last_compute_ms": round(stats.last_ms, 1),
+            })
+        return pd.DataFrame(rows)
@@ -0,0 +1,195 @@
+"""Declarative rule tables for marketing priority and zone classification.
+
+Bands, thresholds and labels live in data (DEFAULT_RULE_TABLES, optionally
+overridden by data/scoring_rules.json) and are evaluated over whole columns:
+
+- "points" tables add up banded points per column with np.digitize, e.g.
+  nearest campus <= 5 km -> 3, <= 10 km -> 2, <= 15 km -> 1.
+- "classes" tables resolve data-driven thresholds (column quantiles) and pick
+  the first matching class with np.select; the result is a pd.Categorical in
+  rule order with the default class last.
+
+A JSON override file holds a subset of tables keyed like DEFAULT_RULE_TABLES;
+each table given there replaces the default table of the same name, e.g.
+
+    {"marketing_priority": {"type": "points", "rules": [
+        {"column": "nearest_campus_km", "op": "<=", "bands": [[3, 4], [8, 2]]}]}}
+"""
+from __future__ import annotations
+
+import copy
+import json
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_RULES_PATH = Path("data/scoring_rules.json")
+
+DEFAULT_RULE_TABLES = {
+    # Balanced marketing priority: nearby, high-need, high-potential communities
+    "marketing_priority": {
+        "type": "points",
+        "rules": [
+            {"column": "nearest_campus_km", "op": "<=", "bands": [[5, 3], [10, 2], [15, 1]]},
+            {"column": "hpfi", "op": ">=", "bands": [[0.65, 2], [0.5, 1]]},
+            {"column": "EDI", "op": ">=", "bands": [[60, 3], [45, 2], [30, 1]]},
+            {"column": "k12_pop", "op": ">=", "bands": [[250, 2], [125, 1]]},
+            {"column": "%Christian", "op": ">=", "bands": [[40, 1]]},
+        ],
+    },
+    # 4-zone EDI x HPFI overlay on 75th-percentile thresholds
+    "edi_hpfi_zone": {
+        "type": "classes",
+        "fill": {"EDI": 0, "hpfi": 0},
+        "thresholds": {"edi_75": ["EDI", 0.75], "hpfi_75": ["hpfi", 0.75]},
+        "classes": [
+            {"label": "Golden Zone", "when": [["EDI", ">=", "edi_75"], ["hpfi", ">=", "hpfi_75"]]},
+            {"label": "Mission Zone", "when": [["EDI", ">=", "edi_75"]]},
+            {"label": "Affluent Opportunity Zone", "when": [["hpfi", ">=", "hpfi_75"]]},
+        ],
+        "default": "Low Priority Zone",
+    },
+    # High-Potential Marketing Zones
+    "marketing_zone": {
+        "type": "classes",
+        "fill": {"EDI": 0, "hpfi": 0, "k12_pop": 0},
+        "thresholds": {
+            "edi_25": ["EDI", 0.25],
+            "edi_75": ["EDI", 0.75],
+            "hpfi_50": ["hpfi", 0.50],
+            "hpfi_75": ["hpfi", 0.75],
+            "k12_median": ["k12_pop", 0.50],
+        },
+        "classes": [
+            {"label": "Premium Growth Target", "when": [
+                ["hpfi", ">=", "hpfi_75"], ["EDI", "between", ["edi_25", "edi_75"]], ["k12_pop", ">=", "k12_median"],
+            ]},
+            {"label": "Established Market", "when": [["hpfi", ">=", "hpfi_75"], ["EDI", "<", "edi_25"]]},
+            {"label": "Emerging Opportunity", "when": [["hpfi", ">=", "hpfi_50"], ["EDI", "between", ["edi_25", "edi_75"]]]},
+        ],
+        "default": "Foundation Building",
+    },
+}
+
+# np.digitize "right" flag per band operator: index = number of thresholds passed
+_BAND_RIGHT = {">=": False, ">": True, "<=": True, "<": False}
+
+_COMPARE = {
+    ">=": np.greater_equal,
+    ">": np.greater,
+    "<=": np.less_equal,
+    "<": np.less,
+    "==": np.equal,
+}
+
+
+@lru_cache(maxsize=8)
+def _read_overrides(path: str, mtime: float) -> dict:
+    with open(path, encoding="utf-8") as handle:
+        overrides = json.load(handle)
+    if not isinstance(overrides, dict):
+        raise ValueError(f"{path} must hold a JSON object of rule tables")
+    return overrides
+
+
+def load_rule_tables(path=DEFAULT_RULES_PATH) -> dict:
+    """DEFAULT_RULE_TABLES with any tables from the JSON file at path swapped in (re-read when it changes)"""
+    tables = copy.deepcopy(DEFAULT_RULE_TABLES)
+    path = Path(path)
+    if path.exists():
+        tables.update(copy.deepcopy(_read_overrides(str(path), path.stat().st_mtime)))
+    return tables
+
+
+def _column(df: pd.DataFrame, name: str, columns: dict | None, fill=None) -> np.ndarray:
+    """Numeric column (NaN when absent) by logical name, through the optional alias map"""
+    actual = (columns or {}).get(name, name)
+    if actual in df.columns:
+        values = pd.to_numeric(df[actual], errors="coerce").values.astype(float)
+    else:
+        values = np.full(len(df), np.nan)
+    return values if fill is None else np.where(np.isnan(values), float(fill), values)
+
+
+def score_points(df: pd.DataFrame, table: dict, columns: dict | None = None) -> np.ndarray:
+    """
+    Sum of banded points over a "points" table. Within a rule the tightest band
+    passed wins (bands need not be listed in order); missing values score 0.
+    """
+    total = np.zeros(len(df))
+    for rule in table["rules"]:
+        op = rule.get("op", ">=")
+        if op not in _BAND_RIGHT:
+            raise ValueError(f"Unsupported band operator {op!r} for {rule['column']}")
+        values = _column(df, rule["column"], columns)
+        bands = sorted(rule["bands"], key=lambda band: float(band[0]))
+        thresholds = np.array([float(band[0]) for band in bands])
+        points = np.array([float(band[1]) for band in bands])
+        if op in (">=", ">"):
+            # Passed thresholds counted from the bottom: 0 -> nothing, k -> k-th lowest band
+            lookup = np.concatenate([[0.0], points])
+        else:
+            # Index of the first threshold still satisfied: 0 -> lowest band, n -> nothing
+            lookup = np.concatenate([points, [0.0]])
+        idx = np.digitize(np.where(np.isnan(values), 0.0, values), thresholds, right=_BAND_RIGHT[op])
+        total += np.where(np.isnan(values), float(rule.get("missing", 0)), lookup[idx])
+    return total
+
+
+def resolve_thresholds(df: pd.DataFrame, table: dict, columns: dict | None = None) -> dict:
+    """Named thresholds of a "classes" table: [column, quantile] pairs or literal numbers"""
+    fill = table.get("fill", {})
+    resolved = {}
+    for name, spec in table.get("thresholds", {}).items():
+        if isinstance(spec, (int, float)):
+            resolved[name] = float(spec)
+            continue
+        column, q = spec
+        values = _column(df, column, columns, fill.get(column))
+        values = values[~np.isnan(values)]
+        resolved[name] = float(np.quantile(values, float(q))) if len(values) else np.nan
+    return resolved
+
+
+def _operand(ref, thresholds):
+    if isinstance(ref, str):
+        if ref not in thresholds:
+            raise ValueError(f"Unknown threshold {ref!r}")
+        return thresholds[ref]
+    return float(ref)
+
+
+def classify(df: pd.DataFrame, table: dict, columns: dict | None = None):
+    """
+    First matching class per row of a "classes" table.
+    Returns: (pd.Categorical of labels, resolved thresholds)
+    """
+    thresholds = resolve_thresholds(df, table, columns)
+    fill = table.get("fill", {})
+    cache = {}
+
+    def values(name):
+        if name not in cache:
+            cache[name] = _column(df, name, columns, fill.get(name))
+        return cache[name]
+
+    conditions, labels = [], []
+    for cls in table["classes"]:
+        mask = np.ones(len(df), dtype=bool)
+        for column, op, ref in cls["when"]:
+            x = values(column)
+            if op == "between":
+                lo, hi = (_operand(r, thresholds) for r in ref)
+                mask &= (x >= lo) & (x <= hi)
+            elif op in _COMPARE:
+                mask &= _COMPARE[op](x, _operand(ref, thresholds))
+            else:
+                raise ValueError(f"Unsupported operator {op!r} in class {cls['label']!r}")
+        conditions.append(mask)
+        labels.append(cls["label"])
+    default = table.get("default", "Other")
+    categories = list(dict.fromkeys(labels + [default]))
+    chosen = np.select(conditions, labels, default=default) if conditions else np.full(len(df), default)
+    return pd.Categorical(chosen, categories=categories), thresholds
@@ -0,0 +1,8 @@
+"""
+`scripts.bench` package initializer.
+
+Benchmarks are standalone CLIs (python scripts/bench/<name>.py); nothing here
+is imported by the app.
+"""
+
+__all__ = ["acs_client_benchmark"]
@@ -0,0 +1,157 @@
+"""Benchmark the pooled ACS client against a local stand-in for the Census API.
+
+Starts a threaded HTTP server on localhost that answers ACS-shaped JSON
+(header row + one row per block group) after a configurable latency and fails
+a share of requests with 503, then compares:
+
+- sequential: one fresh requests.get per table, no retries (the old fetch path)
+- client:     ACSClient.gather over the same tables (pooled, concurrent, retrying)
+- chunked:    one request for more than 50 variables, split and re-joined by
+              ACSClient.get_json
+
+Usage: python scripts/bench/acs_client_benchmark.py [--latency 0.2] [--failure-rate 0.1]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(ROOT))
+
+from acs_client import ACSClient  # noqa: E402
+
+
+def make_handler(latency: float, failure_rate: float, n_rows: int, seed: int):
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    stats = {"requests": 0, "failures": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with lock:
+                stats["requests"] += 1
+                fail = rng.random() < failure_rate
+                if fail:
+                    stats["failures"] += 1
+            time.sleep(latency)
+            if fail:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            query = parse_qs(urlparse(self.path).query)
+            variables = [name for name in query.get("get", [""])[0].split(",") if name]
+            header = variables + ["state", "county", "tract", "block group"]
+            rows = [
+                [str(index * (col + 1)) for col in range(len(variables))]
+                + ["42", "101", f"{index // 4:06d}", str(index % 4)]
+                for index in range(n_rows)
+            ]
+            body = json.dumps([header] + rows).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", '"bench"')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler, stats
+
+
+def table_params(n_variables: int, offset: int = 0) -> dict:
+    return {
+        "get": ",".join(f"B01001_{offset + index + 1:03d}E" for index in range(n_variables)),
+        "for": "block group:*",
+        "in": "state:42 county:101",
+    }
+
+
+def run_sequential(url: str, tables: list, timeout: float):
+    ok = 0
+    for params in tables:
+        try:
+            response = requests.get(url, params=params, timeout=timeout)
+            response.raise_for_status()
+            response.json()
+            ok += 1
+        except requests.RequestException:
+            pass
+    return ok
+
+
+def run_client(client: ACSClient, url: str, tables: list):
+    results = client.gather({
+        index: (lambda params=params: client.get_json(url, params))
+        for index, params in enumerate(tables)
+    })
+    return len(results)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ACSClient against a local stand-in ACS server")
+    parser.add_argument("--tables", type=int, default=6, help="Independent table requests per round")
+    parser.add_argument("--variables", type=int, default=20, help="Variables per table request")
+    parser.add_argument("--chunked-variables", type=int, default=120, help="Variables in the chunked request")
+    parser.add_argument("--rows", type=int, default=1338, help="Rows per response (Philadelphia block groups)")
+    parser.add_argument("--latency", type=float, default=0.2, help="Server latency per request in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.1, help="Share of requests answered with 503")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    handler, stats = make_handler(args.latency, args.failure_rate, args.rows, args.seed)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/data/2023/acs/acs5"
+    tables = [table_params(args.variables, offset=index * args.variables) for index in range(args.tables)]
+    client = ACSClient(max_workers=args.workers, retries=5, backoff=0.05, timeout=30)
+
+    print(
+        f"[bench] {args.tables} tables x {args.variables} variables, {args.rows} rows, "
+        f"{args.latency * 1000:.0f} ms latency, {args.failure_rate:.0%} 503s"
+    )
+    try:
+        for label, run in (
+            ("sequential", lambda: run_sequential(url, tables, 30)),
+            ("client", lambda: run_client(client, url, tables)),
+        ):
+            timings, succeeded = [], 0
+            for _ in range(args.rounds):
+                start = time.perf_counter()
+                succeeded += run()
+                timings.append(time.perf_counter() - start)
+            print(
+                f"[bench] {label:<10} best {min(timings):.3f}s  mean {sum(timings) / len(timings):.3f}s  "
+                f"tables ok {succeeded}/{args.tables * args.rounds}"
+            )
+
+        start = time.perf_counter()
+        payload, _ = client.get_json(url, table_params(args.chunked_variables))
+        elapsed = time.perf_counter() - start
+        print(
+            f"[bench] chunked    {args.chunked_variables} variables -> {len(payload[0])} columns x "
+            f"{len(payload) - 1} rows in {elapsed:.3f}s"
+        )
+    finally:
+        client.close()
+        server.shutdown()
+    print(f"[bench] server saw {stats['requests']} requests, {stats['failures']} injected 503s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
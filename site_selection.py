@@ -0,0 +1,198 @@
+"""Campus site selection by maximal coverage with CELF lazy-greedy search.
+
+Every block-group centroid (or a supplied candidate list) is a possible new CCA
+campus. A block group is covered by a site when its centroid lies within the
+drive radius; its value is HPFI-weighted K-12 demand net of competitor supply:
+
+    value_i = hpfi_i x k12_pop_i x max(0, 1 - A_comp_i)
+
+where A_comp_i is the 2SFCA accessibility (seats per K-12 child) of the
+competitor schools in competition_schools.csv, so demand those schools already
+absorb is not counted again. Existing campuses can be passed in to start with
+their catchments covered.
+
+Coverage is a sparse candidate x block-group matrix built once with a BallTree
+(or a road-network backend). Because coverage value is submodular, CELF only
+re-evaluates the candidate at the top of a max-heap of stale gains; the greedy
+order is nested, so one run up to k_max yields the answer for every k <= k_max.
+"""
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from educational_desert_index_bg import _catchment_distance_csr, compute_edi_components
+
+DEFAULT_DRIVE_RADIUS_KM = 5.0
+
+
+@dataclass(frozen=True)
+class SiteSelectionResult:
+    """Output of select_campus_sites()"""
+    sites: pd.DataFrame     # one row per chosen site, in greedy order, with marginal and cumulative value
+    coverage: pd.DataFrame  # one row per block group: value and the order of the first site covering it
+    total_value: float      # value of all block groups (the coverage ceiling)
+
+
+def coverage_matrix(cand_lat, cand_lon, bg_lat, bg_lon, radius_km, distance_backend=None):
+    """Sparse boolean (n_candidates, n_block_groups) coverage matrix within radius_km"""
+    if distance_backend is not None:
+        D = distance_backend.catchment_csr(cand_lat, cand_lon, bg_lat, bg_lon, radius_km)
+    else:
+        D = _catchment_distance_csr(cand_lat, cand_lon, bg_lat, bg_lon, radius_km)
+    C = sparse.csr_matrix((np.ones(D.nnz, dtype=bool), D.indices, D.indptr), shape=D.shape)
+    C.sort_indices()
+    return C
+
+
+def competitor_residual_share(
+    demographics_df, competitor_df, *, catchment_km=DEFAULT_DRIVE_RADIUS_KM, beta_km=5.0, distance_backend=None,
+):
+    """
+    Share of each block group's K-12 demand left after competitor seats,
+    max(0, 1 - A_comp) with A_comp the 2SFCA competitor seats per child.
+    catchment_km and beta_km are in distance_backend units when one is given.
+    Returns 1.0 everywhere when there are no competitors.
+    """
+    if competitor_df is None or competitor_df.empty:
+        return np.ones(len(demographics_df))
+    demand = demographics_df[["block_group_id", "lat", "lon", "k12_pop"]].assign(poverty_rate=0.0)
+    comp = compute_edi_components(
+        demand, competitor_df,
+        catchment_km=catchment_km, beta_km=beta_km, engine='sparse', distance_backend=distance_backend,
+    )
+    share = pd.Series(np.clip(1.0 - comp["accessibility_2sfca"].values, 0.0, 1.0), index=comp["block_group_id"].values)
+    return share.reindex(demographics_df["block_group_id"].values).fillna(1.0).values
+
+
+def _celf(C, value, k, covered):
+    """
+    CELF lazy greedy over the rows of coverage matrix C.
+    Returns: (chosen row indices, marginal gains, covered-by order per column)
+    """
+    covered = covered.copy()
+    first_cover = np.full(C.shape[1], -1)
+    indptr, indices = C.indptr, C.indices
+
+    def gain(c):
+        cols = indices[indptr[c]:indptr[c + 1]]
+        return float(value[cols][~covered[cols]].sum())
+
+    # Initial gains in one sparse mat-vec; heap holds (-gain, candidate, round evaluated)
+    initial = np.asarray(C @ np.where(covered, 0.0, value)).ravel()
+    heap = [(-g, c, 1) for c, g in enumerate(initial) if g > 0]
+    heapq.heapify(heap)
+
+    chosen, gains = [], []
+    for round_ in range(1, k + 1):
+        while heap:
+            neg_gain, c, evaluated = heapq.heappop(heap)
+            if evaluated == round_:
+                break
+            g = gain(c)
+            if g > 0:
+                heapq.heappush(heap, (-g, c, round_))
+        else:
+            break  # Nothing left to cover
+        cols = indices[indptr[c]:indptr[c + 1]]
+        first_cover[cols[~covered[cols]]] = len(chosen)
+        covered[cols] = True
+        chosen.append(c)
+        gains.append(-neg_gain)
+    return np.array(chosen, dtype=int), np.array(gains), first_cover
+
+
+def select_campus_sites(
+    demographics_df,
+    *,
+    k: int = 5,
+    radius_km: float = DEFAULT_DRIVE_RADIUS_KM,
+    candidates_df=None,
+    competitor_df=None,
+    existing_sites_df=None,
+    hpfi_col: str = "hpfi",
+    competitor_beta_km: float = 5.0,
+    distance_backend=None,
+):
+    """
+    Pick up to k new campus sites maximizing covered HPFI-weighted K-12 demand.
+
+    Parameters:
+    - demographics_df: block_group_id, lat, lon, k12_pop and hpfi_col
+    - k: Number of sites; the greedy order is nested, so sites.head(j) is the
+      answer for every j <= k
+    - radius_km: Drive radius defining coverage (road-network units when
+      distance_backend is given)
+    - candidates_df: Optional lat/lon (+ optional name) candidate list; defaults
+      to every block-group centroid
+    - competitor_df: Competitor schools (lat, lon, capacity) whose 2SFCA supply is
+      netted out of demand, e.g. competition_schools.csv
+    - existing_sites_df: Current campuses (lat, lon); their catchments start covered
+    - distance_backend: Optional road-network backend used for coverage and the
+      competitor 2SFCA (radius_km and competitor_beta_km in its units)
+
+    Returns:
+    - SiteSelectionResult
+    """
+    bg = demographics_df.dropna(subset=["lat", "lon"]).reset_index(drop=True)
+    bg_lat = bg["lat"].values.astype(float)
+    bg_lon = bg["lon"].values.astype(float)
+    k12 = pd.to_numeric(bg["k12_pop"], errors="coerce").fillna(0.0).clip(lower=0).values
+    hpfi = pd.to_numeric(bg.get(hpfi_col), errors="coerce").fillna(0.0).clip(0.0, 1.0).values if hpfi_col in bg.columns else np.ones(len(bg))
+    # Competitor seats are netted over the same distances that define coverage
+    residual = competitor_residual_share(
+        bg, competitor_df, catchment_km=radius_km, beta_km=competitor_beta_km, distance_backend=distance_backend,
+    )
+    value = hpfi * k12 * residual
+
+    if candidates_df is None:
+        candidates = pd.DataFrame({
+            "candidate": bg["block_group_id"].astype(str).values,
+            "lat": bg_lat,
+            "lon": bg_lon,
+        })
+    else:
+        candidates = candidates_df.dropna(subset=["lat", "lon"]).reset_index(drop=True)
+        names = candidates["name"] if "name" in candidates.columns else pd.Series(
+            [f"candidate_{i}" for i in range(len(candidates))]
+        )
+        candidates = pd.DataFrame({
+            "candidate": names.astype(str).values,
+            "lat": candidates["lat"].values.astype(float),
+            "lon": candidates["lon"].values.astype(float),
+        })
+
+    C = coverage_matrix(candidates["lat"].values, candidates["lon"].values, bg_lat, bg_lon, radius_km, distance_backend)
+
+    covered = np.zeros(len(bg), dtype=bool)
+    if existing_sites_df is not None and not existing_sites_df.empty:
+        existing = coverage_matrix(
+            existing_sites_df["lat"].values.astype(float), existing_sites_df["lon"].values.astype(float),
+            bg_lat, bg_lon, radius_km, distance_backend,
+        )
+        covered[existing.indices] = True
+
+    chosen, gains, first_cover = _celf(C, value, int(k), covered)
+
+    sites = candidates.iloc[chosen].reset_index(drop=True)
+    sites.insert(0, "order", np.arange(1, len(chosen) + 1))
+    sites["marginal_value"] = gains
+    sites["cumulative_value"] = np.cumsum(gains)
+    sites["block_groups_added"] = np.bincount(first_cover[first_cover >= 0], minlength=len(chosen))[:len(chosen)]
+    sites["k12_added"] = np.bincount(first_cover[first_cover >= 0], weights=k12[first_cover >= 0], minlength=len(chosen))[:len(chosen)]
+
+    total_value = float(value.sum())
+    sites["coverage_share"] = sites["cumulative_value"] / total_value if total_value > 0 else 0.0
+
+    coverage = pd.DataFrame({
+        "block_group_id": bg["block_group_id"].astype(str).values,
+        "value": value,
+        "competitor_residual": residual,
+        "already_covered": covered,
+        "covered_by_order": np.where(first_cover >= 0, first_cover + 1, 0),
+    })
+    return SiteSelectionResult(sites=sites, coverage=coverage, total_value=total_value)
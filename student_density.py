@@ -0,0 +1,96 @@
+"""Student proximity around block groups from a BallTree over the roster.
+
+The roster (current students, applicant lists, ...) is indexed once in a
+haversine BallTree; block-group centroids then query it in one batch:
+
+- "count": students within radius_km (query_radius with count_only)
+- "gaussian": sum of exp(-0.5 (d / h)^2) over students within radius_km
+- "epanechnikov": sum of 1 - (d / h)^2 over students within h
+
+h is bandwidth_km (default radius_km / 2 for gaussian, radius_km for
+epanechnikov). Indexes are cached per roster version, i.e. per fingerprint of
+the roster coordinates, so reruns with the same roster skip the tree build.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+from educational_desert_index_bg import EARTH_R_KM, _coords_fingerprint
+
+KERNELS = ("count", "gaussian", "epanechnikov")
+
+# Roster indexes kept in memory, most recently used last
+_INDEX_CACHE_SIZE = 4
+_index_cache: OrderedDict = OrderedDict()
+
+
+def _points(lat, lon):
+    lat = pd.to_numeric(pd.Series(lat), errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    lon = pd.to_numeric(pd.Series(lon), errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    return lat, lon
+
+
+class StudentPointIndex:
+    """Haversine BallTree over roster points with radius counts and kernel densities."""
+
+    def __init__(self, lat, lon):
+        lat, lon = _points(lat, lon)
+        valid = np.isfinite(lat) & np.isfinite(lon)
+        self.lat = lat[valid]
+        self.lon = lon[valid]
+        self.fingerprint = _coords_fingerprint(self.lat, self.lon)
+        self._tree = BallTree(np.deg2rad(np.column_stack([self.lat, self.lon])), metric="haversine") if valid.any() else None
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def density(self, lat, lon, radius_km: float = 5.0, kernel: str = "count", bandwidth_km: float | None = None) -> np.ndarray:
+        """
+        Student count or kernel-weighted density around each query point.
+        Points without coordinates (or an empty roster) score 0.
+        """
+        if kernel not in KERNELS:
+            raise ValueError(f"Unknown kernel: {kernel!r} (expected one of {', '.join(KERNELS)})")
+        lat, lon = _points(lat, lon)
+        out = np.zeros(len(lat))
+        valid = np.isfinite(lat) & np.isfinite(lon)
+        if self._tree is None or not valid.any():
+            return out
+        query = np.deg2rad(np.column_stack([lat[valid], lon[valid]]))
+
+        if kernel == "count":
+            out[valid] = self._tree.query_radius(query, r=radius_km / EARTH_R_KM, count_only=True)
+            return out
+
+        h = float(bandwidth_km) if bandwidth_km else (radius_km / 2.0 if kernel == "gaussian" else radius_km)
+        reach = radius_km if kernel == "gaussian" else h
+        _, dist = self._tree.query_radius(query, r=reach / EARTH_R_KM, return_distance=True)
+        lengths = np.fromiter((len(d) for d in dist), dtype=int, count=len(dist))
+        if lengths.sum() == 0:
+            return out
+        u = np.concatenate(dist) * EARTH_R_KM / h
+        weights = np.exp(-0.5 * u ** 2) if kernel == "gaussian" else np.clip(1.0 - u ** 2, 0.0, None)
+        rows = np.repeat(np.arange(len(dist)), lengths)
+        out[valid] = np.bincount(rows, weights=weights, minlength=len(dist))
+        return out
+
+
+def student_index(students_df: pd.DataFrame | None) -> StudentPointIndex:
+    """StudentPointIndex for a roster frame (lat, lon), reused while the roster is unchanged"""
+    if students_df is None or students_df.empty or not {"lat", "lon"} <= set(students_df.columns):
+        return StudentPointIndex(np.empty(0), np.empty(0))
+    lat, lon = _points(students_df["lat"].values, students_df["lon"].values)
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    key = _coords_fingerprint(lat[valid], lon[valid])
+    if key in _index_cache:
+        _index_cache.move_to_end(key)
+        return _index_cache[key]
+    index = StudentPointIndex(lat, lon)
+    _index_cache[key] = index
+    while len(_index_cache) > _INDEX_CACHE_SIZE:
+        _index_cache.popitem(last=False)
+    return index
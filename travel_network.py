@@ -0,0 +1,234 @@
+"""Travel-network distances for 2SFCA from a local road graph.
+
+Straight-line (haversine) distance overstates access wherever the street grid is
+cut by rivers, rail corridors or expressways. This module loads a pre-extracted
+road network from disk (e.g. an OSM drive graph exported with osmnx) into a
+scipy sparse graph and answers block-group x school travel-cost queries with
+multi-source Dijkstra, limited to the catchment cutoff and cached to disk.
+
+Everything runs offline from the local files. Supported inputs:
+
+- ``nodes.csv`` + ``edges.csv`` in a directory (osmnx ``graph_to_gdfs`` layout):
+  nodes need ``node_id`` (or ``osmid``) and ``lat``/``lon`` (or ``y``/``x``);
+  edges need ``u``, ``v``, ``length`` in metres, optional ``travel_time`` in
+  seconds and optional ``oneway``.
+- A ``.graphml`` file (requires networkx).
+
+Costs are reported in km for ``weight="length"`` and in minutes for
+``weight="travel_time"``; the catchment cutoff passed to the EDI is read in the
+same units.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.csgraph import dijkstra
+from sklearn.neighbors import BallTree
+
+from educational_desert_index_bg import EARTH_R_KM, _coords_fingerprint, cached_array
+
+try:
+    import networkx as nx
+except ImportError:  # GraphML loading is optional
+    nx = None
+
+DEFAULT_NETWORK_DIR = Path("data/network")
+
+# Edge attribute -> (scale to reporting units, unit label)
+WEIGHT_UNITS = {
+    "length": (1.0 / 1000.0, "km"),         # metres -> km
+    "travel_time": (1.0 / 60.0, "min"),     # seconds -> minutes
+}
+
+# Sources per Dijkstra call; bounds the (chunk, n_nodes) temporary
+DIJKSTRA_CHUNK = 64
+
+
+def _truthy(series: pd.Series) -> np.ndarray:
+    """osmnx writes oneway as True/False strings; treat anything truthy as one-way"""
+    return series.astype(str).str.strip().str.lower().isin({"true", "1", "yes", "y"}).values
+
+
+class RoadNetwork:
+    """Road graph as a CSR adjacency matrix over snapped node coordinates."""
+
+    def __init__(self, node_lat, node_lon, graph: sparse.csr_matrix, weight: str = "length"):
+        if weight not in WEIGHT_UNITS:
+            raise ValueError(f"Unknown edge weight: {weight!r} (expected one of {', '.join(WEIGHT_UNITS)})")
+        self.node_lat = np.asarray(node_lat, dtype=float)
+        self.node_lon = np.asarray(node_lon, dtype=float)
+        self.graph = sparse.csr_matrix(graph)
+        self.weight = weight
+        self.units = WEIGHT_UNITS[weight][1]
+        self._tree = BallTree(np.deg2rad(np.column_stack([self.node_lat, self.node_lon])), metric="haversine")
+        self.fingerprint = _coords_fingerprint(
+            self.node_lat, self.node_lon,
+            self.graph.data, self.graph.indices, self.graph.indptr,
+            [list(WEIGHT_UNITS).index(weight)],
+        )
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.node_lat)
+
+    @classmethod
+    def from_edge_list(cls, node_ids, node_lat, node_lon, u, v, cost, oneway=None, weight: str = "length"):
+        """
+        Build from raw node/edge arrays. Edges are two-way unless oneway is set;
+        parallel edges keep the cheapest cost.
+        """
+        node_ids = pd.Index(node_ids)
+        src = node_ids.get_indexer(u)
+        dst = node_ids.get_indexer(v)
+        cost = np.asarray(cost, dtype=float) * WEIGHT_UNITS.get(weight, (1.0,))[0]
+        keep = (src >= 0) & (dst >= 0) & np.isfinite(cost) & (src != dst)
+        if oneway is None:
+            oneway = np.zeros(len(cost), dtype=bool)
+        two_way = keep & ~np.asarray(oneway, dtype=bool)
+        rows = np.concatenate([src[keep], dst[two_way]])
+        cols = np.concatenate([dst[keep], src[two_way]])
+        data = np.concatenate([cost[keep], cost[two_way]])
+        # Collapse parallel edges to their minimum cost (CSR construction would sum them);
+        # zero-cost edges are nudged so the sparse graph does not drop them
+        edges = pd.DataFrame({"r": rows, "c": cols, "w": np.maximum(data, 1e-9)})
+        edges = edges.groupby(["r", "c"], sort=True)["w"].min().reset_index()
+        n = len(node_ids)
+        graph = sparse.csr_matrix((edges["w"].values, (edges["r"].values, edges["c"].values)), shape=(n, n))
+        return cls(node_lat, node_lon, graph, weight=weight)
+
+    @classmethod
+    def from_csv(cls, nodes_path, edges_path, weight: str = "length"):
+        """Load an osmnx-style nodes.csv / edges.csv pair"""
+        nodes = pd.read_csv(nodes_path)
+        edges = pd.read_csv(edges_path)
+        id_col = "node_id" if "node_id" in nodes.columns else "osmid"
+        lat_col = "lat" if "lat" in nodes.columns else "y"
+        lon_col = "lon" if "lon" in nodes.columns else "x"
+        missing = [c for c in (id_col, lat_col, lon_col) if c not in nodes.columns]
+        missing += [c for c in ("u", "v", weight) if c not in edges.columns]
+        if missing:
+            raise ValueError(f"Road network files missing columns: {', '.join(missing)}")
+        oneway = _truthy(edges["oneway"]) if "oneway" in edges.columns else None
+        return cls.from_edge_list(
+            nodes[id_col].values, nodes[lat_col].values, nodes[lon_col].values,
+            edges["u"].values, edges["v"].values, edges[weight].values,
+            oneway=oneway, weight=weight,
+        )
+
+    @classmethod
+    def from_graphml(cls, path, weight: str = "length"):
+        """Load a GraphML export (osmnx save_graphml); directed graphs keep edge direction"""
+        if nx is None:
+            raise ImportError("networkx is required to read GraphML road networks")
+        G = nx.read_graphml(path)
+        ids = list(G.nodes)
+        lat = [float(G.nodes[n].get("y", G.nodes[n].get("lat"))) for n in ids]
+        lon = [float(G.nodes[n].get("x", G.nodes[n].get("lon"))) for n in ids]
+        u, v, cost = [], [], []
+        for a, b, attrs in G.edges(data=True):
+            u.append(a)
+            v.append(b)
+            cost.append(float(attrs.get(weight, np.nan)))
+        oneway = np.ones(len(u), dtype=bool) if G.is_directed() else None
+        return cls.from_edge_list(ids, lat, lon, u, v, cost, oneway=oneway, weight=weight)
+
+    @classmethod
+    def load(cls, path=DEFAULT_NETWORK_DIR, weight: str = "length"):
+        """Load a network directory (nodes.csv + edges.csv) or a .graphml file"""
+        path = Path(path)
+        if path.is_dir():
+            return cls.from_csv(path / "nodes.csv", path / "edges.csv", weight=weight)
+        if path.suffix.lower() == ".graphml":
+            return cls.from_graphml(path, weight=weight)
+        raise ValueError(f"Unrecognised road network path: {path}")
+
+    def snap(self, lat, lon):
+        """
+        Nearest graph node for each point.
+        Returns: (node index array, straight-line snap distance in km)
+        """
+        pts = np.deg2rad(np.column_stack([np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)]))
+        dist, idx = self._tree.query(pts, k=1)
+        return idx[:, 0], dist[:, 0] * EARTH_R_KM
+
+
+def network_available(path=DEFAULT_NETWORK_DIR) -> bool:
+    """True when a local road network is present at path"""
+    path = Path(path)
+    if path.is_dir():
+        return (path / "nodes.csv").exists() and (path / "edges.csv").exists()
+    return path.suffix.lower() == ".graphml" and path.exists()
+
+
+class NetworkDistanceBackend:
+    """
+    Travel-cost backend for compute_edi_components(distance_backend=...).
+
+    Origins and destinations are snapped to their nearest graph node; the
+    off-network leg counts as straight-line km (length weight) or is converted
+    with access_speed_kph (travel_time weight).
+    """
+
+    def __init__(self, network: RoadNetwork, cache_dir: str | Path | None = "data/cache", access_speed_kph: float = 5.0):
+        self.network = network
+        self.cache_dir = cache_dir
+        self.access_speed_kph = float(access_speed_kph)
+
+    @property
+    def units(self) -> str:
+        return self.network.units
+
+    def _access_cost(self, snap_km):
+        if self.network.weight == "travel_time":
+            return snap_km / self.access_speed_kph * 60.0
+        return snap_km
+
+    def _compute(self, lat1, lon1, lat2, lon2, cutoff):
+        node1, snap1 = self.network.snap(lat1, lon1)
+        node2, snap2 = self.network.snap(lat2, lon2)
+        access1 = self._access_cost(snap1)
+        access2 = self._access_cost(snap2)
+        limit = np.inf if cutoff is None else float(cutoff)
+
+        # Dijkstra on the reversed graph from each school node gives node -> school
+        # costs for every origin at once; duplicate school nodes share one search
+        targets, inverse = np.unique(node2, return_inverse=True)
+        reverse = self.network.graph.T.tocsr()
+        to_target = np.empty((len(lat1), len(targets)))
+        for start in range(0, len(targets), DIJKSTRA_CHUNK):
+            chunk = targets[start:start + DIJKSTRA_CHUNK]
+            dist = dijkstra(reverse, directed=True, indices=chunk, limit=limit)
+            to_target[:, start:start + len(chunk)] = dist[:, node1].T
+
+        D = access1[:, None] + to_target[:, inverse] + access2[None, :]
+        D[D > limit] = np.inf
+        return D
+
+    def matrix(self, lat1, lon1, lat2, lon2, cutoff=None):
+        """
+        Dense (n1, n2) travel-cost matrix; pairs beyond cutoff (or unreachable) are inf.
+        Cached under cache_dir keyed by the network, the coordinates and the cutoff.
+        """
+        if self.cache_dir is None:
+            return self._compute(lat1, lon1, lat2, lon2, cutoff)
+        key = _coords_fingerprint(
+            lat1, lon1, lat2, lon2,
+            [np.inf if cutoff is None else cutoff, self.access_speed_kph],
+            [int(self.network.fingerprint, 16) % (2 ** 52)],
+        )
+        return cached_array(
+            "net", key,
+            lambda: self._compute(lat1, lon1, lat2, lon2, cutoff),
+            cache_dir=self.cache_dir,
+        )
+
+    def catchment_csr(self, lat1, lon1, lat2, lon2, cutoff):
+        """Sparse counterpart of matrix(): CSR of the in-cutoff pairs (zero costs kept)"""
+        D = self.matrix(lat1, lon1, lat2, lon2, cutoff)
+        rows, cols = np.nonzero(D <= cutoff)
+        out = sparse.csr_matrix((np.asarray(D[rows, cols]), (rows, cols)), shape=D.shape)
+        out.sort_indices()
+        return out
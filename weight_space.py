@@ -0,0 +1,123 @@
+"""Weight-space exploration for the composite HPFI / RHI scores.
+
+Both indexes are weighted sums of normalized component columns, so a block
+group's score under any weight vector is one row of C @ w. Instead of scoring
+one slider setting at a time, explore_weight_space() stacks the components
+into C (n_block_groups x n_components) once, samples thousands of weight
+vectors from a Dirichlet distribution into W (n_samples x n_components) and
+scores them all with a single matrix multiply, S = C @ W.T. Block groups that
+stay in the Top-N for most sampled vectors are robust targets: their ranking
+is not an artifact of one particular weighting.
+
+Sampling is either centered on the current weights (alpha = concentration x
+current weights, so larger concentration means smaller perturbations) or
+uniform over the simplex (concentration=None). The current weights are always
+sample 0.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy.stats import rankdata
+
+
+@dataclass(frozen=True)
+class WeightSpaceResult:
+    """Output of explore_weight_space()"""
+    weights: pd.DataFrame       # one row per sampled weight vector (row 0 = current weights)
+    block_groups: pd.DataFrame  # one row per block group: rank spread and Top-N frequency
+    top_n: int
+
+    def robust_targets(self, min_share: float = 0.8) -> pd.DataFrame:
+        """Block groups in the Top-N for at least min_share of the sampled weight vectors"""
+        return self.block_groups[self.block_groups["top_n_share"] >= min_share].reset_index(drop=True)
+
+
+def sample_weight_vectors(
+    base_weights,
+    n_samples: int = 2000,
+    concentration: float | None = 50.0,
+    seed: int | None = 0,
+) -> np.ndarray:
+    """
+    (n_samples, k) weight vectors on the simplex, the normalized base_weights
+    first. Zero base weights get a small floor so every component is explored.
+    """
+    base = np.clip(np.asarray(base_weights, dtype=float), 0.0, None)
+    base = base / base.sum() if base.sum() > 0 else np.full(len(base), 1.0 / len(base))
+    rng = np.random.default_rng(seed)
+    if concentration is None:
+        alpha = np.ones(len(base))
+    else:
+        alpha = float(concentration) * np.maximum(base, 1e-3)
+    samples = rng.dirichlet(alpha, size=max(int(n_samples) - 1, 0))
+    return np.vstack([base[None, :], samples])
+
+
+def explore_weight_space(
+    components: pd.DataFrame,
+    base_weights: dict,
+    *,
+    block_group_ids=None,
+    top_n: int = 20,
+    n_samples: int = 2000,
+    concentration: float | None = 50.0,
+    seed: int | None = 0,
+    chunk_size: int = 1000,
+) -> WeightSpaceResult:
+    """
+    Top-N stability of a weighted-sum score across sampled weight vectors.
+
+    Parameters:
+    - components: (n_block_groups, k) normalized component columns; NaN counts as 0
+    - base_weights: current weight per component column (missing -> 0)
+    - block_group_ids: labels for the rows (default: components.index)
+    - top_n: Size of the target list whose membership is tracked
+    - n_samples, concentration, seed: see sample_weight_vectors()
+    - chunk_size: weight vectors scored and ranked per batch; peak memory is
+      about n_block_groups x chunk_size x 8 bytes per array
+
+    Returns:
+    - WeightSpaceResult with the sampled weights and per-block-group score at
+      the current weights, rank spread and share of samples in the Top-N
+    """
+    names = list(components.columns)
+    C = components.apply(pd.to_numeric, errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    W = sample_weight_vectors([base_weights.get(name, 0.0) for name in names], n_samples, concentration, seed)
+    n_bg = C.shape[0]
+    ids = components.index if block_group_ids is None else block_group_ids
+    ids = np.asarray(ids).astype(str)
+
+    in_top_count = np.zeros(n_bg)
+    rank_sum = np.zeros(n_bg)
+    rank_sq = np.zeros(n_bg)
+    rank_min = np.full(n_bg, np.inf)
+    rank_max = np.zeros(n_bg)
+    base_score = base_rank = None
+    for start in range(0, len(W), chunk_size):
+        S = C @ W[start:start + chunk_size].T  # (n_bg, chunk)
+        ranks = rankdata(-S, axis=0, method="min")
+        if start == 0:
+            base_score, base_rank = S[:, 0], ranks[:, 0]
+        in_top_count += (ranks <= top_n).sum(axis=1)
+        rank_sum += ranks.sum(axis=1)
+        rank_sq += (ranks.astype(float) ** 2).sum(axis=1)
+        rank_min = np.minimum(rank_min, ranks.min(axis=1))
+        rank_max = np.maximum(rank_max, ranks.max(axis=1))
+
+    n = len(W)
+    mean_rank = rank_sum / n
+    block_groups = pd.DataFrame({
+        "block_group_id": ids,
+        "current_score": base_score if base_score is not None else np.full(n_bg, np.nan),
+        "current_rank": base_rank if base_rank is not None else np.full(n_bg, np.nan),
+        "mean_rank": mean_rank,
+        "rank_min": rank_min,
+        "rank_max": rank_max,
+        "rank_std": np.sqrt(np.clip(rank_sq / n - mean_rank ** 2, 0.0, None)),
+        "top_n_share": in_top_count / n,
+    }).sort_values(["top_n_share", "current_rank"], ascending=[False, True]).reset_index(drop=True)
+
+    return WeightSpaceResult(weights=pd.DataFrame(W, columns=names), block_groups=block_groups, top_n=top_n)